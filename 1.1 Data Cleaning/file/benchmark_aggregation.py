@@ -0,0 +1,87 @@
+import argparse
+import time
+import pandas as pd
+from hr_analytics_preprocessing import HRAnalyticsPreprocessor
+
+
+def legacy_summaries(merged_df, employee_df):
+    """The per-table groupby / lambda aggregation the summary engine replaced"""
+    dept_summary = merged_df.groupby('Department').agg({
+        'EmployeeID': 'count',
+        'Salary': ['mean', 'min', 'max'],
+        'Age': 'mean',
+        'JobSatisfaction': 'mean',
+        'PerformanceScore': 'mean',
+        'Attrition': lambda x: (x == 'Yes').sum(),
+        'WorkLifeBalance': 'mean'
+    }).round(2)
+
+    group_agg = {
+        'EmployeeID': 'count',
+        'Salary': 'mean',
+        'PerformanceScore': 'mean',
+        'JobSatisfaction': 'mean',
+        'Attrition': lambda x: (x == 'Yes').sum()
+    }
+    education_summary = merged_df.groupby('EducationLevel').agg(group_agg).round(2)
+    age_summary = merged_df.groupby('AgeGroup', observed=True).agg(group_agg).round(2)
+
+    performance_trends = merged_df.groupby(['Department', 'ReviewDate']).agg({
+        'PerformanceScore': 'mean',
+        'JobSatisfaction': 'mean',
+        'EmployeeID': 'count'
+    }).reset_index()
+
+    # generate_insights / create_visualizations grouped by department again
+    dept_attrition = employee_df.groupby('Department')['Attrition'].apply(lambda x: (x == 'Yes').mean() * 100)
+    attrition_by_dept = employee_df.groupby('Department')['Attrition'].apply(lambda x: (x == 'Yes').sum())
+
+    return dept_summary, education_summary, age_summary, performance_trends, dept_attrition, attrition_by_dept
+
+
+def engine_summaries(preprocessor):
+    """Single-pass grouping-set aggregation and trend buckets used by create_aggregated_tables"""
+    preprocessor.build_aggregates()
+    preprocessor.build_employee_aggregate()
+    return preprocessor.summary_tables(preprocessor.aggregates) + (preprocessor.build_trends().table(),)
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the summary aggregation engine against the legacy groupbys")
+    parser.add_argument('--scale', nargs='+', type=int, default=[1, 10, 100],
+                        help="replicate the merged dataset this many times (default: 1 10 100)")
+    parser.add_argument('--repeat', type=int, default=3, help="timing repeats, the best is reported")
+    args = parser.parse_args()
+
+    # Build the merged dataset once from the source CSVs
+    base = HRAnalyticsPreprocessor()
+    if not base.load_data():
+        return
+    base.clean_employee_data()
+    base.clean_performance_data()
+    base.merge_data()
+    base.create_features()
+
+    print("\n⏱️ Summary aggregation benchmark")
+    print(f"{'Scale':>6} {'Rows':>10} {'Legacy (s)':>12} {'Engine (s)':>12} {'Speedup':>8}")
+    for scale in args.scale:
+        preprocessor = HRAnalyticsPreprocessor()
+        preprocessor.merged_df = pd.concat([base.merged_df] * scale, ignore_index=True)
+        preprocessor.employee_df = pd.concat([base.employee_df] * scale, ignore_index=True)
+
+        legacy = best_time(lambda: legacy_summaries(preprocessor.merged_df, preprocessor.employee_df), args.repeat)
+        engine = best_time(lambda: engine_summaries(preprocessor), args.repeat)
+        print(f"{scale:>6} {len(preprocessor.merged_df):>10} {legacy:>12.4f} {engine:>12.4f} {legacy / engine:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from hr_features import FeatureTransformer, INPUT_COLUMNS, SALARY_LABELS
+
+
+def legacy_features(df, salary_bins):
+    """The pd.cut / np.where / row-wise mean derivations the FeatureTransformer replaced"""
+    df['AgeGroup'] = pd.cut(df['Age'], bins=[0, 30, 40, 50, 100],
+                            labels=['Under 30', '30-40', '40-50', 'Over 50'])
+    df['SalaryRange'] = pd.cut(df['Salary'], bins=[-np.inf] + salary_bins[1:-1] + [np.inf], labels=SALARY_LABELS)
+    df['PerformanceScore'] = (df['SelfRating'] + df['ManagerRating']) / 2
+    satisfaction_cols = ['JobSatisfaction', 'EnvironmentSatisfaction', 'RelationshipSatisfaction']
+    df['OverallSatisfaction'] = df[satisfaction_cols].mean(axis=1)
+    df['TrainingUtilization'] = np.where(
+        df['TrainingOpportunitiesWithinYear'] > 0,
+        df['TrainingOpportunitiesTaken'] / df['TrainingOpportunitiesWithinYear'],
+        0
+    )
+    df['TenureCategory'] = pd.cut(df['YearsAtCompany'], bins=[0, 2, 5, 10, 100],
+                                  labels=['New', 'Early Career', 'Mid Career', 'Long Term'])
+    df['PerformanceCategory'] = pd.cut(df['PerformanceScore'], bins=[0, 2, 3, 4, 5],
+                                       labels=['Needs Improvement', 'Meets Expectations',
+                                               'Exceeds Expectations', 'Outstanding'])
+    df['AttritionRisk'] = (
+        (5 - df['JobSatisfaction']) * 0.3 +
+        (5 - df['WorkLifeBalance']) * 0.2 +
+        (5 - df['OverallSatisfaction']) * 0.3 +
+        (df['YearsAtCompany'] < 2) * 0.2
+    )
+    return df
+
+
+def synthetic_inputs(rows, seed=42):
+    """Random raw columns in the value ranges of the HR data (ratings 1-5, some missing reviews)"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Age': rng.integers(18, 60, rows),
+        'Salary': rng.integers(20000, 550000, rows),
+        'YearsAtCompany': rng.integers(0, 11, rows),
+        'TrainingOpportunitiesWithinYear': rng.integers(0, 4, rows).astype('float64'),
+        'TrainingOpportunitiesTaken': rng.integers(0, 4, rows).astype('float64')
+    })
+    for col in ['SelfRating', 'ManagerRating', 'WorkLifeBalance',
+                'JobSatisfaction', 'EnvironmentSatisfaction', 'RelationshipSatisfaction']:
+        df[col] = rng.integers(1, 6, rows).astype('float64')
+    # Employees without reviews have no rating columns after the left join
+    no_reviews = rng.random(rows) < 0.13
+    df.loc[no_reviews, INPUT_COLUMNS[3:]] = np.nan
+    return df[INPUT_COLUMNS]
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FeatureTransformer against the legacy derivations")
+    parser.add_argument('--rows', nargs='+', type=int, default=[1000000, 5000000],
+                        help="synthetic rows to derive features for (default: 1000000 5000000)")
+    parser.add_argument('--repeat', type=int, default=3, help="timing repeats, the best is reported")
+    args = parser.parse_args()
+
+    print("\n⏱️ Feature derivation benchmark")
+    print(f"{'Rows':>10} {'Legacy (s)':>12} {'Kernel (s)':>12} {'Speedup':>8} {'Identical':>10}")
+    for rows in args.rows:
+        inputs = synthetic_inputs(rows)
+        transformer = FeatureTransformer().fit(inputs['Salary'])
+
+        legacy = best_time(lambda: legacy_features(inputs.copy(), transformer.salary_bins), args.repeat)
+        kernel = best_time(lambda: transformer.transform(inputs.copy()), args.repeat)
+
+        expected = legacy_features(inputs.copy(), transformer.salary_bins)
+        try:
+            pd.testing.assert_frame_equal(transformer.transform(inputs.copy()), expected, check_exact=True)
+            identical = 'yes'
+        except AssertionError:
+            identical = 'NO'
+        print(f"{rows:>10} {legacy:>12.4f} {kernel:>12.4f} {legacy / kernel:>7.1f}x {identical:>10}")
+
+    # Single-row scoring path
+    row = synthetic_inputs(1).iloc[0].to_dict()
+    single = best_time(lambda: [transformer.transform_row(row) for _ in range(1000)], args.repeat)
+    print(f"\nSingle-row transform_row: {single:.3f} ms per row")
+
+
+if __name__ == "__main__":
+    main()
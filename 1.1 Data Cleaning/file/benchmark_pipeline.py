@@ -0,0 +1,215 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from hr_synthetic import SyntheticHRGenerator, LOOKUP_FILES, sample_size, scaled_count
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FILES = ['Employee.csv', 'PerformanceRating.csv'] + LOOKUP_FILES
+
+# Pipelines timed at every scale: name -> (script, arguments, run report it writes).
+# Charts render inline, models are always retrained and no stage is served from the
+# stage cache so every run does the same work.
+PIPELINES = {
+    'preprocessing': ('hr_analytics_preprocessing.py', ['--render-workers', '0', '--no-cache'],
+                      'pipeline_run_report.json'),
+    'advanced_analytics': ('hr_advanced_analytics.py', ['--retrain', '--render-workers', '0', '--no-cache'],
+                           'ml_run_report.json')
+}
+
+# Outputs whose contents must match the baseline (the generated data is fixed by the seed)
+RESULT_TABLES = ['department_summary.csv', 'education_summary.csv', 'age_summary.csv',
+                 'performance_trends.csv', 'employee_features.csv']
+
+# Changes smaller than these are timer / allocator noise, not regressions
+MIN_SECONDS = 0.1
+MIN_MB = 20
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def prepare_data(scale, data_dir, source_dir, seed):
+    """Generate the synthetic source CSVs of a scale once; later runs reuse them"""
+    path = os.path.join(data_dir, f"scale_{scale:g}x", 'source')
+    marker = os.path.join(path, 'generated.json')
+    sample = {name: file_digest(os.path.join(source_dir, name)) for name in ['Employee.csv', 'PerformanceRating.csv']}
+    if os.path.exists(marker):
+        with open(marker) as f:
+            generated = json.load(f)
+        if generated['seed'] == seed and generated['sample'] == sample:
+            return path, generated
+
+    print(f"🧪 Generating {scale:g}x synthetic data...")
+    generator = SyntheticHRGenerator.from_directory(source_dir, seed=seed)
+    employees, reviews = generator.write(scale, path, source_dir)
+    generated = {'scale': scale, 'seed': seed, 'sample': sample, 'employees': employees, 'reviews': reviews}
+    with open(marker, 'w') as f:
+        json.dump(generated, f, indent=2)
+    return path, generated
+
+
+def run_pipelines(source_path, run_dir, pipelines, trace_memory=False):
+    """Run the pipelines in fresh processes on a copy of the source data and collect their stage records"""
+    if os.path.isdir(run_dir):
+        shutil.rmtree(run_dir)
+    os.makedirs(run_dir)
+    for name in SOURCE_FILES:
+        shutil.copy(os.path.join(source_path, name), os.path.join(run_dir, name))
+
+    env = dict(os.environ, MPLBACKEND='Agg')
+    stages = {}
+    for pipeline in pipelines:
+        script, arguments, report_file = PIPELINES[pipeline]
+        if trace_memory:
+            arguments = arguments + ['--trace-memory']
+        start = time.perf_counter()
+        with open(os.path.join(run_dir, f"{pipeline}.log"), 'w') as log:
+            completed = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, script)] + arguments,
+                                       cwd=run_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{script} failed, see {os.path.join(run_dir, pipeline + '.log')}")
+
+        with open(os.path.join(run_dir, report_file)) as f:
+            report = json.load(f)
+        stages[f"{pipeline}/total"] = {
+            'wall_time_s': time.perf_counter() - start,
+            'cpu_time_s': report['cpu_time_s'],
+            'peak_rss_mb': report['peak_rss_mb']
+        }
+        for record in report['stages']:
+            stages[f"{pipeline}/{record['stage']}"] = {
+                key: record.get(key)
+                for key in ['wall_time_s', 'cpu_time_s', 'peak_rss_mb', 'rss_growth_mb', 'traced_peak_mb',
+                            'rows_in', 'rows_out']
+            }
+
+    digests = {
+        name: file_digest(os.path.join(run_dir, name))
+        for name in RESULT_TABLES if os.path.exists(os.path.join(run_dir, name))
+    }
+    return stages, digests
+
+
+def compare(current, baseline, tolerance):
+    """Regressions of one scale against its baseline: slower or bigger stages and changed outputs"""
+    regressions = []
+    for stage, record in current['stages'].items():
+        base = baseline['stages'].get(stage)
+        if base is None:
+            continue
+        for key, floor, unit in [('wall_time_s', MIN_SECONDS, 's'), ('peak_rss_mb', MIN_MB, ' MB')]:
+            new, old = record.get(key), base.get(key)
+            if new is None or old is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(f"{stage} {key}: {old:.2f}{unit} → {new:.2f}{unit} (+{(new / old - 1) * 100:.0f}%)")
+    for name, digest in current['digests'].items():
+        if name in baseline['digests'] and baseline['digests'][name] != digest:
+            regressions.append(f"{name}: output differs from the baseline")
+    return regressions
+
+
+def print_scale(scale, result, baseline):
+    print(f"\n⏱️ {scale:g}x: {result['employees']} employees, {result['reviews']} reviews")
+    print(f"  {'Stage':<48} {'Wall (s)':>9} {'CPU (s)':>9} {'Peak RSS':>9} {'Baseline':>9} {'Change':>8}")
+    for stage, record in result['stages'].items():
+        base = (baseline or {}).get('stages', {}).get(stage, {}).get('wall_time_s')
+        change = f"{(record['wall_time_s'] / base - 1) * 100:+.0f}%" if base else '-'
+        base = f"{base:.3f}" if base else '-'
+        rss = f"{record['peak_rss_mb']:.0f} MB" if record.get('peak_rss_mb') is not None else '-'
+        print(f"  {stage:<48} {record['wall_time_s']:>9.3f} {record['cpu_time_s']:>9.3f} {rss:>9} {base:>9} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile every pipeline stage on synthetic data")
+    parser.add_argument('--scale', nargs='+', type=float, default=[10, 100],
+                        help="multiples of the sample's employees to benchmark (default: 10 100; 1000 is supported)")
+    parser.add_argument('--pipelines', nargs='+', choices=list(PIPELINES), default=list(PIPELINES),
+                        help="pipelines to run (default: both)")
+    parser.add_argument('--source-dir', default='.', help="directory with the sample CSVs (default: .)")
+    parser.add_argument('--data-dir', default='benchmark_data', help="generated data and runs (default: benchmark_data)")
+    parser.add_argument('--seed', type=int, default=42, help="synthetic data seed (default: 42)")
+    parser.add_argument('--trace-memory', action='store_true', help="also record tracemalloc peaks per stage")
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help="stored baseline to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown / memory growth before a stage counts as a regression (default: 0.25)")
+    parser.add_argument('--output', default='benchmark_results.json', help="results file (default: benchmark_results.json)")
+    args = parser.parse_args()
+
+    # Every scale must give at least one employee before anything is generated or run
+    try:
+        size = sample_size(args.source_dir)
+        for scale in args.scale:
+            scaled_count(size, scale)
+    except ValueError as e:
+        parser.error(str(e))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'scales': {}
+    }
+    regressions = []
+    for scale in args.scale:
+        source_path, generated = prepare_data(scale, args.data_dir, args.source_dir, args.seed)
+        print(f"🚀 Running {', '.join(args.pipelines)} at {scale:g}x...")
+        run_dir = os.path.join(args.data_dir, f"scale_{scale:g}x", 'run')
+        stages, digests = run_pipelines(source_path, run_dir, args.pipelines, args.trace_memory)
+
+        key = f"{scale:g}"
+        result = {'employees': generated['employees'], 'reviews': generated['reviews'],
+                  'stages': stages, 'digests': digests}
+        results['scales'][key] = result
+        scale_baseline = baseline.get('scales', {}).get(key)
+        print_scale(scale, result, scale_baseline)
+        if scale_baseline is not None and scale_baseline.get('seed', args.seed) == args.seed:
+            regressions += [f"{key}x {regression}" for regression in compare(result, scale_baseline, args.tolerance)]
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📄 Results saved to {args.output}")
+
+    if args.save_baseline:
+        # Keep the baselines of scales that were not run this time
+        for scale_result in results['scales'].values():
+            scale_result['seed'] = args.seed
+        baseline.setdefault('scales', {}).update(results['scales'])
+        baseline.update({key: results[key] for key in ['created', 'python', 'platform', 'cpu_count']})
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline} yet, run with --save-baseline to store one")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressions against {args.baseline}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        raise SystemExit(1)
+    if baseline and not args.save_baseline:
+        print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
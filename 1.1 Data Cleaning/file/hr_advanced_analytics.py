@@ -1,20 +1,111 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.feature_selection import SelectKBest, f_classif
+import argparse
+import os
+import time
 import warnings
+from hr_io import read_table, find_table, table_path
+from hr_schema import category_dtypes
+from hr_clustering import EmployeeClusterer, load_clusterer, CLUSTERING_METHODS
+from hr_risk import RiskRanker, WATCH_TIERS, riskiest_rows
+from hr_employee_features import TREND_FIELDS
+from hr_model_registry import ModelRegistry, AttritionScorer, risk_categories
+from hr_importance import permutation_importance
+from hr_instrumentation import StageProfiler, profiled_run
+from hr_dag import Stage, StageGraph, default_workers
+from hr_stage_cache import StageCache
+from hr_rendering import ChartRenderer, draw_feature_importance, draw_employee_clusters
 warnings.filterwarnings('ignore')
 
+# Models trained on standardized features
+SCALED_MODELS = {'Logistic Regression'}
+
+# Most employees drawn in the cluster scatter plot (a random sample beyond that)
+PLOT_POINTS = 20000
+
+# Tables whose row counts the run report records going into and out of each stage
+STAGE_ROWS = {
+    'load_data': (None, 'data'),
+    'prepare_attrition_data': ('data', 'X'),
+    'train_attrition_models': ('X_train', 'X_test'),
+    'feature_importance_analysis': ('X_test', None),
+    'employee_clustering': ('data', 'data'),
+    'attrition_risk_scoring': ('data', 'data'),
+    'create_advanced_insights': ('data', None),
+    'export_ml_results': ('data', 'data')
+}
+
+# Training data and split written by prepare_attrition_data
+PREPARED_DATA = ['X', 'y', 'X_train', 'X_test', 'y_train', 'y_test', 'X_train_scaled', 'X_test_scaled',
+                 'groups_train', 'fill_values', 'scaler']
+
+
+def _stage(name, inputs=(), outputs=(), **kwargs):
+    """An analytics stage that records the row counts listed in STAGE_ROWS"""
+    return Stage(name, inputs, outputs, rows=STAGE_ROWS.get(name, (None, None)), **kwargs)
+
+
+# Stage graph of a training run. Clustering only needs the loaded data, so it runs in the
+# stage process pool while the models train (their CV fits use their own worker pool).
+# Feature importance runs here once the models exist, on the same joblib pool as the
+# fits (a pool started in a stage worker would hold up its shutdown). Cache stages are reused from the
+# stage cache while their code, parameters, files read and inputs are unchanged (fitted
+# models are already reused from the model registry).
+ANALYTICS_STAGES = [
+    _stage('load_data', outputs=['data'], required=True, cache=True, params=['columns', 'level'],
+           sources='data_files', code=['hr_io', 'hr_schema']),
+    _stage('prepare_attrition_data', ['data'], PREPARED_DATA, cache=True, params=['group_split']),
+    _stage('train_attrition_models', PREPARED_DATA, ['models', 'scaler', 'model_key'],
+           params=['cv_folds', 'group_split']),
+    _stage('feature_importance_analysis', ['models', 'model_key', 'X', 'X_test', 'X_test_scaled', 'y_test'],
+           cache=True, params=['importance_repeats', 'retrain'], files=['feature_importance.csv'],
+           code=['hr_importance']),
+    _stage('employee_clustering', ['data'], ['data', 'cluster_summary'], worker=True, cache=True,
+           params=['clustering', 'n_clusters', 'k_range', 'recluster'], files=['{cluster_file}'],
+           sources='warm_start_files', code=['hr_clustering']),
+    _stage('attrition_risk_scoring', ['data', 'models', 'X', 'scaler'], ['data', 'risk_ranker'], cache=True,
+           params=['top_k'], files=['{ranking_file}', 'high_risk_employees.csv', 'top_risk_by_department.csv'],
+           code=['hr_risk', 'hr_model_registry']),
+    _stage('create_advanced_insights', ['data']),
+    _stage('export_ml_results', ['data', 'models', 'cluster_summary']),
+    _stage('wait_for_charts', final=True)
+]
+
+
+def _fit_and_score(model, X_train, y_train, X_test, scale=False):
+    """Fit one candidate model on one split and predict the held-out rows (runs in a worker process)"""
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    
+    start = time.perf_counter()
+    if scale:
+        model = make_pipeline(StandardScaler(), model)
+    model.fit(X_train, y_train)
+    y_pred_proba = model.predict_proba(X_test)[:, 1]
+    return model, y_pred_proba, time.perf_counter() - start
+
+
 class HRAdvancedAnalytics:
-    def __init__(self):
+    def __init__(self, columns=None, level='employee', group_split=True, n_jobs=-1, cv_folds=5,
+                 registry_dir='model_registry', retrain=False, profile=False, trace_memory=False,
+                 run_report_file='ml_run_report.json', render_workers=None, clustering='kmeans',
+                 n_clusters=4, k_range=None, recluster=False, cluster_file='cluster_model.json',
+                 top_k=10, ranking_file='risk_ranking.npz', stage_workers=None, cache_dir='stage_cache',
+                 cache_mb=1024, invalidate=(), importance_repeats=5):
+        # Optional subset of processed columns to load (None loads everything)
+        self.columns = columns
+        # 'employee' models one row per employee, 'review' the per-review processed rows
+        self.level = level
+        # Keep all rows of an employee on the same side of the train/test split
+        self.group_split = group_split
+        # Worker processes for model training (-1 uses every core) and cross-validation folds
+        self.n_jobs = n_jobs
+        self.cv_folds = cv_folds
+        self.groups_train = None
+        # Fitted models are reused from the registry unless the data or config changed
+        self.registry = ModelRegistry(registry_dir)
+        self.retrain = retrain
+        self.fill_values = None
         self.data = None
         self.X = None
         self.y = None
@@ -23,15 +114,66 @@ class HRAdvancedAnalytics:
         self.y_train = None
         self.y_test = None
         self.models = {}
-        self.scaler = StandardScaler()
+        self.model_key = None
+        self.scaler = None
+        # Shuffles per feature in the permutation importance of every model
+        self.importance_repeats = importance_repeats
         self.label_encoders = {}
-        
+        # 'kmeans' or 'minibatch' (warm-started from cluster_file); a (min, max) k_range sweeps
+        # the number of clusters instead of using n_clusters
+        self.clustering = clustering
+        self.n_clusters = n_clusters
+        self.k_range = k_range
+        self.recluster = recluster
+        self.cluster_file = cluster_file
+        self.cluster_summary = None
+        # Per-employee risk scores, kept for incremental re-scoring, and the riskiest per department
+        self.top_k = top_k
+        self.ranking_file = ranking_file
+        self.risk_ranker = None
+        # Per-stage timings, written to run_report_file after every run
+        self.profiler = StageProfiler(profile=profile, trace_memory=trace_memory)
+        self.run_report_file = run_report_file
+        # Charts are drawn in background worker processes and skipped when their data is unchanged
+        self.renderer = ChartRenderer(max_workers=render_workers)
+        # Processes that run independent stages concurrently (0 runs them in order)
+        self.stage_workers = default_workers() if stage_workers is None else stage_workers
+        # Outputs of unchanged stages are reused from cache_dir (None disables the cache)
+        self.stage_cache = StageCache(cache_dir, cache_mb, invalidate) if cache_dir else None
+        
+    def data_files(self):
+        """The processed data file (or partitioned dataset) load_data reads"""
+        tables = ['hr_analytics_processed']
+        if self.level == 'employee':
+            tables.insert(0, 'employee_features')
+        for table in tables:
+            fmt = find_table(table)
+            if fmt is not None:
+                return [table_path(table, fmt)]
+        return []
+    
+    def warm_start_files(self):
+        """The saved clusters a mini-batch clustering run starts from"""
+        return [self.cluster_file] if self.clustering == 'minibatch' and not self.recluster else []
+    
     def load_data(self):
         """Load the processed HR data"""
         print("📊 Loading processed HR data...")
         try:
-            self.data = pd.read_csv('hr_analytics_processed.csv')
-            print(f"✅ Data loaded successfully! Shape: {self.data.shape}")
+            table = 'hr_analytics_processed'
+            if self.level == 'employee':
+                if find_table('employee_features') is not None:
+                    table = 'employee_features'
+                else:
+                    print("⚠️ employee_features output not found, falling back to the per-review data")
+            
+            # Prefer the typed columnar copy of the processed data when there is one
+            fmt = find_table(table)
+            if fmt is None:
+                raise FileNotFoundError(f"{table} output not found")
+            # Columnar copies keep the compact load schema, CSV gets its categoricals back
+            self.data = read_table(table, columns=self.columns, fmt=fmt, dtype=category_dtypes())
+            print(f"✅ Data loaded successfully from {table} ({fmt})! Shape: {self.data.shape}")
             return True
         except Exception as e:
             print(f"❌ Error loading data: {e}")
@@ -41,6 +183,8 @@ class HRAdvancedAnalytics:
     def prepare_attrition_data(self):
         """Prepare data for attrition prediction"""
         print("\n🔧 Preparing data for attrition prediction...")
+        from sklearn.model_selection import train_test_split, GroupShuffleSplit
+        from sklearn.preprocessing import StandardScaler
         
         # Select features for attrition prediction
         feature_columns = [
@@ -50,6 +194,8 @@ class HRAdvancedAnalytics:
             'SelfRating', 'ManagerRating', 'PerformanceScore', 'OverallSatisfaction',
             'TrainingUtilization', 'AttritionRisk'
         ]
+        # Latest values and trends of the employee-level feature table
+        feature_columns += [field + suffix for field in TREND_FIELDS for suffix in ['Latest', 'Trend']]
         
         # Filter available columns
         available_features = [col for col in feature_columns if col in self.data.columns]
@@ -57,18 +203,27 @@ class HRAdvancedAnalytics:
         # Prepare features
         self.X = self.data[available_features].copy()
         
-        # Handle missing values
-        self.X = self.X.fillna(self.X.median())
+        # Handle missing values (the medians are kept for scoring new employees)
+        self.fill_values = self.X.median()
+        self.X = self.X.fillna(self.fill_values)
         
         # Prepare target variable
         self.y = (self.data['Attrition'] == 'Yes').astype(int)
         
-        # Split data
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            self.X, self.y, test_size=0.2, random_state=42, stratify=self.y
-        )
+        # Split data (per-review rows are split by employee so none leaks into the test set)
+        if self.group_split and self.data['EmployeeID'].duplicated().any():
+            splitter = GroupShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+            train_idx, test_idx = next(splitter.split(self.X, self.y, groups=self.data['EmployeeID']))
+            self.X_train, self.X_test = self.X.iloc[train_idx], self.X.iloc[test_idx]
+            self.y_train, self.y_test = self.y.iloc[train_idx], self.y.iloc[test_idx]
+            self.groups_train = self.data['EmployeeID'].iloc[train_idx]
+        else:
+            self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
+                self.X, self.y, test_size=0.2, random_state=42, stratify=self.y
+            )
         
         # Scale features
+        self.scaler = StandardScaler()
         self.X_train_scaled = self.scaler.fit_transform(self.X_train)
         self.X_test_scaled = self.scaler.transform(self.X_test)
         
@@ -76,68 +231,162 @@ class HRAdvancedAnalytics:
         print(f"Attrition rate: {self.y.mean():.2%}")
     
     def train_attrition_models(self):
-        """Train multiple models for attrition prediction"""
-        print("\n🤖 Training attrition prediction models...")
-        
-        # Define models
-        models = {
-            'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
-            'Gradient Boosting': GradientBoostingClassifier(random_state=42),
-            'Logistic Regression': LogisticRegression(random_state=42, max_iter=1000)
-        }
-        
-        # Train and evaluate models
-        results = {}
+        """Train multiple models for attrition prediction.
+        
+        The final fit of every candidate model and its cross-validation folds on
+        the training set are scheduled together across a pool of n_jobs worker
+        processes.
+        """
+        print(f"\n🤖 Training attrition prediction models ({self.cv_folds}-fold CV, n_jobs={self.n_jobs})...")
+        from joblib import Parallel, delayed
+        from sklearn.base import clone
+        from sklearn.metrics import roc_auc_score
+        from sklearn.model_selection import StratifiedKFold, StratifiedGroupKFold
+        
+        models = self.candidate_models()
+        scaled = SCALED_MODELS
+        
+        # Reuse the registered models when neither the training data nor the config changed
+        key = self.registry.fingerprint(self.X, self.y, self.model_config())
+        self.model_key = key
+        if not self.retrain and self.registry.has(key):
+            bundle = self.registry.load(key)
+            self.models = bundle['models']
+            self.scaler = bundle['scaler']
+            print(f"♻️ Reusing registered models {key} (training data and config unchanged)")
+            for name, result in self.models.items():
+                print(f"  {name} - Accuracy: {result['accuracy']:.3f}, AUC: {result['auc_score']:.3f}, "
+                      f"CV AUC: {result['cv_auc_mean']:.3f} ± {result['cv_auc_std']:.3f}")
+            return self.models
+        
+        # Cross-validation folds on the training set (by employee for per-review rows)
+        if self.groups_train is not None:
+            splitter = StratifiedGroupKFold(n_splits=self.cv_folds, shuffle=True, random_state=42)
+            folds = list(splitter.split(self.X_train, self.y_train, groups=self.groups_train))
+        else:
+            splitter = StratifiedKFold(n_splits=self.cv_folds, shuffle=True, random_state=42)
+            folds = list(splitter.split(self.X_train, self.y_train))
         
+        # One task per (model, split): the final train/test fit plus every CV fold
+        tasks = []
         for name, model in models.items():
-            print(f"Training {name}...")
-            
-            # Train model
-            if name == 'Logistic Regression':
-                model.fit(self.X_train_scaled, self.y_train)
-                y_pred = model.predict(self.X_test_scaled)
-                y_pred_proba = model.predict_proba(self.X_test_scaled)[:, 1]
+            if name in scaled:
+                tasks.append((name, None, delayed(_fit_and_score)(
+                    clone(model), self.X_train_scaled, self.y_train, self.X_test_scaled
+                )))
             else:
-                model.fit(self.X_train, self.y_train)
-                y_pred = model.predict(self.X_test)
-                y_pred_proba = model.predict_proba(self.X_test)[:, 1]
-            
-            # Calculate metrics
-            auc_score = roc_auc_score(self.y_test, y_pred_proba)
-            accuracy = (y_pred == self.y_test).mean()
-            
-            results[name] = {
-                'model': model,
-                'accuracy': accuracy,
-                'auc_score': auc_score,
-                'y_pred': y_pred,
-                'y_pred_proba': y_pred_proba
-            }
-            
-            print(f"  {name} - Accuracy: {accuracy:.3f}, AUC: {auc_score:.3f}")
+                tasks.append((name, None, delayed(_fit_and_score)(
+                    clone(model), self.X_train, self.y_train, self.X_test
+                )))
+            for fold, (train_idx, test_idx) in enumerate(folds):
+                tasks.append((name, fold, delayed(_fit_and_score)(
+                    clone(model), self.X_train.iloc[train_idx], self.y_train.iloc[train_idx],
+                    self.X_train.iloc[test_idx], scale=name in scaled
+                )))
+        
+        start = time.perf_counter()
+        outputs = Parallel(n_jobs=self.n_jobs)(task for _, _, task in tasks)
+        wall_time = time.perf_counter() - start
+        
+        # Evaluate models
+        results = {name: {'cv_scores': [], 'cv_time': 0.0} for name in models}
+        
+        for (name, fold, _), (model, y_pred_proba, elapsed) in zip(tasks, outputs):
+            if fold is None:
+                # Same decision rule as predict() (ties go to the negative class)
+                y_pred = (y_pred_proba > 0.5).astype(int)
+                results[name].update({
+                    'model': model,
+                    'accuracy': (y_pred == self.y_test).mean(),
+                    'auc_score': roc_auc_score(self.y_test, y_pred_proba),
+                    'y_pred': y_pred,
+                    'y_pred_proba': y_pred_proba,
+                    'fit_time': elapsed
+                })
+            else:
+                test_idx = folds[fold][1]
+                results[name]['cv_scores'].append(roc_auc_score(self.y_train.iloc[test_idx], y_pred_proba))
+                results[name]['cv_time'] += elapsed
+        
+        for name, result in results.items():
+            result['cv_auc_mean'] = float(np.mean(result['cv_scores']))
+            result['cv_auc_std'] = float(np.std(result['cv_scores']))
+            print(f"  {name} - Accuracy: {result['accuracy']:.3f}, AUC: {result['auc_score']:.3f}, "
+                  f"CV AUC: {result['cv_auc_mean']:.3f} ± {result['cv_auc_std']:.3f}, "
+                  f"Fit: {result['fit_time']:.2f}s, CV: {result['cv_time']:.2f}s")
+        
+        task_time = sum(elapsed for _, _, elapsed in outputs)
+        print(f"⏱️ {len(tasks)} fits in {wall_time:.2f}s wall time ({task_time:.2f}s of model time)")
         
         self.models = results
+        self.registry.save(key, {
+            'models': results,
+            'scaler': self.scaler,
+            'scaled': sorted(scaled),
+            'features': list(self.X.columns),
+            'fill_values': self.fill_values,
+            'best_model': max(results, key=lambda name: results[name]['auc_score']),
+            'config': self.model_config()
+        })
+        print(f"💾 Models registered as version {key}")
         return results
     
+    def candidate_models(self):
+        """Candidate attrition models (each task gets one core, the pool provides the parallelism)"""
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+        from sklearn.linear_model import LogisticRegression
+        return {
+            'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=1),
+            'Gradient Boosting': GradientBoostingClassifier(random_state=42),
+            'Logistic Regression': LogisticRegression(random_state=42, max_iter=1000)
+        }
+    
+    def model_config(self):
+        """Hyperparameters and evaluation settings that identify a registered model version"""
+        return {
+            'models': {name: model.get_params() for name, model in self.candidate_models().items()},
+            'scaled': sorted(SCALED_MODELS),
+            'cv_folds': self.cv_folds,
+            'group_split': self.group_split,
+            'test_size': 0.2,
+            'random_state': 42
+        }
+    
     def feature_importance_analysis(self):
-        """Analyze feature importance for attrition prediction"""
-        print("\n📈 Analyzing feature importance...")
-        
-        # Get feature importance from Random Forest
-        rf_model = self.models['Random Forest']['model']
-        feature_importance = pd.DataFrame({
-            'feature': self.X.columns,
-            'importance': rf_model.feature_importances_
-        }).sort_values('importance', ascending=False)
-        
-        # Plot feature importance
-        plt.figure(figsize=(12, 8))
-        sns.barplot(data=feature_importance.head(10), x='importance', y='feature')
-        plt.title('Top 10 Most Important Features for Attrition Prediction')
-        plt.xlabel('Feature Importance')
-        plt.tight_layout()
-        plt.savefig('feature_importance.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        """Permutation importance of every feature for every trained model on the test set.
+        
+        The (model, feature, repeat) evaluations run across a pool of n_jobs
+        worker processes. Importances are stored with the registered model
+        version, so later runs of the same version read them back.
+        """
+        print(f"\n📈 Analyzing permutation feature importance ({self.importance_repeats} repeats)...")
+        
+        path = self.registry.artifact_path(self.model_key, f"permutation_importance_{self.importance_repeats}.csv")
+        if not self.retrain and os.path.exists(path):
+            feature_importance = pd.read_csv(path)
+            print(f"♻️ Reusing the permutation importances of model version {self.model_key}")
+        else:
+            start = time.perf_counter()
+            # Scaled models are evaluated on the scaled test set they were fitted for
+            models = {
+                name: (result['model'], self.X_test_scaled if name in SCALED_MODELS else self.X_test)
+                for name, result in self.models.items()
+            }
+            feature_importance = permutation_importance(models, self.y_test, list(self.X.columns),
+                                                        repeats=self.importance_repeats, n_jobs=self.n_jobs)
+            feature_importance.to_csv(path, index=False)
+            print(f"⏱️ {len(models) * len(self.X.columns) * self.importance_repeats} evaluations "
+                  f"in {time.perf_counter() - start:.2f}s")
+        feature_importance.to_csv('feature_importance.csv', index=False)
+        
+        for name, importance in feature_importance.groupby('model', sort=False):
+            top = ', '.join(f"{row.feature} {row.importance:.3f}" for row in importance.head(3).itertuples())
+            print(f"  {name}: {top}")
+        
+        # Plot the features of the best model (by test AUC)
+        best = max(self.models, key=lambda name: self.models[name]['auc_score'])
+        self.renderer.submit('feature_importance.png', draw_feature_importance,
+                             feature_importance[feature_importance['model'] == best].head(10))
         
         print("✅ Feature importance analysis completed!")
         return feature_importance
@@ -146,25 +395,23 @@ class HRAdvancedAnalytics:
         """Perform employee clustering analysis"""
         print("\n🎯 Performing employee clustering analysis...")
         
-        # Select features for clustering
-        clustering_features = [
-            'Age', 'Salary', 'YearsAtCompany', 'JobSatisfaction',
-            'PerformanceScore', 'OverallSatisfaction', 'WorkLifeBalance'
-        ]
-        
-        # Filter available features
-        available_clustering_features = [col for col in clustering_features if col in self.data.columns]
-        
-        # Prepare clustering data
-        clustering_data = self.data[available_clustering_features].copy()
-        clustering_data = clustering_data.fillna(clustering_data.median())
-        
-        # Scale data
-        clustering_data_scaled = StandardScaler().fit_transform(clustering_data)
-        
-        # Perform K-means clustering
-        kmeans = KMeans(n_clusters=4, random_state=42)
-        clusters = kmeans.fit_predict(clustering_data_scaled)
+        # Pick the number of clusters with a parallel mini-batch sweep when a range is given
+        n_clusters = self.n_clusters
+        sweep = None
+        if self.k_range is not None:
+            n_clusters, sweep = self.select_cluster_count()
+        
+        # Warm-start from the saved centroids and scaler when they match this run
+        clusterer = None if self.recluster else load_clusterer(self.cluster_file, self.clustering)
+        if clusterer is None or clusterer.n_clusters != n_clusters:
+            clusterer = EmployeeClusterer(n_clusters, self.clustering)
+        clusters, clustering_data_scaled = clusterer.fit_predict(self.data)
+        clusterer.save(self.cluster_file)
+        available_clustering_features = clusterer.features
+        self.cluster_summary = {'method': self.clustering, 'n_clusters': n_clusters,
+                                'warm_started': clusterer.warm_started, 'sweep': sweep}
+        started = "warm-started from saved centroids" if clusterer.warm_started else "fitted from scratch"
+        print(f"{self.clustering} clustering with k={n_clusters} ({started})")
         
         # Add cluster labels to data
         self.data['Cluster'] = clusters
@@ -176,24 +423,30 @@ class HRAdvancedAnalytics:
         print("Cluster Analysis:")
         print(cluster_analysis.round(2))
         
-        # Visualize clusters using PCA
+        # Visualize clusters using PCA (of a sample of the employees in large populations)
+        if len(clusters) > PLOT_POINTS:
+            plotted = np.random.default_rng(42).choice(len(clusters), PLOT_POINTS, replace=False)
+            clustering_data_scaled, clusters = clustering_data_scaled[plotted], clusters[plotted]
+        from sklearn.decomposition import PCA
         pca = PCA(n_components=2)
         clustering_data_pca = pca.fit_transform(clustering_data_scaled)
         
-        plt.figure(figsize=(10, 8))
-        scatter = plt.scatter(clustering_data_pca[:, 0], clustering_data_pca[:, 1], 
-                            c=clusters, cmap='viridis', alpha=0.6)
-        plt.colorbar(scatter)
-        plt.title('Employee Clusters (PCA Visualization)')
-        plt.xlabel('Principal Component 1')
-        plt.ylabel('Principal Component 2')
-        plt.tight_layout()
-        plt.savefig('employee_clusters.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        self.renderer.submit('employee_clusters.png', draw_employee_clusters,
+                             {'components': clustering_data_pca, 'clusters': clusters})
         
         print("✅ Employee clustering completed!")
         return cluster_analysis
     
+    def select_cluster_count(self):
+        """Choose the number of clusters in k_range with the best sampled silhouette score"""
+        k_values = range(self.k_range[0], self.k_range[1] + 1)
+        print(f"Sweeping k from {k_values.start} to {k_values.stop - 1}...")
+        sweep = EmployeeClusterer(method='minibatch').select_k(self.data, k_values, n_jobs=self.n_jobs)
+        for result in sweep:
+            print(f"  k={result['k']}: silhouette {result['silhouette']:.3f}, inertia {result['inertia']:.0f}")
+        best = max(sweep, key=lambda result: result['silhouette'])
+        return best['k'], sweep
+    
     def attrition_risk_scoring(self):
         """Create comprehensive attrition risk scoring"""
         print("\n⚠️ Creating attrition risk scoring...")
@@ -203,19 +456,18 @@ class HRAdvancedAnalytics:
         best_model = self.models[best_model_name]['model']
         
         # Predict probabilities for all employees
-        if best_model_name == 'Logistic Regression':
+        if best_model_name in SCALED_MODELS:
             attrition_probs = best_model.predict_proba(self.scaler.transform(self.X))[:, 1]
         else:
             attrition_probs = best_model.predict_proba(self.X)[:, 1]
         
         # Create risk categories
-        risk_categories = pd.cut(attrition_probs, 
-                               bins=[0, 0.2, 0.4, 0.6, 0.8, 1.0],
-                               labels=['Very Low', 'Low', 'Medium', 'High', 'Very High'])
-        
-        # Add to data
         self.data['AttritionProbability'] = attrition_probs
-        self.data['RiskCategory'] = risk_categories
+        self.data['RiskCategory'] = risk_categories(attrition_probs)
+        
+        # One score per employee (their riskiest row), saved for incremental re-scoring
+        self.risk_ranker = RiskRanker(self.data['EmployeeID'], attrition_probs, self.data['Department'])
+        self.risk_ranker.save(self.ranking_file)
         
         # Analyze risk distribution
         risk_analysis = self.data.groupby('RiskCategory').agg({
@@ -231,10 +483,14 @@ class HRAdvancedAnalytics:
         print("Attrition Risk Analysis:")
         print(risk_analysis)
         
-        # Save high-risk employees
-        high_risk_employees = self.data[self.data['RiskCategory'].isin(['High', 'Very High'])].copy()
+        # Save high-risk employees (one row per employee, their riskiest one)
+        riskiest = self.data.iloc[riskiest_rows(self.data['EmployeeID'], attrition_probs)]
+        high_risk_employees = riskiest[riskiest['RiskCategory'].isin(WATCH_TIERS)]
         high_risk_employees.to_csv('high_risk_employees.csv', index=False)
         
+        # The riskiest employees of each department
+        self.risk_ranker.top_k(self.top_k).to_csv('top_risk_by_department.csv', index=False)
+        
         print(f"✅ Risk scoring completed! {len(high_risk_employees)} high-risk employees identified.")
         return risk_analysis
     
@@ -306,59 +562,196 @@ class HRAdvancedAnalytics:
             for name, results in self.models.items():
                 f.write(f"{name}:\n")
                 f.write(f"  Accuracy: {results['accuracy']:.3f}\n")
-                f.write(f"  AUC Score: {results['auc_score']:.3f}\n\n")
+                f.write(f"  AUC Score: {results['auc_score']:.3f}\n")
+                f.write(f"  CV AUC: {results['cv_auc_mean']:.3f} ± {results['cv_auc_std']:.3f} ({self.cv_folds} folds)\n")
+                f.write(f"  Fit Time: {results['fit_time']:.2f}s, CV Time: {results['cv_time']:.2f}s\n\n")
+            
+            if self.cluster_summary is not None:
+                summary = self.cluster_summary
+                f.write("Employee Clustering:\n")
+                f.write(f"  Method: {summary['method']}, k={summary['n_clusters']}"
+                        f"{' (warm-started)' if summary['warm_started'] else ''}\n")
+                for result in summary['sweep'] or []:
+                    f.write(f"  k={result['k']}: silhouette {result['silhouette']:.3f}, inertia {result['inertia']:.0f}\n")
+                f.write("\n")
             
             f.write("Files Created:\n")
             f.write("- attrition_predictions.csv (Individual predictions)\n")
             f.write("- employee_clusters.csv (Cluster assignments)\n")
             f.write("- high_risk_employees.csv (High-risk employee list)\n")
+            f.write(f"- top_risk_by_department.csv (Top {self.top_k} riskiest employees per department)\n")
+            f.write(f"- {self.ranking_file} (Per-employee risk scores for incremental re-scoring)\n")
+            f.write("- feature_importance.csv (Permutation importance of every feature for every model)\n")
             f.write("- feature_importance.png (Feature importance plot)\n")
             f.write("- employee_clusters.png (Cluster visualization)\n")
+            f.write(f"- {self.cluster_file} (Cluster centroids and scaler for warm starts and assignment)\n")
+            f.write(f"- {self.run_report_file} (Stage timings, CPU time, peak memory and row counts)\n")
         
         print("✅ Machine learning results exported!")
         print("📁 Files created:")
         print("  - attrition_predictions.csv")
         print("  - employee_clusters.csv")
         print("  - high_risk_employees.csv")
+        print("  - top_risk_by_department.csv")
         print("  - ml_analysis_report.txt")
+        print(f"  - {self.cluster_file} (Cluster centroids)")
+        print(f"  - {self.run_report_file} (Stage timings)")
+    
+    def wait_for_charts(self):
+        """Wait for the background chart renders to be written and stop the render processes"""
+        for path in self.renderer.close():
+            print(f"🖼️ Chart saved as '{path}'")
+    
+    def run_stage(self, name, *args):
+        """Run one pipeline method as a profiled stage"""
+        return self.profiler.run_stage(self, name, STAGE_ROWS.get(name, (None, None)), *args)
     
+    @profiled_run('advanced_analytics', 'training')
     def run_advanced_analytics(self):
-        """Run the complete advanced analytics pipeline"""
+        """Run the complete advanced analytics pipeline as the ANALYTICS_STAGES graph"""
         print("🚀 Starting HR Advanced Analytics Pipeline")
         print("=" * 50)
         
-        # Load data
-        if not self.load_data():
+        graph = StageGraph(self.profiler, self.stage_cache).add(self, ANALYTICS_STAGES)
+        if not graph.run(workers=self.stage_workers):
             return False
         
-        # Prepare data for ML
-        self.prepare_attrition_data()
-        
-        # Train models
-        self.train_attrition_models()
-        
-        # Feature importance
-        self.feature_importance_analysis()
-        
-        # Clustering
-        self.employee_clustering()
+        print("\n🎉 Advanced analytics pipeline completed successfully!")
+        return True
+    
+    @profiled_run('advanced_analytics', 'scoring')
+    def run_scoring(self, employee_ids=None, input_path=None, output='attrition_scores.csv'):
+        """Score employees with the latest registered model, without loading training data or retraining"""
+        print("⚡ Scoring employees with the registered attrition model")
         
-        # Risk scoring
-        self.attrition_risk_scoring()
+        try:
+            with self.profiler.stage('load_model'):
+                scorer = AttritionScorer(self.registry.load())
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            print("Run hr_advanced_analytics.py once to train and register the models.")
+            return False
         
-        # Advanced insights
-        self.create_advanced_insights()
+        # Employees are also assigned to the saved clusters when there are any (no refitting)
+        clusterer = load_clusterer(self.cluster_file)
         
-        # Export results
-        self.export_ml_results()
+        start = time.perf_counter()
         
-        print("\n🎉 Advanced analytics pipeline completed successfully!")
+        # New or corrected employees come from a CSV, otherwise from the employee feature table
+        with self.profiler.stage('load_employees') as record:
+            if input_path is not None:
+                employees = pd.read_csv(input_path)
+            else:
+                columns = ['EmployeeID', 'Department'] + scorer.features
+                if clusterer is not None:
+                    columns += clusterer.features
+                employees = read_table('employee_features', columns=list(dict.fromkeys(columns)))
+            if employee_ids:
+                employees = employees[employees['EmployeeID'].isin(employee_ids)]
+            record['rows_out'] = len(employees)
+        
+        with self.profiler.stage('score', rows_in=len(employees)) as record:
+            scores = scorer.score(employees)
+            if clusterer is not None:
+                scores['Cluster'] = clusterer.predict(employees)
+            record['rows_out'] = len(scores)
+        
+        # Re-tier only the scored employees in the saved ranking
+        with self.profiler.stage('update_ranking', rows_in=len(scores)) as record:
+            departments = employees['Department'] if 'Department' in employees.columns else None
+            if os.path.exists(self.ranking_file):
+                self.risk_ranker = RiskRanker.load(self.ranking_file)
+                changes = self.risk_ranker.update(scores['EmployeeID'], scores['AttritionProbability'], departments)
+            else:
+                self.risk_ranker = RiskRanker(scores['EmployeeID'], scores['AttritionProbability'], departments)
+                changes = None
+            self.risk_ranker.save(self.ranking_file)
+            self.risk_ranker.top_k(self.top_k).to_csv('top_risk_by_department.csv', index=False)
+            record['rows_out'] = len(self.risk_ranker)
+        elapsed = (time.perf_counter() - start) * 1000
+        scores.to_csv(output, index=False)
+        
+        print(f"✅ Scored {len(scores)} employees with {scorer.model_name} (version {scorer.key}) in {elapsed:.1f} ms")
+        if changes is not None:
+            print(f"🔄 {len(changes)} employees changed risk tier")
+            for change in changes.itertuples(index=False):
+                previous = change.PreviousRiskCategory if pd.notna(change.PreviousRiskCategory) else 'new'
+                print(f"  {change.EmployeeID}: {previous} → {change.RiskCategory}")
+        print(f"📁 Scores saved to {output}, top {self.top_k} per department to top_risk_by_department.csv")
         return True
 
 # Main execution
-if __name__ == "__main__":
+def main(argv=None, prog=None):
+    """Parse the command line (argv, default sys.argv) and run the pipeline; returns whether it succeeded"""
+    parser = argparse.ArgumentParser(prog=prog, description="HR Analytics machine learning pipeline")
+    parser.add_argument('--level', choices=['employee', 'review'], default='employee',
+                        help="model one row per employee (default) or every review row")
+    parser.add_argument('--no-group-split', action='store_true',
+                        help="split review rows at random instead of by employee")
+    parser.add_argument('--n-jobs', type=int, default=-1,
+                        help="worker processes for model training (default: -1, every core)")
+    parser.add_argument('--cv-folds', type=int, default=5,
+                        help="cross-validation folds per model (default: 5)")
+    parser.add_argument('--registry', default='model_registry',
+                        help="model registry directory (default: model_registry)")
+    parser.add_argument('--retrain', action='store_true',
+                        help="retrain even if the registry has models for this data and config")
+    parser.add_argument('--score-only', action='store_true',
+                        help="score employees with the latest registered model without retraining")
+    parser.add_argument('--employees', nargs='+', default=None,
+                        help="EmployeeIDs to score in --score-only mode (default: all)")
+    parser.add_argument('--input', default=None,
+                        help="employee-level CSV to score in --score-only mode (default: employee_features)")
+    parser.add_argument('--profile', action='store_true',
+                        help="capture a cProfile of every stage in ml_run_report.json")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="record the peak Python allocations of every stage with tracemalloc")
+    parser.add_argument('--render-workers', type=int, default=None,
+                        help="chart rendering processes (default: one per core, 0 renders inline)")
+    parser.add_argument('--clustering', choices=CLUSTERING_METHODS, default='kmeans',
+                        help="full KMeans (default) or MiniBatchKMeans warm-started from cluster_model.json")
+    parser.add_argument('--clusters', type=int, default=4,
+                        help="number of employee clusters (default: 4)")
+    parser.add_argument('--select-k', nargs=2, type=int, default=None, metavar=('MIN', 'MAX'),
+                        help="pick the number of clusters in MIN..MAX by a parallel silhouette sweep")
+    parser.add_argument('--top-k', type=int, default=10,
+                        help="riskiest employees per department in top_risk_by_department.csv (default: 10)")
+    parser.add_argument('--recluster', action='store_true',
+                        help="fit the clusters from scratch instead of warm-starting from the saved centroids")
+    parser.add_argument('--importance-repeats', type=int, default=5,
+                        help="shuffles per feature in the permutation importance of every model (default: 5)")
+    parser.add_argument('--stage-workers', type=int, default=None,
+                        help="processes running independent stages (default: one per extra core, 0 runs them in order)")
+    parser.add_argument('--cache-dir', default='stage_cache',
+                        help="stage cache directory (default: stage_cache)")
+    parser.add_argument('--cache-mb', type=int, default=1024,
+                        help="stage cache size limit; least recently used entries are evicted (default: 1024)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="run every stage instead of reusing cached outputs")
+    parser.add_argument('--invalidate', nargs='+', default=[], metavar='STAGE',
+                        help="re-run these stages and everything depending on them ('all' re-runs every stage)")
+    args = parser.parse_args(argv)
+    if args.select_k is not None and not 2 <= args.select_k[0] <= args.select_k[1]:
+        # The silhouette score needs at least two clusters and the sweep at least one candidate
+        parser.error(f"--select-k needs 2 <= MIN <= MAX, got {args.select_k[0]} {args.select_k[1]}")
+    
     # Initialize advanced analytics
-    analytics = HRAdvancedAnalytics()
+    analytics = HRAdvancedAnalytics(level=args.level, group_split=not args.no_group_split,
+                                    n_jobs=args.n_jobs, cv_folds=args.cv_folds,
+                                    registry_dir=args.registry, retrain=args.retrain,
+                                    profile=args.profile, trace_memory=args.trace_memory,
+                                    render_workers=args.render_workers, clustering=args.clustering,
+                                    n_clusters=args.clusters, k_range=args.select_k, recluster=args.recluster,
+                                    top_k=args.top_k, stage_workers=args.stage_workers,
+                                    cache_dir=None if args.no_cache else args.cache_dir,
+                                    cache_mb=args.cache_mb, invalidate=args.invalidate,
+                                    importance_repeats=args.importance_repeats)
+    
+    if args.score_only:
+        success = analytics.run_scoring(employee_ids=args.employees, input_path=args.input)
+        if not success:
+            print("\n❌ Scoring failed.")
+        return success
     
     # Run the advanced analytics pipeline
     success = analytics.run_advanced_analytics()
@@ -367,4 +760,9 @@ if __name__ == "__main__":
         print("\n📊 Advanced analytics completed!")
         print("Check the generated files for detailed insights and predictions.")
     else:
-        print("\n❌ Advanced analytics failed. Please check your data file.") 
\ No newline at end of file
+        print("\n❌ Advanced analytics failed. Please check your data file.")
+    return success
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
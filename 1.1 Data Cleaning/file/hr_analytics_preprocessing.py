@@ -1,34 +1,196 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
+import argparse
+import json
+import os
+import sqlite3
 import warnings
+from hr_io import (OUTPUT_FORMATS, write_tables, read_table, find_table, table_path, TableAppender,
+                   remove_other_copies)
+from hr_streaming import RunningAggregate
+from hr_sketches import QuantileSketch, GroupSketches
+from hr_trends import TrendEngine, TREND_PERIODS
+from hr_employee_features import EmployeeReviewAccumulator
+from hr_features import FeatureTransformer
+from hr_schema import read_source, SOURCE_SCHEMAS
+from hr_dimensions import EmployeeIndex, build_lookups, add_review_labels
+from hr_instrumentation import StageProfiler, profiled_run
+from hr_dag import Stage, StageGraph, default_workers
+from hr_stage_cache import StageCache
+from hr_sharding import ShardDirectory, assign_shards, default_shard_workers, run_shards
+from hr_rendering import ChartRenderer, draw_hr_overview
+from hr_sql import SQLEngine
 warnings.filterwarnings('ignore')
 
 # Set display options
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', None)
 
+# Numeric review columns whose missing values are filled with medians
+REVIEW_NUMERIC_COLUMNS = ['EnvironmentSatisfaction', 'JobSatisfaction', 'RelationshipSatisfaction', 
+                          'TrainingOpportunitiesWithinYear', 'TrainingOpportunitiesTaken', 
+                          'WorkLifeBalance', 'SelfRating', 'ManagerRating']
+
+# Columns aggregated for the summary tables and insights; the flags are encoded
+# once by encode_measures (AttritionFlag is Attrition == 'Yes')
+SUMMARY_VALUES = ['Salary', 'Age', 'JobSatisfaction', 'PerformanceScore', 'WorkLifeBalance', 'OverallSatisfaction']
+SUMMARY_FLAGS = ['AttritionFlag', 'TopPerformer', 'HighlySatisfied']
+SUMMARY_MEASURES = SUMMARY_VALUES + SUMMARY_FLAGS
+
+# Grouping sets served from one aggregate over all of their keys
+# (performance trends are bucketed by period in a TrendEngine instead)
+GROUPING_KEYS = ['Department', 'EducationLevel', 'AgeGroup']
+GROUPING_SETS = {
+    'Department': ['Department'],
+    'EducationLevel': ['EducationLevel'],
+    'AgeGroup': ['AgeGroup']
+}
+
+# Salary percentiles of department_percentiles, estimated from mergeable quantile sketches
+SALARY_PERCENTILES = {'SalaryP10': 0.1, 'SalaryP25': 0.25, 'SalaryMedian': 0.5, 'SalaryP75': 0.75, 'SalaryP90': 0.9}
+
+# Tables whose row counts the run report records going into and out of each stage
+STAGE_ROWS = {
+    'load_data': (None, 'performance_df'),
+    'clean_employee_data': ('employee_df', 'employee_df'),
+    'clean_performance_data': ('performance_df', 'performance_df'),
+    'merge_data': ('performance_df', 'merged_df'),
+    'create_features': ('merged_df', 'merged_df'),
+    'create_employee_features': ('merged_df', 'employee_features_df'),
+    'create_aggregated_tables': ('merged_df', None),
+    'patch_aggregated_tables': ('merged_df', None),
+    'patch_performance_trends': ('merged_df', None),
+    'generate_insights': ('merged_df', None),
+    'create_visualizations': ('employee_df', None),
+    'export_for_powerbi': ('merged_df', 'merged_df'),
+    'export_employee_features': ('employee_features_df', 'employee_features_df'),
+    'export_tables': ('merged_df', 'merged_df'),
+    'run_sql_queries': ('employee_df', None)
+}
+
+# The five source tables (employee and review rows are replaced by their cleaned versions)
+SOURCE_TABLES = ['employee_df', 'education_df', 'performance_df', 'rating_df', 'satisfaction_df']
+
+def _stage(name, inputs=(), outputs=(), **kwargs):
+    """A full-run stage that records the row counts listed in STAGE_ROWS"""
+    return Stage(name, inputs, outputs, rows=STAGE_ROWS.get(name, (None, None)), **kwargs)
+
+# Stage graph of a full run: each stage with the attributes it reads and writes. Worker
+# stages only write files or small results and may run in the stage process pool while
+# the others run in the main process in this order. Cache stages are reused from the
+# stage cache while their code, source files and inputs are unchanged.
+PIPELINE_STAGES = [
+    _stage('load_data', outputs=SOURCE_TABLES + ['lookups'], required=True, cache=True,
+           sources=[f"{name}.csv" for name in SOURCE_SCHEMAS], code=['hr_schema', 'hr_dimensions']),
+    _stage('fingerprint_inputs', ['employee_df', 'performance_df'], result='fingerprints', worker=True),
+    _stage('clean_employee_data', ['employee_df', 'fill_values'], ['employee_df', 'fill_values'], cache=True),
+    _stage('clean_performance_data', ['performance_df', 'fill_values'], ['performance_df', 'fill_values'],
+           cache=True),
+    _stage('merge_data', ['employee_df', 'performance_df', 'lookups'], ['merged_df', 'employee_index'],
+           cache=True, code=['hr_dimensions']),
+    _stage('create_features', ['merged_df', 'transformer'], ['merged_df', 'transformer'],
+           cache=True, code=['hr_features']),
+    _stage('create_employee_features', ['merged_df', 'employee_df', 'lookups', 'transformer'],
+           ['employee_features_df'], cache=True, code=['hr_employee_features', 'hr_features']),
+    _stage('export_employee_features', ['employee_features_df'], worker=True, cache=True,
+           params=['output_formats'], files='employee_feature_files', code=['hr_io']),
+    _stage('create_aggregated_tables', ['merged_df', 'employee_df'], ['aggregates', 'trends', 'sketches'],
+           worker=True),
+    _stage('generate_insights', ['aggregates', 'employee_df'], ['employee_aggregate']),
+    _stage('create_visualizations', ['aggregates', 'employee_df']),
+    _stage('export_tables', ['merged_df', 'employee_df', 'performance_df'], worker=True, cache=True,
+           params=['output_formats', 'partition_by', 'run_report_file', 'sql_database'], files='export_files',
+           code=['hr_io']),
+    _stage('run_sql_queries', SOURCE_TABLES, worker=True),
+    _stage('save_pipeline_state', ['fingerprints', 'fill_values', 'transformer'], cache=True,
+           files=['{state_file}', '{transformer_file}']),
+    _stage('wait_for_charts', final=True)
+]
+
+# Stages of a sharded run once the shard results are merged; the merged aggregates and
+# trends are written as they are instead of being rebuilt from merged_df
+SHARD_MERGE_STAGES = [
+    _stage('write_summary_tables', ['aggregates', 'trends', 'sketches', 'employee_df'], worker=True)
+] + [stage for stage in PIPELINE_STAGES if stage.name in (
+    'export_employee_features', 'generate_insights', 'create_visualizations', 'export_tables',
+    'run_sql_queries', 'save_pipeline_state', 'wait_for_charts'
+)]
+
 class HRAnalyticsPreprocessor:
-    def __init__(self):
+    def __init__(self, state_file='pipeline_state.json', output_formats=('csv',), partition_by=None,
+                 transformer_file='feature_transformer.json', profile=False, trace_memory=False,
+                 run_report_file='pipeline_run_report.json', render_workers=None,
+                 sql_database='hr_analytics.db', stage_workers=None, cache_dir='stage_cache', cache_mb=1024,
+                 invalidate=(), trend_period='month', trend_window=3, trend_file='performance_trends_state.npz'):
         self.employee_df = None
         self.education_df = None
         self.performance_df = None
         self.rating_df = None
         self.satisfaction_df = None
         self.merged_df = None
+        self.employee_features_df = None
+        
+        # Dense array lookups of the reference tables and the EmployeeID index reviews are joined through
+        self.lookups = None
+        self.employee_index = None
+        
+        # Output formats ('csv', 'parquet', 'feather') and partition columns of the main dataset
+        self.output_formats = list(output_formats)
+        self.partition_by = partition_by
+        
+        # Incremental mode state
+        self.state_file = state_file
+        self.fingerprints = None
+        self.fill_values = {}
+        
+        # Feature derivations; the SalaryRange bins are learned once and saved to transformer_file
+        self.transformer = FeatureTransformer()
+        self.transformer_file = transformer_file
+        
+        # Grouping-set aggregates of merged_df and department aggregate of employee_df
+        self.aggregates = None
+        self.employee_aggregate = None
+        
+        # Per-department performance trends bucketed by trend_period, rolled over trend_window
+        # periods; the buckets are saved to trend_file so incremental runs only add the changes
+        if trend_period not in TREND_PERIODS:
+            raise ValueError(f"Unsupported trend period '{trend_period}', expected one of {list(TREND_PERIODS)}")
+        self.trend_period = trend_period
+        self.trend_window = trend_window
+        self.trend_file = trend_file
+        self.trends = None
+        
+        # Per-department salary quantile sketches and distinct reviewed-employee counters
+        self.sketches = None
+        
+        # Per-stage timings, written to run_report_file after every run
+        self.profiler = StageProfiler(profile=profile, trace_memory=trace_memory)
+        self.run_report_file = run_report_file
+        
+        # Charts are drawn in background worker processes and skipped when their data is unchanged
+        self.renderer = ChartRenderer(max_workers=render_workers)
+        
+        # Embedded SQLite database the hranalytics.sql queries are materialized in (None to skip)
+        self.sql_database = sql_database
+        
+        # Processes that run independent stages of a full run concurrently (0 runs them in order)
+        self.stage_workers = default_workers() if stage_workers is None else stage_workers
+        
+        # Outputs of unchanged full-run stages are reused from cache_dir (None disables the cache)
+        self.stage_cache = StageCache(cache_dir, cache_mb, invalidate) if cache_dir else None
         
     def load_data(self):
         """Load all CSV files"""
         print("Loading CSV files...")
         
         try:
-            self.employee_df = pd.read_csv('Employee.csv')
-            self.education_df = pd.read_csv('EducationLevel.csv')
-            self.performance_df = pd.read_csv('PerformanceRating.csv')
-            self.rating_df = pd.read_csv('RatingLevel.csv')
-            self.satisfaction_df = pd.read_csv('SatisfiedLevel.csv')
+            self.employee_df = read_source('Employee')
+            self.education_df = read_source('EducationLevel')
+            self.performance_df = read_source('PerformanceRating')
+            self.rating_df = read_source('RatingLevel')
+            self.satisfaction_df = read_source('SatisfiedLevel')
+            self.build_lookups()
             
             print("✅ All files loaded successfully!")
             print(f"Employee records: {len(self.employee_df)}")
@@ -53,9 +215,12 @@ class HRAnalyticsPreprocessor:
         missing_before = self.employee_df.isnull().sum().sum()
         
         # Fill missing values with appropriate defaults
-        self.employee_df['Gender'].fillna('Unknown', inplace=True)
-        self.employee_df['Age'].fillna(self.employee_df['Age'].median(), inplace=True)
-        self.employee_df['Salary'].fillna(self.employee_df['Salary'].median(), inplace=True)
+        # (medians are kept so incremental runs fill with the same values)
+        self.employee_df['Gender'] = self.employee_df['Gender'].fillna('Unknown')
+        for col in ['Age', 'Salary']:
+            if col not in self.fill_values:
+                self.fill_values[col] = float(self.employee_df[col].median())
+            self.employee_df[col] = self.employee_df[col].fillna(self.fill_values[col])
         
         missing_after = self.employee_df.isnull().sum().sum()
         print(f"Handled {missing_before - missing_after} missing values")
@@ -74,196 +239,260 @@ class HRAnalyticsPreprocessor:
         """Clean and preprocess performance data"""
         print("\n🧹 Cleaning performance data...")
         
-        # Remove duplicates
         initial_count = len(self.performance_df)
-        self.performance_df = self.performance_df.drop_duplicates()
+        self.performance_df = self.clean_review_rows(self.performance_df)
         print(f"Removed {initial_count - len(self.performance_df)} duplicate records")
         
+        print("✅ Performance data cleaned!")
+    
+    def clean_review_rows(self, df):
+        """Deduplicate, parse dates and fill missing values in a block of review rows"""
+        # Remove duplicates
+        df = df.drop_duplicates()
+        
         # Convert ReviewDate to datetime
-        self.performance_df['ReviewDate'] = pd.to_datetime(self.performance_df['ReviewDate'], errors='coerce')
+        df['ReviewDate'] = pd.to_datetime(df['ReviewDate'], errors='coerce')
         
         # Handle missing values
-        numeric_columns = ['EnvironmentSatisfaction', 'JobSatisfaction', 'RelationshipSatisfaction', 
-                          'TrainingOpportunitiesWithinYear', 'TrainingOpportunitiesTaken', 
-                          'WorkLifeBalance', 'SelfRating', 'ManagerRating']
+        for col in REVIEW_NUMERIC_COLUMNS:
+            if col in df.columns:
+                if col not in self.fill_values:
+                    self.fill_values[col] = float(df[col].median())
+                df[col] = df[col].fillna(self.fill_values[col])
         
-        for col in numeric_columns:
-            if col in self.performance_df.columns:
-                self.performance_df[col].fillna(self.performance_df[col].median(), inplace=True)
-        
-        print("✅ Performance data cleaned!")
+        return df
     
     def merge_data(self):
         """Merge all datasets"""
         print("\n🔗 Merging datasets...")
         
-        # Merge employee with education
-        self.merged_df = self.employee_df.merge(
-            self.education_df, 
-            left_on='Education', 
-            right_on='EducationLevelID', 
-            how='left'
-        )
+        # Employees with their education level, indexed by EmployeeID once
+        self.employee_index = EmployeeIndex(self.employee_lookup())
         
-        # Merge with performance data
-        self.merged_df = self.merged_df.merge(
-            self.performance_df, 
-            on='EmployeeID', 
-            how='left'
-        )
+        # Join the performance data through the index and label the ratings
+        self.merged_df = self.employee_index.join(self.performance_df, how='left')
+        self.merged_df = add_review_labels(self.merged_df, self.lookups)
         
         print(f"✅ Merged dataset created with {len(self.merged_df)} records")
     
+    def build_lookups(self):
+        """Build the dense array lookups of the education, rating and satisfaction tables"""
+        self.lookups = build_lookups({
+            'EducationLevel': self.education_df,
+            'RatingLevel': self.rating_df,
+            'SatisfiedLevel': self.satisfaction_df
+        })
+    
+    def employee_lookup(self):
+        """Join the cleaned employees with their education level (one row per employee)"""
+        return self.lookups['EducationLevel'].join(self.employee_df, 'Education')
+    
     def create_features(self):
         """Create new features for analysis"""
         print("\n🔧 Creating new features...")
         
-        # Age groups
-        self.merged_df['AgeGroup'] = pd.cut(
-            self.merged_df['Age'], 
-            bins=[0, 30, 40, 50, 100], 
-            labels=['Under 30', '30-40', '40-50', 'Over 50']
-        )
-        
-        # Salary ranges
-        self.merged_df['SalaryRange'] = pd.cut(
-            self.merged_df['Salary'], 
-            bins=5, 
-            labels=['Low', 'Below Average', 'Average', 'Above Average', 'High']
-        )
+        # Salary bin edges are learned once and reused by incremental and streaming runs
+        if not self.transformer.fitted:
+            self.transformer.fit(self.merged_df['Salary'])
         
-        # Performance score (average of self and manager rating)
-        self.merged_df['PerformanceScore'] = (
-            self.merged_df['SelfRating'] + self.merged_df['ManagerRating']
-        ) / 2
+        self.merged_df = self.derive_features(self.merged_df)
         
-        # Overall satisfaction score
-        satisfaction_cols = ['JobSatisfaction', 'EnvironmentSatisfaction', 'RelationshipSatisfaction']
-        self.merged_df['OverallSatisfaction'] = self.merged_df[satisfaction_cols].mean(axis=1)
-        
-        # Training utilization rate
-        self.merged_df['TrainingUtilization'] = np.where(
-            self.merged_df['TrainingOpportunitiesWithinYear'] > 0,
-            self.merged_df['TrainingOpportunitiesTaken'] / self.merged_df['TrainingOpportunitiesWithinYear'],
-            0
-        )
+        print("✅ New features created!")
+    
+    def derive_features(self, df):
+        """Add the derived feature columns to a block of merged rows.
+        
+        Age groups, salary ranges, performance scores, overall satisfaction,
+        training utilization, tenure and performance categories and attrition
+        risk are computed in one vectorized pass by the FeatureTransformer.
+        """
+        return self.transformer.transform(df)
+    
+    def create_employee_features(self, accumulator=None):
+        """Build the employee-level feature table (one row per EmployeeID).
         
-        # Tenure categories
-        self.merged_df['TenureCategory'] = pd.cut(
-            self.merged_df['YearsAtCompany'], 
-            bins=[0, 2, 5, 10, 100], 
-            labels=['New', 'Early Career', 'Mid Career', 'Long Term']
-        )
+        Each rating and satisfaction field is summarised over the employee's
+        reviews by its mean (under the field's own name), its latest value
+        (<Field>Latest) and its trend per year (<Field>Trend).
+        """
+        print("\n👤 Creating employee-level features...")
         
-        # Performance categories
-        self.merged_df['PerformanceCategory'] = pd.cut(
-            self.merged_df['PerformanceScore'], 
-            bins=[0, 2, 3, 4, 5], 
-            labels=['Needs Improvement', 'Meets Expectations', 'Exceeds Expectations', 'Outstanding']
-        )
+        if accumulator is None:
+            accumulator = EmployeeReviewAccumulator().update(self.merged_df)
+        self.employee_features_df = accumulator.result(self.employee_static())
         
-        # Risk score for attrition
-        self.merged_df['AttritionRisk'] = (
-            (5 - self.merged_df['JobSatisfaction']) * 0.3 +
-            (5 - self.merged_df['WorkLifeBalance']) * 0.2 +
-            (5 - self.merged_df['OverallSatisfaction']) * 0.3 +
-            (self.merged_df['YearsAtCompany'] < 2) * 0.2
+        print(f"✅ Employee feature table created with {len(self.employee_features_df)} employees!")
+        return self.employee_features_df
+    
+    def employee_static(self):
+        """Employee attributes and the derived features that do not depend on reviews"""
+        employees = self.employee_lookup()
+        return employees.assign(
+            AgeGroup=self.transformer.categorize('AgeGroup', employees['Age']),
+            SalaryRange=self.transformer.categorize('SalaryRange', employees['Salary']),
+            TenureCategory=self.transformer.categorize('TenureCategory', employees['YearsAtCompany'])
         )
-        
-        print("✅ New features created!")
     
     def create_aggregated_tables(self):
         """Create aggregated tables for Power BI"""
         print("\n📊 Creating aggregated tables...")
         
-        # Department summary
-        dept_summary = self.merged_df.groupby('Department').agg({
-            'EmployeeID': 'count',
-            'Salary': ['mean', 'min', 'max'],
-            'Age': 'mean',
-            'JobSatisfaction': 'mean',
-            'PerformanceScore': 'mean',
-            'Attrition': lambda x: (x == 'Yes').sum(),
-            'WorkLifeBalance': 'mean'
-        }).round(2)
-        
-        dept_summary.columns = ['EmployeeCount', 'AvgSalary', 'MinSalary', 'MaxSalary', 
-                               'AvgAge', 'AvgJobSatisfaction', 'AvgPerformance', 
-                               'AttritionCount', 'AvgWorkLifeBalance']
-        dept_summary['AttritionRate'] = (dept_summary['AttritionCount'] / dept_summary['EmployeeCount'] * 100).round(2)
-        
-        # Education level analysis
-        education_summary = self.merged_df.groupby('EducationLevel').agg({
-            'EmployeeID': 'count',
-            'Salary': 'mean',
-            'PerformanceScore': 'mean',
-            'JobSatisfaction': 'mean',
-            'Attrition': lambda x: (x == 'Yes').sum()
-        }).round(2)
-        
-        education_summary.columns = ['EmployeeCount', 'AvgSalary', 'AvgPerformance', 
-                                   'AvgJobSatisfaction', 'AttritionCount']
-        education_summary['AttritionRate'] = (education_summary['AttritionCount'] / education_summary['EmployeeCount'] * 100).round(2)
-        
-        # Age group analysis
-        age_summary = self.merged_df.groupby('AgeGroup').agg({
-            'EmployeeID': 'count',
-            'Salary': 'mean',
-            'PerformanceScore': 'mean',
-            'JobSatisfaction': 'mean',
-            'Attrition': lambda x: (x == 'Yes').sum()
-        }).round(2)
-        
-        age_summary.columns = ['EmployeeCount', 'AvgSalary', 'AvgPerformance', 
-                              'AvgJobSatisfaction', 'AttritionCount']
-        age_summary['AttritionRate'] = (age_summary['AttritionCount'] / age_summary['EmployeeCount'] * 100).round(2)
-        
-        # Performance trends over time
-        performance_trends = self.merged_df.groupby(['Department', 'ReviewDate']).agg({
-            'PerformanceScore': 'mean',
-            'JobSatisfaction': 'mean',
-            'EmployeeID': 'count'
-        }).reset_index()
+        self.build_aggregates()
+        self.build_trends()
+        self.build_sketches()
+        return self.write_summary_tables()
+    
+    def write_summary_tables(self):
+        """Write the summary, trend and percentile tables of the built aggregates, trend buckets and sketches"""
+        dept_summary, education_summary, age_summary = self.summary_tables(self.aggregates)
+        performance_trends = self.trends.table()
         
         # Save aggregated tables
-        dept_summary.to_csv('department_summary.csv', index=True)
-        education_summary.to_csv('education_summary.csv', index=True)
-        age_summary.to_csv('age_summary.csv', index=True)
-        performance_trends.to_csv('performance_trends.csv', index=False)
+        self.write_output(dept_summary, 'department_summary', index=True)
+        self.write_output(education_summary, 'education_summary', index=True)
+        self.write_output(age_summary, 'age_summary', index=True)
+        self.write_output(performance_trends, 'performance_trends')
+        self.write_output(self.department_percentiles(self.sketches), 'department_percentiles', index=True)
+        self.trends.save(self.trend_file)
         
         print("✅ Aggregated tables created and saved!")
         
         return dept_summary, education_summary, age_summary, performance_trends
     
+    def encode_measures(self, df):
+        """Select the grouping keys and measures of merged rows, encoding the flag columns once"""
+        measures = df[GROUPING_KEYS + SUMMARY_VALUES]
+        return measures.assign(
+            AttritionFlag=(df['Attrition'] == 'Yes').astype('int8'),
+            TopPerformer=(df['PerformanceScore'] >= 4).astype('int8'),
+            HighlySatisfied=(df['OverallSatisfaction'] >= 4).astype('int8')
+        )
+    
+    def summary_aggregate(self, df):
+        """Aggregate merged rows over all grouping keys in a single vectorized pass"""
+        return RunningAggregate(
+            GROUPING_KEYS, SUMMARY_MEASURES, dropna=False, extrema=['Salary']
+        ).update(self.encode_measures(df))
+    
+    def build_aggregates(self, base=None):
+        """Roll the summary aggregate up to every grouping set ('All' keeps the finest grain)"""
+        if base is None:
+            base = self.summary_aggregate(self.merged_df)
+        self.aggregates = base.grouping_sets(GROUPING_SETS)
+        self.aggregates['All'] = base
+        return self.aggregates
+    
+    def build_trends(self):
+        """Bucket the reviews of merged_df into per-department trend periods"""
+        self.trends = TrendEngine(self.trend_period, self.trend_window)
+        self.trends.update(self.merged_df)
+        return self.trends
+    
+    def new_sketches(self):
+        """Empty per-department salary quantile sketches and reviewed-employee counters"""
+        return {
+            'salaries': GroupSketches('Department', quantiles=['Salary']),
+            'reviewed': GroupSketches('Department', distinct=['EmployeeID'])
+        }
+    
+    def build_sketches(self, employees=None, merged=None):
+        """Sketch the salaries (one per employee) and count the reviewed employees of every department"""
+        employees = self.employee_df if employees is None else employees
+        merged = self.merged_df if merged is None else merged
+        self.sketches = self.new_sketches()
+        self.sketches['salaries'].update(employees)
+        self.sketches['reviewed'].update(self.reviewed_rows(merged))
+        return self.sketches
+    
+    def reviewed_rows(self, df):
+        """Merged rows that are reviews (not employees without any review)"""
+        return df[df['PerformanceID'].notna()]
+    
+    def department_percentiles(self, sketches):
+        """Salary percentiles and reviewed-employee counts per department, estimated from the sketches"""
+        percentiles = sketches['salaries'].quantiles('Salary', list(SALARY_PERCENTILES.values()))
+        percentiles.columns = list(SALARY_PERCENTILES)
+        reviewed = sketches['reviewed'].distinct('EmployeeID').rename('ReviewedEmployees')
+        table = pd.concat([reviewed, percentiles], axis=1).sort_index()
+        table['ReviewedEmployees'] = table['ReviewedEmployees'].fillna(0).astype('int64')
+        return table.round(2)
+    
+    def build_employee_aggregate(self):
+        """Aggregate the cleaned employee table by department (one row per employee)"""
+        employees = self.employee_df[['Department', 'Salary', 'Age']].assign(
+            AttritionFlag=(self.employee_df['Attrition'] == 'Yes').astype('int8')
+        )
+        self.employee_aggregate = RunningAggregate(
+            ['Department'], ['Salary', 'Age', 'AttritionFlag'], extrema=[]
+        ).update(employees)
+        return self.employee_aggregate
+    
+    def summary_tables(self, aggregates):
+        """Build the department, education and age summary tables from grouping-set aggregates"""
+        def group_summary(agg, columns):
+            summary = pd.DataFrame({
+                'EmployeeCount': agg.rows,
+                'AvgSalary': agg.mean('Salary'),
+                'MinSalary': agg.min('Salary'),
+                'MaxSalary': agg.max('Salary'),
+                'AvgAge': agg.mean('Age'),
+                'AvgJobSatisfaction': agg.mean('JobSatisfaction'),
+                'AvgPerformance': agg.mean('PerformanceScore'),
+                'AttritionCount': agg.sum('AttritionFlag').astype('int64'),
+                'AvgWorkLifeBalance': agg.mean('WorkLifeBalance')
+            })[columns].sort_index().round(2)
+            summary['AttritionRate'] = (summary['AttritionCount'] / summary['EmployeeCount'] * 100).round(2)
+            return summary
+        
+        dept_summary = group_summary(aggregates['Department'], [
+            'EmployeeCount', 'AvgSalary', 'MinSalary', 'MaxSalary', 'AvgAge',
+            'AvgJobSatisfaction', 'AvgPerformance', 'AttritionCount', 'AvgWorkLifeBalance'
+        ])
+        for col in ['MinSalary', 'MaxSalary']:
+            dept_summary[col] = dept_summary[col].astype(self.employee_df['Salary'].dtype)
+        group_columns = ['EmployeeCount', 'AvgSalary', 'AvgPerformance', 'AvgJobSatisfaction', 'AttritionCount']
+        education_summary = group_summary(aggregates['EducationLevel'], group_columns)
+        age_summary = group_summary(aggregates['AgeGroup'], group_columns)
+        
+        return dept_summary, education_summary, age_summary
+    
     def generate_insights(self):
         """Generate key insights and statistics"""
         print("\n📈 Generating insights...")
         
         insights = {}
         
+        # Served from the aggregates built once for the summary tables
+        if self.aggregates is None:
+            self.build_aggregates()
+        if self.employee_aggregate is None:
+            self.build_employee_aggregate()
+        
         # Overall statistics
-        insights['total_employees'] = len(self.employee_df)
-        insights['attrition_rate'] = (self.employee_df['Attrition'] == 'Yes').mean() * 100
-        insights['avg_salary'] = self.employee_df['Salary'].mean()
-        insights['avg_age'] = self.employee_df['Age'].mean()
+        employees = self.employee_aggregate.totals()
+        insights['total_employees'] = employees['rows']
+        insights['attrition_rate'] = employees['sum']['AttritionFlag'] / employees['rows'] * 100
+        insights['avg_salary'] = employees['sum']['Salary'] / employees['count']['Salary']
+        insights['avg_age'] = employees['sum']['Age'] / employees['count']['Age']
         
         # Department insights
-        dept_attrition = self.employee_df.groupby('Department')['Attrition'].apply(
-            lambda x: (x == 'Yes').mean() * 100
+        dept_attrition = (
+            self.employee_aggregate.sum('AttritionFlag') / self.employee_aggregate.rows * 100
         ).sort_values(ascending=False)
         
         insights['highest_attrition_dept'] = dept_attrition.index[0]
         insights['highest_attrition_rate'] = dept_attrition.iloc[0]
         
-        # Performance insights
-        if 'PerformanceScore' in self.merged_df.columns:
-            insights['avg_performance'] = self.merged_df['PerformanceScore'].mean()
-            insights['top_performers'] = (self.merged_df['PerformanceScore'] >= 4).sum()
+        # Performance and satisfaction insights
+        reviews = self.aggregates['All'].totals()
         
-        # Satisfaction insights
-        if 'OverallSatisfaction' in self.merged_df.columns:
-            insights['avg_satisfaction'] = self.merged_df['OverallSatisfaction'].mean()
-            insights['highly_satisfied'] = (self.merged_df['OverallSatisfaction'] >= 4).sum()
+        if reviews['count']['PerformanceScore'] > 0:
+            insights['avg_performance'] = reviews['sum']['PerformanceScore'] / reviews['count']['PerformanceScore']
+            insights['top_performers'] = int(reviews['sum']['TopPerformer'])
+        
+        if reviews['count']['OverallSatisfaction'] > 0:
+            insights['avg_satisfaction'] = reviews['sum']['OverallSatisfaction'] / reviews['count']['OverallSatisfaction']
+            insights['highly_satisfied'] = int(reviews['sum']['HighlySatisfied'])
         
         print("Key Insights:")
         for key, value in insights.items():
@@ -275,128 +504,800 @@ class HRAnalyticsPreprocessor:
         return insights
     
     def create_visualizations(self):
-        """Create basic visualizations"""
+        """Queue the overview charts for background rendering"""
         print("\n📊 Creating visualizations...")
         
-        # Set style
-        try:
-            plt.style.use('seaborn-v0_8')
-        except:
-            plt.style.use('default')
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        
-        # 1. Attrition by Department
-        attrition_by_dept = self.employee_df.groupby('Department')['Attrition'].apply(
-            lambda x: (x == 'Yes').sum()
-        )
-        attrition_by_dept.plot(kind='bar', ax=axes[0,0], title='Attrition by Department')
-        axes[0,0].set_ylabel('Number of Attritions')
-        axes[0,0].tick_params(axis='x', rotation=45)
-        
-        # 2. Salary Distribution
-        self.employee_df['Salary'].hist(bins=30, ax=axes[0,1])
-        axes[0,1].set_title('Salary Distribution')
-        axes[0,1].set_xlabel('Salary')
-        axes[0,1].set_ylabel('Frequency')
-        
-        # 3. Age Distribution
-        self.employee_df['Age'].hist(bins=20, ax=axes[1,0])
-        axes[1,0].set_title('Age Distribution')
-        axes[1,0].set_xlabel('Age')
-        axes[1,0].set_ylabel('Frequency')
-        
-        # 4. Education Level Distribution
-        if 'EducationLevel' in self.merged_df.columns:
-            self.merged_df['EducationLevel'].value_counts().plot(
-                kind='pie', ax=axes[1,1], title='Education Level Distribution'
-            )
-        
-        plt.tight_layout()
-        plt.savefig('hr_analytics_overview.png', dpi=300, bbox_inches='tight')
-        plt.show()
-        
-        print("✅ Visualizations saved as 'hr_analytics_overview.png'")
+        if self.aggregates is None:
+            self.build_aggregates()
+        if self.employee_aggregate is None:
+            self.build_employee_aggregate()
+        
+        overview = {
+            'attrition_by_dept': self.employee_aggregate.sum('AttritionFlag').astype('int64'),
+            'salary': self.employee_df['Salary'],
+            'age': self.employee_df['Age'],
+            'education_counts': self.aggregates['EducationLevel'].rows.sort_values(ascending=False)
+        }
+        if self.renderer.submit('hr_analytics_overview.png', draw_hr_overview, overview):
+            print("✅ Rendering 'hr_analytics_overview.png' in the background")
+        else:
+            print("✅ 'hr_analytics_overview.png' is up to date, skipped")
+    
+    def wait_for_charts(self):
+        """Wait for the background chart renders to be written and stop the render processes"""
+        for path in self.renderer.close():
+            print(f"🖼️ Visualizations saved as '{path}'")
+    
+    def write_output(self, df, name, index=False, partition_by=None):
+        """Write an output table in every configured output format (and only those)"""
+        write_tables(df, name, self.output_formats, index=index, partition_by=partition_by)
     
     def export_for_powerbi(self):
         """Export processed data for Power BI"""
+        self.export_employee_features()
+        self.export_tables()
+    
+    def table_files(self, names):
+        """The paths of these tables in every format (write_output removes the ones it does not write)"""
+        # Declaring them all lets a cached stage also remove copies left in other formats
+        return [table_path(name, fmt) for name in names for fmt in OUTPUT_FORMATS]
+    
+    def employee_feature_files(self):
+        return self.table_files(['employee_features'])
+    
+    def export_files(self):
+        return self.table_files(['hr_analytics_processed', 'employee_cleaned', 'performance_cleaned']) + [
+            'data_processing_report.txt']
+    
+    def export_employee_features(self):
+        """Export the employee-level feature table used for modelling"""
+        self.write_output(self.employee_features_df, 'employee_features')
+    
+    def export_tables(self):
+        """Export the main dataset, the cleaned tables and the processing report"""
         print("\n💾 Exporting data for Power BI...")
         
         # Export main merged dataset
-        self.merged_df.to_csv('hr_analytics_processed.csv', index=False)
+        self.write_output(self.merged_df, 'hr_analytics_processed', partition_by=self.partition_by)
         
         # Export individual cleaned datasets
-        self.employee_df.to_csv('employee_cleaned.csv', index=False)
-        self.performance_df.to_csv('performance_cleaned.csv', index=False)
+        self.write_output(self.employee_df, 'employee_cleaned')
+        self.write_output(self.performance_df, 'performance_cleaned')
         
         # Create a summary report
+        extensions = self.write_processing_report(len(self.performance_df))
+        
+        print("✅ Data exported for Power BI!")
+        print("📁 Files created:")
+        print(f"  - hr_analytics_processed{extensions} (Main dataset)")
+        print(f"  - employee_cleaned{extensions}")
+        print(f"  - performance_cleaned{extensions}")
+        print(f"  - employee_features{extensions} (One row per employee)")
+        print("  - Various summary tables")
+        print("  - data_processing_report.txt")
+        print(f"  - {self.run_report_file} (Stage timings)")
+        if self.sql_database:
+            print(f"  - {self.sql_database} (SQL tables and materialized hranalytics.sql queries)")
+    
+    def write_processing_report(self, performance_count):
+        """Write data_processing_report.txt and return the output file extensions"""
+        extensions = '/'.join(OUTPUT_FORMATS[fmt] for fmt in self.output_formats)
+        
         with open('data_processing_report.txt', 'w') as f:
             f.write("HR Analytics Data Processing Report\n")
             f.write("=" * 40 + "\n\n")
             f.write(f"Total Employees: {len(self.employee_df)}\n")
-            f.write(f"Total Performance Records: {len(self.performance_df)}\n")
-            f.write(f"Data Processing Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            f.write(f"Total Performance Records: {performance_count}\n")
+            f.write(f"Data Processing Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"Output Formats: {', '.join(self.output_formats)}\n\n")
             
             f.write("Files Created:\n")
-            f.write("- hr_analytics_processed.csv (Main dataset for Power BI)\n")
-            f.write("- employee_cleaned.csv (Cleaned employee data)\n")
-            f.write("- performance_cleaned.csv (Cleaned performance data)\n")
-            f.write("- department_summary.csv (Department aggregations)\n")
-            f.write("- education_summary.csv (Education level analysis)\n")
-            f.write("- age_summary.csv (Age group analysis)\n")
-            f.write("- performance_trends.csv (Performance trends)\n")
+            f.write(f"- hr_analytics_processed{extensions} (Main dataset for Power BI)\n")
+            f.write(f"- employee_cleaned{extensions} (Cleaned employee data)\n")
+            f.write(f"- performance_cleaned{extensions} (Cleaned performance data)\n")
+            f.write(f"- employee_features{extensions} (Employee-level features for modelling)\n")
+            f.write(f"- department_summary{extensions} (Department aggregations)\n")
+            f.write(f"- education_summary{extensions} (Education level analysis)\n")
+            f.write(f"- age_summary{extensions} (Age group analysis)\n")
+            f.write(f"- performance_trends{extensions} (Rolling and cumulative performance trends by department)\n")
+            f.write(f"- department_percentiles{extensions} (Salary percentiles and reviewed employees by department)\n")
+            f.write(f"- {self.run_report_file} (Stage timings, CPU time, peak memory and row counts)\n")
+            if self.sql_database:
+                f.write(f"- {self.sql_database} (SQLite tables and the materialized hranalytics.sql queries)\n")
+        
+        return extensions
+    
+    def run_sql_queries(self):
+        """Load the cleaned tables into the embedded SQL database and materialize the hranalytics.sql queries"""
+        if self.sql_database is None:
+            return
+        print("\n🗄️ Running SQL analysis queries...")
+        
+        performance = self.performance_df
+        if performance is None:
+            # Streaming runs do not keep the reviews in memory
+            performance = read_table('performance_cleaned', parse_dates=['ReviewDate'])
+        
+        engine = SQLEngine(self.sql_database)
+        try:
+            engine.load_tables({
+                'Employee': self.employee_df,
+                'PerformanceRating': performance,
+                'EducationLevel': self.education_df,
+                'RatingLevel': self.rating_df,
+                'SatisfiedLevel': self.satisfaction_df
+            })
+            results = engine.run_queries()
+        except (OSError, sqlite3.Error) as e:
+            print(f"❌ Error running SQL queries: {e}")
+            return
+        finally:
+            engine.close()
+        
+        sources = pd.Series([result['source'] for result in results.values()]).value_counts()
+        print(f"🔄 Materialized views refreshed for {engine.refreshed_departments} departments")
+        print(f"✅ {len(results)} queries materialized in {self.sql_database} "
+              f"({sources.get('view', 0)} from views, {sources.get('query', 0)} re-run, "
+              f"{sources.get('cached', 0)} unchanged)")
+    
+    def fingerprint_inputs(self, hashes=None):
+        """Fingerprint raw employee and review rows by EmployeeID / PerformanceID"""
+        employees, reviews = self.row_hashes() if hashes is None else hashes
+        
+        return {
+            'employees': dict(zip(employees['EmployeeID'], employees['RowHash'].tolist())),
+            'reviews': {
+                review_id: [row_hash, employee_id]
+                for review_id, employee_id, row_hash in zip(
+                    reviews['PerformanceID'],
+                    reviews['EmployeeID'],
+                    reviews['RowHash'].tolist()
+                )
+            }
+        }
+    
+    def row_hashes(self):
+        """The hash of every raw employee and review row, next to its EmployeeID / PerformanceID"""
+        employees = pd.DataFrame({
+            'EmployeeID': self.employee_df['EmployeeID'],
+            'RowHash': pd.util.hash_pandas_object(self.employee_df, index=False)
+        })
+        reviews = pd.DataFrame({
+            'PerformanceID': self.performance_df['PerformanceID'],
+            'EmployeeID': self.performance_df['EmployeeID'],
+            'RowHash': pd.util.hash_pandas_object(self.performance_df, index=False)
+        })
+        return employees, reviews
+    
+    def load_pipeline_state(self):
+        """Load the persisted state of the last run (None if there is no usable state)"""
+        if not os.path.exists(self.state_file):
+            return None
         
-        print("✅ Data exported for Power BI!")
-        print("📁 Files created:")
-        print("  - hr_analytics_processed.csv (Main dataset)")
-        print("  - employee_cleaned.csv")
-        print("  - performance_cleaned.csv")
-        print("  - Various summary tables")
-        print("  - data_processing_report.txt")
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable pipeline state: {e}")
+            return None
     
-    def run_full_pipeline(self):
-        """Run the complete data processing pipeline"""
-        print("🚀 Starting HR Analytics Data Processing Pipeline")
+    def save_pipeline_state(self):
+        """Persist input fingerprints, fill values and the fitted feature transformer for the next run"""
+        state = {
+            'fingerprints': self.fingerprints,
+            'fill_values': self.fill_values
+        }
+        with open(self.state_file, 'w') as f:
+            json.dump(state, f)
+        self.transformer.save(self.transformer_file)
+    
+    def find_affected_employees(self, state):
+        """Return the EmployeeIDs whose own row or any of whose reviews changed"""
+        old_employees = state['fingerprints']['employees']
+        new_employees = self.fingerprints['employees']
+        old_reviews = state['fingerprints']['reviews']
+        new_reviews = self.fingerprints['reviews']
+        
+        # New, changed and removed employees
+        affected = {emp_id for emp_id, row_hash in new_employees.items() if old_employees.get(emp_id) != row_hash}
+        affected |= set(old_employees) - set(new_employees)
+        
+        # Employees owning new, changed or removed reviews
+        for review_id, (row_hash, emp_id) in new_reviews.items():
+            old = old_reviews.get(review_id)
+            if old is None or old[0] != row_hash:
+                affected.add(emp_id)
+                if old is not None:
+                    affected.add(old[1])
+        for review_id in set(old_reviews) - set(new_reviews):
+            affected.add(old_reviews[review_id][1])
+        
+        return affected
+    
+    def _patch_rows(self, previous, updated, affected, key, order):
+        """Replace the rows of affected employees in previous, keeping the input row order"""
+        return self._in_order([previous[~previous['EmployeeID'].isin(affected)], updated], key, order)
+    
+    def _in_order(self, parts, key, order):
+        """Concatenate row blocks and sort them by the position of their key in order (stable)"""
+        rows = pd.concat(parts, ignore_index=True)
+        positions = order.get_indexer(rows[key])
+        return rows.iloc[np.argsort(positions, kind='stable')].reset_index(drop=True)
+    
+    def patch_aggregated_tables(self, touched):
+        """Recompute only the summary rows for groups that contain changed employees"""
+        print("\n📊 Patching aggregated tables...")
+        
+        departments = set(touched['Department'].dropna())
+        education_levels = set(touched['EducationLevel'].dropna())
+        age_groups = set(touched['AgeGroup'].dropna().astype(str))
+        
+        # Every row of a touched group is needed to recompute that group
+        df = self.merged_df
+        subset = df[
+            df['Department'].isin(departments) |
+            df['EducationLevel'].isin(education_levels) |
+            df['AgeGroup'].astype(str).isin(age_groups)
+        ]
+        aggregates = self.summary_aggregate(subset).grouping_sets(GROUPING_SETS)
+        dept_summary, education_summary, age_summary = self.summary_tables(aggregates)
+        
+        def splice(name, fresh, groups, order=None):
+            previous = read_table(name)
+            previous = previous.set_index(previous.columns[0])
+            fresh = fresh.copy()
+            fresh.index = fresh.index.astype(str)
+            fresh = fresh[fresh.index.isin(groups)]
+            patched = pd.concat([previous[~previous.index.isin(groups)], fresh])
+            if order is None:
+                patched = patched.sort_index()
+            else:
+                patched = patched.reindex([label for label in order if label in patched.index])
+            self.write_output(patched, name, index=True)
+        
+        splice('department_summary', dept_summary, departments)
+        splice('education_summary', education_summary, education_levels)
+        splice('age_summary', age_summary, age_groups, order=['Under 30', '30-40', '40-50', 'Over 50'])
+        
+        # Percentiles of the touched departments, from sketches of their rows only
+        sketches = self.build_sketches(self.employee_df[self.employee_df['Department'].isin(departments)],
+                                       df[df['Department'].isin(departments)])
+        splice('department_percentiles', self.department_percentiles(sketches), departments)
+        
+        print(f"✅ Patched {len(departments)} departments, {len(education_levels)} education levels "
+              f"and {len(age_groups)} age groups!")
+    
+    def patch_performance_trends(self, removed, added):
+        """Move the changed reviews between trend buckets and rewrite only the trailing trend periods"""
+        print("\n📈 Patching performance trends...")
+        
+        trends = TrendEngine.load(self.trend_file) if os.path.exists(self.trend_file) else None
+        if trends is None or (trends.period, trends.window) != (self.trend_period, self.trend_window):
+            # No saved buckets for these settings: bucket the whole patched dataset again
+            self.write_output(self.build_trends().table(), 'performance_trends')
+            self.trends.save(self.trend_file)
+            print("✅ Performance trends rebuilt!")
+            return
+        
+        changed = [first for first in (trends.update(removed, sign=-1), trends.update(added)) if first is not None]
+        self.trends = trends
+        if not changed:
+            print("✅ No reviews moved, performance trends are up to date!")
+            return
+        
+        # Rows before the first changed period are unaffected; rolling and cumulative values change after it
+        first = min(changed)
+        previous = read_table('performance_trends', parse_dates=['PeriodStart'], dtype={'Period': 'str'})
+        performance_trends = pd.concat([
+            previous[previous['PeriodStart'] < trends.start_time(first)],
+            trends.table(since=first)
+        ]).sort_values(['Department', 'PeriodStart'], kind='stable')
+        self.write_output(performance_trends, 'performance_trends')
+        trends.save(self.trend_file)
+        print(f"✅ Patched performance trends from {trends.start_time(first):%Y-%m-%d}!")
+    
+    def run_stage(self, name, *args):
+        """Run one pipeline method as a profiled stage"""
+        return self.profiler.run_stage(self, name, STAGE_ROWS.get(name, (None, None)), *args)
+    
+    @profiled_run('preprocessing', 'incremental')
+    def run_incremental_pipeline(self):
+        """Reprocess only the employees and reviews that changed since the last run.
+        
+        Fill values and salary bins are frozen at the last full run; run the full
+        pipeline to refresh them.
+        """
+        print("🚀 Starting HR Analytics Incremental Pipeline")
         print("=" * 50)
         
         # Load data
-        if not self.load_data():
+        if not self.run_stage('load_data'):
             return False
+        self.fingerprints = self.run_stage('fingerprint_inputs')
+        
+        state = self.load_pipeline_state()
+        previous_outputs = [
+            'hr_analytics_processed', 'employee_cleaned', 'performance_cleaned', 'employee_features',
+            'department_summary', 'education_summary', 'age_summary', 'performance_trends', 'department_percentiles'
+        ]
+        if state is None or not os.path.exists(self.transformer_file) or not all(find_table(name) for name in previous_outputs):
+            print("\nℹ️ No previous run found, running the full pipeline instead")
+            return self.run_full_pipeline()
+        
+        self.fill_values = state['fill_values']
+        self.transformer = FeatureTransformer.load(self.transformer_file)
+        
+        affected = self.find_affected_employees(state)
+        if not affected:
+            print("\n✅ No changed employees or reviews, outputs are up to date!")
+            return True
+        print(f"\n🔍 {len(affected)} employees affected by changes")
+        
+        employee_order = pd.Index(self.employee_df['EmployeeID'])
+        review_order = pd.Index(self.performance_df['PerformanceID'])
+        
+        # Clean, merge and derive features for the affected employees only
+        self.employee_df = self.employee_df[self.employee_df['EmployeeID'].isin(affected)].copy()
+        self.performance_df = self.performance_df[self.performance_df['EmployeeID'].isin(affected)].copy()
+        self.run_stage('clean_employee_data')
+        self.run_stage('clean_performance_data')
+        self.run_stage('merge_data')
+        self.run_stage('create_features')
+        self.run_stage('create_employee_features')
+        
+        # Patch the previous outputs in place
+        print("\n🩹 Patching previous outputs...")
+        with self.profiler.stage('patch_outputs', rows_in=len(self.merged_df)) as record:
+            previous_merged = read_table('hr_analytics_processed', parse_dates=['HireDate', 'ReviewDate'])
+            removed = previous_merged[previous_merged['EmployeeID'].isin(affected)]
+            added = self.merged_df
+            touched = pd.concat([removed, added])
+            
+            self.merged_df = self._patch_rows(
+                previous_merged, self.merged_df, affected, 'EmployeeID', employee_order
+            )
+            self.employee_df = self._patch_rows(
+                read_table('employee_cleaned', parse_dates=['HireDate']),
+                self.employee_df, affected, 'EmployeeID', employee_order
+            )
+            self.performance_df = self._patch_rows(
+                read_table('performance_cleaned', parse_dates=['ReviewDate']),
+                self.performance_df, affected, 'PerformanceID', review_order
+            )
+            self.employee_features_df = self._patch_rows(
+                read_table('employee_features', parse_dates=['HireDate', 'LastReviewDate']),
+                self.employee_features_df, affected, 'EmployeeID', employee_order
+            )
+            record['rows_out'] = len(self.merged_df)
+        print(f"✅ Patched dataset now has {len(self.merged_df)} records")
+        self.aggregates = None
+        self.employee_aggregate = None
+        
+        self.run_stage('patch_aggregated_tables', touched)
+        self.run_stage('patch_performance_trends', removed, added)
+        self.run_stage('generate_insights')
+        self.run_stage('create_visualizations')
+        self.run_stage('export_for_powerbi')
+        self.run_stage('run_sql_queries')
+        self.run_stage('save_pipeline_state')
+        self.run_stage('wait_for_charts')
+        
+        print("\n🎉 Incremental pipeline completed successfully!")
+        return True
+    
+    @profiled_run('preprocessing', 'streaming')
+    def run_streaming_pipeline(self, chunksize=100000):
+        """Run the pipeline over PerformanceRating.csv in chunks so memory is bounded by chunksize.
+        
+        Employees and education levels stay in memory as the join lookup. Reviews are
+        cleaned, joined, featurized and written one chunk at a time, and the summary
+        tables and insights are built from mergeable running statistics. Output rows
+        are grouped per chunk (employees without reviews come last) and duplicate
+        reviews are only removed within a chunk.
+        """
+        print("🚀 Starting HR Analytics Streaming Pipeline")
+        print("=" * 50)
+        
+        # Load the in-memory lookups
+        with self.profiler.stage('load_data') as record:
+            print("Loading reference CSV files...")
+            try:
+                self.employee_df = read_source('Employee')
+                self.education_df = read_source('EducationLevel')
+                self.rating_df = read_source('RatingLevel')
+                self.satisfaction_df = read_source('SatisfiedLevel')
+                self.build_lookups()
+                print(f"✅ Reference files loaded! Employee records: {len(self.employee_df)}")
+            except Exception as e:
+                print(f"❌ Error loading files: {e}")
+                return False
+            record['rows_out'] = len(self.employee_df)
+        
+        self.run_stage('clean_employee_data')
+        if not self.transformer.fitted:
+            self.transformer.fit(self.employee_df['Salary'])
+        
+        # Every chunk is joined through the same EmployeeID index
+        self.employee_index = EmployeeIndex(self.employee_lookup())
+        # Review columns are read as floats so every chunk has the same schema
+        float_columns = {col: 'float64' for col in REVIEW_NUMERIC_COLUMNS}
+        
+        # First pass: review fill medians from quantile sketches of bounded size
+        with self.profiler.stage('review_fill_values'):
+            print(f"\n📏 Computing review fill values in chunks of {chunksize}...")
+            sketches = {col: QuantileSketch() for col in REVIEW_NUMERIC_COLUMNS}
+            for chunk in read_source('PerformanceRating', usecols=REVIEW_NUMERIC_COLUMNS, dtype=float_columns,
+                                     chunksize=chunksize):
+                for col, sketch in sketches.items():
+                    sketch.update(chunk[col])
+            for col, sketch in sketches.items():
+                self.fill_values.setdefault(col, sketch.median())
+        
+        # Second pass: clean, join, featurize, write and aggregate each chunk
+        with self.profiler.stage('stream_reviews') as record:
+            print("\n🌊 Streaming performance reviews...")
+            merged_writers = [
+                TableAppender('hr_analytics_processed', fmt, partition_by=self.partition_by)
+                for fmt in self.output_formats
+            ]
+            review_writers = [TableAppender('performance_cleaned', fmt) for fmt in self.output_formats]
+            remove_other_copies('hr_analytics_processed', [writer.path for writer in merged_writers])
+            remove_other_copies('performance_cleaned', [writer.path for writer in review_writers])
+            base = RunningAggregate(GROUPING_KEYS, SUMMARY_MEASURES, dropna=False, extrema=['Salary'])
+            employee_reviews = EmployeeReviewAccumulator()
+            self.trends = TrendEngine(self.trend_period, self.trend_window)
+            self.sketches = self.new_sketches()
+            self.sketches['salaries'].update(self.employee_df)
+            
+            def process(block):
+                block = self.derive_features(block)
+                for writer in merged_writers:
+                    writer.append(block)
+                base.update(self.encode_measures(block))
+                employee_reviews.update(block)
+                self.trends.update(block)
+                self.sketches['reviewed'].update(self.reviewed_rows(block))
+            
+            template = self.clean_review_rows(read_source('PerformanceRating', dtype=float_columns, nrows=0))
+            
+            review_count = 0
+            for i, chunk in enumerate(read_source('PerformanceRating', dtype=float_columns, chunksize=chunksize)):
+                chunk = self.clean_review_rows(chunk)
+                for writer in review_writers:
+                    writer.append(chunk)
+                review_count += len(chunk)
+                
+                process(add_review_labels(self.employee_index.join(chunk, how='inner'), self.lookups))
+                print(f"  Chunk {i + 1}: {review_count} reviews processed")
+            
+            # Employees without any review keep one row, as in the left join of merge_data
+            unseen = EmployeeIndex(self.employee_index.employees[~self.employee_index.matched])
+            process(add_review_labels(unseen.join(template, how='left'), self.lookups))
+            
+            for writer in merged_writers + review_writers:
+                writer.close()
+            print(f"✅ Streamed {merged_writers[0].rows} merged records")
+            record['rows_in'] = review_count
+            record['rows_out'] = merged_writers[0].rows
         
-        # Clean data
-        self.clean_employee_data()
-        self.clean_performance_data()
+        # Summary tables from the running statistics
+        with self.profiler.stage('create_aggregated_tables'):
+            print("\n📊 Creating aggregated tables...")
+            self.build_aggregates(base)
+            self.write_summary_tables()
         
-        # Merge data
-        self.merge_data()
+        self.run_stage('create_employee_features', employee_reviews)
         
-        # Create features
-        self.create_features()
+        self.merged_df = None
+        self.performance_df = None
+        self.run_stage('generate_insights')
+        self.run_stage('create_visualizations')
         
-        # Create aggregated tables
-        self.create_aggregated_tables()
+        with self.profiler.stage('export_for_powerbi'):
+            self.write_output(self.employee_df, 'employee_cleaned')
+            self.write_output(self.employee_features_df, 'employee_features')
+            self.write_processing_report(review_count)
+        self.run_stage('run_sql_queries')
+        self.run_stage('wait_for_charts')
         
-        # Generate insights
-        self.generate_insights()
+        print("\n🎉 Streaming pipeline completed successfully!")
+        return True
+    
+    @profiled_run('preprocessing', 'full')
+    def run_full_pipeline(self):
+        """Run the complete data processing pipeline.
         
-        # Create visualizations
-        self.create_visualizations()
+        The stages of PIPELINE_STAGES run as a graph: once the features exist,
+        the summary tables, exports, SQL queries and charts run concurrently in
+        stage_workers processes (in declared order when there are none).
+        """
+        print("🚀 Starting HR Analytics Data Processing Pipeline")
+        print("=" * 50)
         
-        # Export for Power BI
-        self.export_for_powerbi()
+        graph = StageGraph(self.profiler, self.stage_cache).add(self, PIPELINE_STAGES)
+        if not graph.run(workers=self.stage_workers):
+            return False
         
         print("\n🎉 Pipeline completed successfully!")
         return True
+    
+    def partition_inputs(self, directory, shard_by='Department', shards=None):
+        """Split the loaded employees, with their reviews, into shards by an employee column.
+        
+        Fill values and salary bins are learned from the whole company first, so
+        every shard cleans and bins its rows as an unsharded run would. Key values
+        are spread over the shards by row count; reviews of unknown employees go
+        to the first shard.
+        """
+        print(f"\n🧩 Partitioning by {shard_by}...")
+        if shard_by not in self.employee_df.columns:
+            raise ValueError(f"Cannot shard by '{shard_by}', it is not an Employee.csv column")
+        
+        employees = self.employee_df.drop_duplicates()
+        for col in ['Age', 'Salary']:
+            self.fill_values.setdefault(col, float(employees[col].median()))
+        reviews = self.performance_df.drop_duplicates()
+        for col in REVIEW_NUMERIC_COLUMNS:
+            if col in reviews.columns:
+                self.fill_values.setdefault(col, float(reviews[col].median()))
+        if not self.transformer.fitted:
+            # Equal-width bins only depend on the salary range, which every employee row spans
+            self.transformer.fit(pd.to_numeric(employees['Salary'].fillna(self.fill_values['Salary']), errors='coerce'))
+        
+        codes, values = pd.factorize(self.employee_df[shard_by], use_na_sentinel=False)
+        owners = pd.Series(codes, index=self.employee_df['EmployeeID'].to_numpy())
+        owners = owners[~owners.index.duplicated()]
+        review_codes = owners.reindex(self.performance_df['EmployeeID'].to_numpy()).to_numpy()
+        known = ~np.isnan(review_codes)
+        sizes = np.bincount(codes, minlength=len(values)) + \
+            np.bincount(review_codes[known].astype('intp'), minlength=len(values))
+        
+        groups = assign_shards(dict(enumerate(sizes)), shards or len(values))
+        shard_of = np.zeros(len(values), dtype='intp')
+        for index, group in enumerate(groups):
+            shard_of[group] = index
+        employee_shards = shard_of[codes]
+        review_shards = np.zeros(len(review_codes), dtype='intp')
+        review_shards[known] = shard_of[review_codes[known].astype('intp')]
+        
+        inputs = [
+            {'employee_df': self.employee_df[employee_shards == index],
+             'performance_df': self.performance_df[review_shards == index]}
+            for index in range(len(groups))
+        ]
+        directory.write({
+            'shard_by': shard_by,
+            'values': [[values[code] for code in group] for group in groups],
+            'fill_values': self.fill_values,
+            'transformer': self.transformer.to_dict(),
+            'trend_period': self.trend_period,
+            'trend_window': self.trend_window,
+            'reference': {name: getattr(self, name) for name in ['education_df', 'rating_df', 'satisfaction_df']},
+            # Output rows are put back in the input order when the shards are merged
+            'employee_order': pd.unique(self.employee_df['EmployeeID']),
+            'review_order': pd.unique(self.performance_df['PerformanceID'])
+        }, inputs)
+        
+        for index, (group, tables) in enumerate(zip(groups, inputs)):
+            names = ', '.join(str(values[code]) for code in group)
+            print(f"  Shard {index}: {names} ({len(tables['employee_df'])} employees, "
+                  f"{len(tables['performance_df'])} reviews)")
+        print(f"✅ Inputs split into {len(groups)} shards in {directory.root}")
+    
+    def use_shard_plan(self, plan):
+        """Take the state learned from the whole company and the reference tables from a shard plan"""
+        self.fill_values = dict(plan['fill_values'])
+        self.transformer = FeatureTransformer.from_dict(plan['transformer'])
+        self.trend_period = plan['trend_period']
+        self.trend_window = plan['trend_window']
+        for name, table in plan['reference'].items():
+            setattr(self, name, table)
+        self.build_lookups()
+    
+    @profiled_run('preprocessing', 'shard')
+    def run_shard(self, directory, index):
+        """Clean, merge and featurize one shard and save its tables, aggregate and trends as its result"""
+        print(f"🧩 Processing shard {index} of {directory.root}")
+        self.use_shard_plan(directory.plan())
+        tables = directory.load_input(index)
+        self.employee_df = tables['employee_df']
+        self.performance_df = tables['performance_df']
+        
+        # Row hashes, not fingerprint dicts: the dicts are only built once, for the merged state
+        row_hashes = self.run_stage('row_hashes')
+        self.run_stage('clean_employee_data')
+        self.run_stage('clean_performance_data')
+        self.run_stage('merge_data')
+        self.run_stage('create_features')
+        self.run_stage('create_employee_features')
+        with self.profiler.stage('aggregate_shard'):
+            aggregate = self.summary_aggregate(self.merged_df)
+            self.build_trends()
+            self.build_sketches()
+        with self.profiler.stage('save_shard_result'):
+            directory.save_result(index, {
+                'employee_df': self.employee_df,
+                'performance_df': self.performance_df,
+                'merged_df': self.merged_df,
+                'employee_features_df': self.employee_features_df,
+                'row_hashes': row_hashes,
+                'aggregate': aggregate,
+                'trends': self.trends,
+                'sketches': self.sketches
+            })
+        return True
+    
+    def merge_shards(self, directory):
+        """Combine the shard results into the company-wide tables (in input order), aggregates and trends"""
+        print(f"\n🧩 Merging shard results from {directory.root}...")
+        pending = directory.pending()
+        if pending:
+            print(f"❌ Shards {pending} have no result yet, process them first")
+            return False
+        
+        plan = directory.plan()
+        self.use_shard_plan(plan)
+        results = [directory.load_result(index) for index in range(directory.shards)]
+        employee_order = pd.Index(plan['employee_order'])
+        review_order = pd.Index(plan['review_order'])
+        
+        self.employee_df = self._in_order([r['employee_df'] for r in results], 'EmployeeID', employee_order)
+        self.performance_df = self._in_order([r['performance_df'] for r in results], 'PerformanceID', review_order)
+        self.merged_df = self._in_order([r['merged_df'] for r in results], 'EmployeeID', employee_order)
+        self.employee_features_df = self._in_order(
+            [r['employee_features_df'] for r in results], 'EmployeeID', employee_order
+        )
+        
+        self.fingerprints = self.fingerprint_inputs((
+            self._in_order([r['row_hashes'][0] for r in results], 'EmployeeID', employee_order),
+            self._in_order([r['row_hashes'][1] for r in results], 'PerformanceID', review_order)
+        ))
+        base = RunningAggregate(GROUPING_KEYS, SUMMARY_MEASURES, dropna=False, extrema=['Salary'])
+        self.trends = TrendEngine(self.trend_period, self.trend_window)
+        self.sketches = results[0]['sketches']
+        for index, result in enumerate(results):
+            base.merge(result['aggregate'])
+            self.trends.merge(result['trends'])
+            for name, sketch in self.sketches.items():
+                if index:
+                    sketch.merge(result['sketches'][name])
+        self.build_aggregates(base)
+        
+        print(f"✅ Merged {len(results)} shards into {len(self.merged_df)} records")
+        return True
+    
+    @profiled_run('preprocessing', 'sharded')
+    def run_sharded_pipeline(self, shard_by='Department', shards=None, shard_dir='shards', shard_workers=None,
+                             step='all', shard_indices=None):
+        """Run the pipeline as independent shards of the company, split by an employee column.
+        
+        The partition step writes each shard's employees and reviews to
+        shard_dir. The run step cleans, merges and featurizes shards in
+        shard_workers processes, or on other machines sharing shard_dir (step
+        'run' with their shard_indices). The merge step combines the shard
+        results into the same output files as a full run.
+        """
+        print(f"🚀 Starting HR Analytics Sharded Pipeline ({step})")
+        print("=" * 50)
+        
+        directory = ShardDirectory(shard_dir)
+        if step in ('all', 'partition'):
+            if not self.run_stage('load_data'):
+                return False
+            self.run_stage('partition_inputs', directory, shard_by, shards)
+            if step == 'partition':
+                return True
+        
+        if step in ('all', 'run'):
+            indices = directory.pending() if shard_indices is None else list(shard_indices)
+            workers = default_shard_workers() if shard_workers is None else shard_workers
+            with self.profiler.stage('run_shards'):
+                print(f"\n🧩 Processing {len(indices)} shards with {workers or 'no'} worker processes...")
+                run_shards(process_shard, shard_dir, indices, workers)
+            # Every shard records its stages in its own run report
+            for index in indices:
+                with open(directory.path(index, 'shard_run_report.json')) as f:
+                    for record in json.load(f)['stages']:
+                        self.profiler.stages.append(dict(record, stage=f"shard_{index}/{record['stage']}"))
+            if step == 'run':
+                return True
+        
+        if not self.run_stage('merge_shards', directory):
+            return False
+        graph = StageGraph(self.profiler).add(self, SHARD_MERGE_STAGES)
+        if not graph.run(workers=self.stage_workers):
+            return False
+        
+        print("\n🎉 Sharded pipeline completed successfully!")
+        return True
+
+
+def process_shard(shard_dir, index):
+    """Process one shard of shard_dir in a fresh preprocessor (the entry point of shard workers)"""
+    directory = ShardDirectory(shard_dir)
+    preprocessor = HRAnalyticsPreprocessor(render_workers=0, sql_database=None, stage_workers=0, cache_dir=None,
+                                           run_report_file=directory.path(index, 'shard_run_report.json'))
+    return preprocessor.run_shard(directory, index)
 
 # Main execution
-if __name__ == "__main__":
+def main(argv=None, prog=None):
+    """Parse the command line (argv, default sys.argv) and run the pipeline; returns whether it succeeded"""
+    parser = argparse.ArgumentParser(prog=prog, description="HR Analytics data processing pipeline")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only reprocess employees and reviews changed since the last run")
+    parser.add_argument('--stream', action='store_true',
+                        help="stream PerformanceRating.csv in chunks to bound memory use")
+    parser.add_argument('--chunksize', type=int, default=100000,
+                        help="reviews per chunk in --stream mode (default: 100000)")
+    parser.add_argument('--format', nargs='+', default=['csv'], choices=list(OUTPUT_FORMATS),
+                        help="output formats to write (default: csv)")
+    parser.add_argument('--partition-by', nargs='+', default=None,
+                        help="partition the main Parquet dataset by these columns, e.g. Department")
+    parser.add_argument('--profile', action='store_true',
+                        help="capture a cProfile of every stage in pipeline_run_report.json")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="record the peak Python allocations of every stage with tracemalloc")
+    parser.add_argument('--render-workers', type=int, default=None,
+                        help="chart rendering processes (default: one per core, 0 renders inline)")
+    parser.add_argument('--no-sql', action='store_true',
+                        help="skip materializing the hranalytics.sql queries in hr_analytics.db")
+    parser.add_argument('--stage-workers', type=int, default=None,
+                        help="processes running independent stages of a full run (default: one per extra core, 0 runs them in order)")
+    parser.add_argument('--cache-dir', default='stage_cache',
+                        help="stage cache directory of full runs (default: stage_cache)")
+    parser.add_argument('--cache-mb', type=int, default=1024,
+                        help="stage cache size limit; least recently used entries are evicted (default: 1024)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="run every stage instead of reusing cached outputs")
+    parser.add_argument('--invalidate', nargs='+', default=[], metavar='STAGE',
+                        help="re-run these stages and everything depending on them ('all' re-runs every stage)")
+    parser.add_argument('--shard-by', default=None, metavar='COLUMN',
+                        help="process the company as shards split by this Employee.csv column, e.g. Department")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="number of shards, balanced by rows (default: one per --shard-by value)")
+    parser.add_argument('--shard-dir', default='shards',
+                        help="directory holding the shard inputs and results, shared by every machine (default: shards)")
+    parser.add_argument('--shard-workers', type=int, default=None,
+                        help="processes running shards in parallel (default: one per core, 0 runs them in order)")
+    parser.add_argument('--shard-step', choices=['all', 'partition', 'run', 'merge'], default='all',
+                        help="run only one step of a sharded run, e.g. 'run' on each of several machines")
+    parser.add_argument('--shard-index', type=int, nargs='+', default=None, metavar='N',
+                        help="shards processed by --shard-step run (default: every shard without a result)")
+    parser.add_argument('--trend-period', choices=list(TREND_PERIODS), default='month',
+                        help="period reviews are bucketed by in performance_trends (default: month)")
+    parser.add_argument('--trend-window', type=int, default=3,
+                        help="periods the rolling performance trend statistics cover (default: 3)")
+    args = parser.parse_args(argv)
+    
     # Initialize preprocessor
-    preprocessor = HRAnalyticsPreprocessor()
+    preprocessor = HRAnalyticsPreprocessor(output_formats=args.format, partition_by=args.partition_by,
+                                           profile=args.profile, trace_memory=args.trace_memory,
+                                           render_workers=args.render_workers,
+                                           sql_database=None if args.no_sql else 'hr_analytics.db',
+                                           stage_workers=args.stage_workers,
+                                           cache_dir=None if args.no_cache else args.cache_dir,
+                                           cache_mb=args.cache_mb, invalidate=args.invalidate,
+                                           trend_period=args.trend_period, trend_window=args.trend_window)
     
-    # Run the full pipeline
-    success = preprocessor.run_full_pipeline()
+    # Run the pipeline
+    if args.incremental:
+        success = preprocessor.run_incremental_pipeline()
+    elif args.stream:
+        success = preprocessor.run_streaming_pipeline(chunksize=args.chunksize)
+    elif args.shard_by or args.shard_step != 'all':
+        success = preprocessor.run_sharded_pipeline(shard_by=args.shard_by or 'Department', shards=args.shards,
+                                                    shard_dir=args.shard_dir, shard_workers=args.shard_workers,
+                                                    step=args.shard_step, shard_indices=args.shard_index)
+    else:
+        success = preprocessor.run_full_pipeline()
     
     if success:
         print("\n📊 Your data is ready for Power BI!")
         print("Import 'hr_analytics_processed.csv' as your main dataset in Power BI.")
     else:
-        print("\n❌ Pipeline failed. Please check your CSV files.") 
\ No newline at end of file
+        print("\n❌ Pipeline failed. Please check your CSV files.")
+    return success
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,179 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+
+# Subcommands that hand the rest of the command line to a pipeline script's own parser
+FORWARDED = {
+    'preprocess': ('hr_analytics_preprocessing', "clean and merge the source CSVs into the Power BI tables"),
+    'train': ('hr_advanced_analytics', "train, cluster and rank attrition risk with the machine learning pipeline")
+}
+
+# Run reports summarized by the summarize subcommand
+RUN_REPORTS = ['pipeline_run_report.json', 'ml_run_report.json', 'pipeline_job_report.json']
+
+
+def forward(command, argv, prog):
+    """Run a pipeline script's main() on the remaining arguments (importing it only now)"""
+    module = importlib.import_module(FORWARDED[command][0])
+    return module.main(argv, prog=f"{prog} {command}")
+
+
+def score(args):
+    """Score employees with the latest registered model; the training and plotting stacks are never imported"""
+    from hr_advanced_analytics import HRAdvancedAnalytics
+    analytics = HRAdvancedAnalytics(registry_dir=args.registry, top_k=args.top_k, render_workers=0,
+                                    stage_workers=0, cache_dir=None)
+    return analytics.run_scoring(employee_ids=args.employees, input_path=args.input, output=args.output)
+
+
+def summarize(args):
+    """Print the headline numbers of the latest outputs without rerunning anything"""
+    import pandas as pd
+    from hr_io import find_table, read_table
+
+    print("📋 HR Analytics summary")
+    print("=" * 50)
+
+    # Department summary, salary percentiles and the latest trend period side by side
+    parts = []
+    if find_table('department_summary') is not None:
+        parts.append(read_table('department_summary').set_index('Department')[['AvgSalary', 'AttritionRate']])
+    if find_table('department_percentiles') is not None:
+        parts.append(read_table('department_percentiles').set_index('Department')[['SalaryMedian', 'ReviewedEmployees']])
+    if find_table('performance_trends') is not None:
+        trends = read_table('performance_trends', columns=['Department', 'Period', 'RollingPerformanceScore'])
+        parts.append(trends.groupby('Department').last().rename(columns={'Period': 'LatestPeriod'}))
+    if parts:
+        print("\n🏢 Departments:")
+        print(pd.concat(parts, axis=1).to_string())
+    else:
+        print("\n⚠️ No preprocessing outputs found, run preprocess first")
+
+    index_path = os.path.join(args.registry, 'index.json')
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        version = index['versions'][index['latest']]
+        metrics = version['metrics'][version['best_model']]
+        print(f"\n🤖 Model {index['latest']} ({version['created']}): {version['best_model']}, "
+              f"AUC {metrics['auc_score']:.3f}, CV AUC {metrics['cv_auc_mean']:.3f} ± {metrics['cv_auc_std']:.3f}")
+    else:
+        print("\n⚠️ No registered models, run train first")
+
+    if os.path.exists('high_risk_employees.csv'):
+        high_risk = read_table('high_risk_employees', columns=['Department'])
+        counts = high_risk['Department'].value_counts()
+        print(f"\n⚠️ {len(high_risk)} high-risk employees: "
+              + ", ".join(f"{department} {count}" for department, count in counts.items()))
+
+    reports = [path for path in RUN_REPORTS if os.path.exists(path)]
+    if reports:
+        print("\n⏱️ Last runs:")
+    for path in reports:
+        with open(path) as f:
+            report = json.load(f)
+        failed = [stage['stage'] for stage in report.get('stages', []) if stage.get('status') == 'failed']
+        status = f"failed in {', '.join(failed)}" if failed else 'ok'
+        print(f"  {report.get('pipeline')} ({report.get('mode')}) finished {report.get('finished')} "
+              f"in {report.get('wall_time_s', 0):.2f}s: {status}")
+    return True
+
+
+def best_model(registry):
+    """Name of the best model of the latest registered version, or None"""
+    index_path = os.path.join(registry, 'index.json')
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        index = json.load(f)
+    return index['versions'][index['latest']]['best_model'] if index['latest'] else None
+
+
+def render(args):
+    """Redraw the overview and feature importance charts from the saved output tables"""
+    from hr_io import read_table
+    from hr_rendering import ChartRenderer, draw_hr_overview, draw_feature_importance
+
+    try:
+        employees = read_table('employee_cleaned', columns=['Department', 'Salary', 'Age', 'Attrition'])
+        education = read_table('education_summary', columns=['EducationLevel', 'EmployeeCount'])
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        print("Run preprocess first.")
+        return False
+
+    # The same series create_visualizations draws from the in-memory tables
+    overview = {
+        'attrition_by_dept': (employees['Attrition'] == 'Yes').groupby(employees['Department']).sum().astype('int64'),
+        'salary': employees['Salary'],
+        'age': employees['Age'],
+        'education_counts': education.set_index('EducationLevel')['EmployeeCount'].sort_values(ascending=False)
+    }
+    charts = {'hr_analytics_overview.png': (draw_hr_overview, overview)}
+
+    # The best model's top features, as feature_importance_analysis plots them
+    if os.path.exists('feature_importance.csv'):
+        importance = read_table('feature_importance')
+        model = best_model(args.registry) or importance['model'].iloc[0]
+        charts['feature_importance.png'] = (draw_feature_importance, importance[importance['model'] == model].head(10))
+
+    renderer = ChartRenderer(max_workers=0)
+    for path, (draw, data) in charts.items():
+        if args.force:
+            renderer.cache.pop(path, None)
+        if renderer.submit(path, draw, data):
+            print(f"🖼️ Chart saved as '{path}'")
+        else:
+            print(f"✅ '{path}' is up to date, skipped")
+    return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='hr_cli.py', description="HR Analytics command line; each subcommand only imports what it needs"
+    )
+    commands = parser.add_subparsers(dest='command', required=True, metavar='COMMAND')
+
+    # Forwarded subcommands parse their own options (so -h shows the script's help)
+    for command, (module, description) in FORWARDED.items():
+        commands.add_parser(command, help=f"{description} (options of {module}.py)", add_help=False)
+
+    score_parser = commands.add_parser('score', help="score employees with the latest registered model")
+    score_parser.add_argument('--employees', nargs='+', default=None,
+                              help="EmployeeIDs to score (default: all)")
+    score_parser.add_argument('--input', default=None,
+                              help="employee-level CSV to score (default: employee_features)")
+    score_parser.add_argument('--output', default='attrition_scores.csv',
+                              help="CSV the scores are saved to (default: attrition_scores.csv)")
+    score_parser.add_argument('--registry', default='model_registry',
+                              help="model registry directory (default: model_registry)")
+    score_parser.add_argument('--top-k', type=int, default=10,
+                              help="riskiest employees per department in top_risk_by_department.csv (default: 10)")
+
+    summarize_parser = commands.add_parser('summarize', help="print the headline numbers of the latest outputs")
+    summarize_parser.add_argument('--registry', default='model_registry',
+                                  help="model registry directory (default: model_registry)")
+
+    render_parser = commands.add_parser('render', help="redraw the charts from the saved output tables")
+    render_parser.add_argument('--registry', default='model_registry',
+                               help="model registry directory whose best model's importances are drawn (default: model_registry)")
+    render_parser.add_argument('--force', action='store_true',
+                               help="redraw even if the charts are up to date")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    args, rest = parser.parse_known_args(argv)
+    if args.command in FORWARDED:
+        return forward(args.command, rest, parser.prog)
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    return {'score': score, 'summarize': summarize, 'render': render}[args.command](args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,175 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+CLUSTERING_FEATURES = [
+    'Age', 'Salary', 'YearsAtCompany', 'JobSatisfaction',
+    'PerformanceScore', 'OverallSatisfaction', 'WorkLifeBalance'
+]
+CLUSTERING_METHODS = ['kmeans', 'minibatch']
+
+# Rows the k sweep fits on and the silhouette score is estimated from
+SWEEP_SAMPLE = 50000
+SILHOUETTE_SAMPLE = 5000
+
+
+def _sweep_k(X, k, batch_size, random_state):
+    """Fit one candidate number of clusters and score it (runs in a worker process)"""
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+    model = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, random_state=random_state).fit(X)
+    silhouette = silhouette_score(X, model.labels_, sample_size=min(SILHOUETTE_SAMPLE, len(X)),
+                                  random_state=random_state)
+    return {'k': k, 'inertia': float(model.inertia_), 'silhouette': float(silhouette)}
+
+
+class EmployeeClusterer:
+    """K-means employee segments with a persisted scaler and centroids.
+
+    'kmeans' runs a full KMeans over every row. 'minibatch' makes one shuffled
+    pass of MiniBatchKMeans updates and, when the saved state has the same
+    features and number of clusters, starts from the saved centroids and keeps
+    the saved scaler, so cluster numbers stay stable between runs. predict()
+    assigns new employees to the nearest saved centroid without refitting, so
+    scikit-learn is only imported when fitting.
+    """
+
+    def __init__(self, n_clusters=4, method='kmeans', batch_size=16384, random_state=42):
+        if method not in CLUSTERING_METHODS:
+            raise ValueError(f"Unknown clustering method '{method}', expected one of {CLUSTERING_METHODS}")
+        self.n_clusters = n_clusters
+        self.method = method
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.features = None
+        self.fill_values = None
+        self.means = None
+        self.scales = None
+        self.centroids = None
+        self.warm_started = False
+
+    @property
+    def fitted(self):
+        return self.centroids is not None
+
+    def to_dict(self):
+        return {
+            'method': self.method,
+            'n_clusters': self.n_clusters,
+            'features': self.features,
+            'fill_values': self.fill_values.tolist(),
+            'means': self.means.tolist(),
+            'scales': self.scales.tolist(),
+            'centroids': self.centroids.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, state, method=None):
+        clusterer = cls(n_clusters=state['n_clusters'], method=method or state['method'])
+        clusterer.features = state['features']
+        clusterer.fill_values = np.asarray(state['fill_values'], dtype='float64')
+        clusterer.means = np.asarray(state['means'], dtype='float64')
+        clusterer.scales = np.asarray(state['scales'], dtype='float64')
+        clusterer.centroids = np.asarray(state['centroids'], dtype='float64')
+        return clusterer
+
+    def save(self, path='cluster_model.json'):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path='cluster_model.json', method=None):
+        with open(path) as f:
+            return cls.from_dict(json.load(f), method)
+
+    def can_warm_start(self, features):
+        return self.fitted and self.method == 'minibatch' and self.features == list(features)
+
+    def fit_scaler(self, df, features):
+        """Learn the fill medians and standardization of the clustering features"""
+        from sklearn.preprocessing import StandardScaler
+        self.features = list(features)
+        values = df[self.features].astype('float64')
+        self.fill_values = values.median().to_numpy()
+        scaler = StandardScaler().fit(values.fillna(pd.Series(self.fill_values, index=self.features)))
+        self.means = scaler.mean_
+        self.scales = scaler.scale_
+        return self
+
+    def scale(self, df):
+        """Standardized clustering features (missing values get the fill medians)"""
+        X = df.reindex(columns=self.features).to_numpy(dtype='float64')
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self.fill_values, X)
+        X -= self.means
+        X /= self.scales
+        return X
+
+    def fit_predict(self, df, features=CLUSTERING_FEATURES):
+        """Fit the clusters on every row of df and return their labels"""
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+        features = [col for col in features if col in df.columns]
+        self.warm_started = self.can_warm_start(features)
+        if not self.warm_started:
+            self.fit_scaler(df, features)
+        X = self.scale(df)
+
+        if self.method == 'kmeans':
+            model = KMeans(n_clusters=self.n_clusters, random_state=self.random_state)
+            labels = model.fit_predict(X)
+            self.centroids = model.cluster_centers_
+            return labels, X
+
+        # partial_fit over our own permutation keeps every update O(batch_size);
+        # MiniBatchKMeans.fit draws each batch from the whole array
+        model = MiniBatchKMeans(n_clusters=self.n_clusters, init=self.centroids if self.warm_started else 'k-means++',
+                                n_init=1, batch_size=self.batch_size, random_state=self.random_state)
+        order = np.random.default_rng(self.random_state).permutation(len(X))
+        for start in range(0, len(X), self.batch_size):
+            model.partial_fit(X[order[start:start + self.batch_size]])
+        self.centroids = model.cluster_centers_
+        return self.nearest(X), X
+
+    def nearest(self, X):
+        """Index of the nearest centroid to each standardized row"""
+        # Squared distances without materializing rows x clusters x features
+        distances = (X @ self.centroids.T) * -2
+        distances += (self.centroids ** 2).sum(axis=1)
+        return distances.argmin(axis=1)
+
+    def predict(self, df):
+        """Assign rows to the nearest saved centroid"""
+        if not self.fitted:
+            raise ValueError("EmployeeClusterer is not fitted, call fit_predict() first")
+        return self.nearest(self.scale(df))
+
+    def select_k(self, df, k_values, features=CLUSTERING_FEATURES, n_jobs=-1):
+        """Score each candidate number of clusters with a mini-batch fit on a sample, in parallel.
+
+        Returns one {'k', 'inertia', 'silhouette'} record per candidate; the
+        silhouette is estimated from a sample of the rows.
+        """
+        k_values = list(k_values)
+        if not k_values or min(k_values) < 2:
+            raise ValueError(f"select_k needs at least one candidate and every k >= 2, got {k_values}")
+        features = [col for col in features if col in df.columns]
+        if not self.can_warm_start(features):
+            self.fit_scaler(df, features)
+        X = self.scale(df)
+        if len(X) > SWEEP_SAMPLE:
+            rng = np.random.default_rng(self.random_state)
+            X = X[rng.choice(len(X), SWEEP_SAMPLE, replace=False)]
+
+        return Parallel(n_jobs=n_jobs)(
+            delayed(_sweep_k)(X, k, self.batch_size, self.random_state) for k in k_values
+        )
+
+
+def load_clusterer(path='cluster_model.json', method=None):
+    """The saved clusterer, or None when there is none"""
+    if not os.path.exists(path):
+        return None
+    return EmployeeClusterer.load(path, method)
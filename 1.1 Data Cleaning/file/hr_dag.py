@@ -0,0 +1,371 @@
+import copy
+import os
+import pickle
+import time
+import joblib
+from joblib.externals.loky import get_reusable_executor
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing.shared_memory import SharedMemory
+import pandas as pd
+
+
+class Stage:
+    """One pipeline step: owner.<name>() reading its input attributes and writing its outputs.
+
+    result names the attribute the method's return value is stored in. worker
+    stages may run in a process pool; the others run in the main process
+    (stages that start their own worker pools or keep open resources).
+    required stages stop the run when they return False. A final stage runs
+    after every earlier stage of its owner.
+
+    With a StageCache, cache stages are skipped when their key is unchanged.
+    The key covers the owner attributes named in params, the files in sources
+    (paths formatted with the owner's attributes, or the name of an owner
+    method returning them) and the source of the modules named in code. files
+    declares the files (or dataset directories) the stage writes in the same
+    way; they are restored on a hit.
+    """
+
+    def __init__(self, name, inputs=(), outputs=(), result=None, worker=False, required=False,
+                 final=False, after=(), rows=(None, None), cache=False, params=(), sources=(),
+                 files=(), code=()):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.result = result
+        self.worker = worker
+        self.required = required
+        self.final = final
+        self.after = tuple(after)
+        self.rows = rows
+        self.cache = cache
+        self.params = tuple(params)
+        self.sources = sources if isinstance(sources, str) else tuple(sources)
+        self.files = files if isinstance(files, str) else tuple(files)
+        self.code = tuple(code)
+
+    @property
+    def writes(self):
+        return self.outputs + ((self.result,) if self.result else ())
+
+
+def share(value):
+    """Pickle a value into a new shared memory block and return its (name, size) handle"""
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    block = SharedMemory(create=True, size=max(len(data), 1))
+    block.buf[:len(data)] = data
+    block.close()
+    return block.name, len(data)
+
+
+def load_shared(handle, unlink=False):
+    """Unpickle a value from a shared memory block (and free the block when unlink)"""
+    name, size = handle
+    block = SharedMemory(name=name)
+    try:
+        view = block.buf[:size]
+        value = pickle.loads(view)
+        view.release()
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+    return value
+
+
+def _stage_input(value):
+    """A copy of an output for a main-process stage, so changing it in place cannot change the
+    version other stages (or the stage cache) read, as a worker's unpickled copy cannot"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # A shallow copy keeps in-place column changes out, without copying the data
+        return value.copy(deep=False)
+    return copy.deepcopy(value)
+
+
+def _call_stage(profiler, shell, stage, label):
+    """Run a stage on its shell; returns its result and, for cache stages, the charts it submitted"""
+    renderer = getattr(shell, 'renderer', None) if stage.cache else None
+    if renderer is not None:
+        renderer.log = []
+    try:
+        result = profiler.run_stage(shell, stage.name, stage.rows, label=label)
+        return result, renderer.log if renderer is not None else []
+    finally:
+        if renderer is not None:
+            renderer.log = None
+
+
+def _run_in_worker(shell, stage, label, handles):
+    """Run one stage on a detached copy of its owner (runs in a worker process)"""
+    for attr, handle in handles.items():
+        setattr(shell, attr, load_shared(handle))
+    shell.profiler.stages = []
+    shell.profiler.stack = []
+    try:
+        result, charts = _call_stage(shell.profiler, shell, stage, label)
+    finally:
+        # A joblib pool started by the stage (model fits, k sweeps, permutation importance) would
+        # otherwise keep its idle workers for minutes and hold up the shutdown of this process
+        get_reusable_executor().shutdown(wait=True)
+    values = {attr: getattr(shell, attr) for attr in stage.outputs}
+    if stage.result:
+        values[stage.result] = result
+    records = shell.profiler.stages
+    for record in records:
+        record['process'] = os.getpid()
+    return {attr: share(value) for attr, value in values.items()}, result, records, charts
+
+
+class StageGraph:
+    """Stages of one or more pipeline objects scheduled by their declared inputs and outputs.
+
+    Each output is a new version of its attribute and a stage reads the
+    versions written by the last earlier-declared stages that write its
+    inputs, so a stage never sees a later stage's changes and independent
+    stages can run at the same time. Stages whose inputs are ready run at
+    once: worker stages in a pool of processes that map their inputs from
+    shared memory (each version is pickled once however many stages read
+    it), the others one at a time in this process. With workers=0 every
+    stage runs here in declared order. With a cache (StageCache) every stage
+    is keyed once its inputs are ready and cache stages with a stored entry
+    are served from it instead of running.
+    """
+
+    def __init__(self, profiler, cache=None):
+        self.profiler = profiler
+        self.cache = cache
+        self.nodes = []
+        self.owners = {}
+        self.after = {}
+
+    def add(self, owner, stages, prefix='', after=()):
+        """Add an owner's stages, labelled '<prefix><stage>' in the run report.
+
+        Its first stages (those reading nothing another of its stages writes)
+        wait for the after stages, e.g. the stage writing a file they read.
+        """
+        self.owners[prefix] = owner
+        self.after[prefix] = set(after)
+        for stage in stages:
+            self.nodes.append((prefix + stage.name, prefix, owner, stage))
+        return self
+
+    def dependencies(self):
+        """Per stage label: the stages it waits for and the (version -> attribute) inputs it reads"""
+        writers = {}
+        labels_by_prefix = {}
+        graph = {}
+        for label, prefix, owner, stage in self.nodes:
+            reads = {(prefix, attr, writers.get((prefix, attr))): attr for attr in stage.inputs}
+            deps = {writer for (_, _, writer) in reads if writer is not None}
+            deps.update(stage.after)
+            if stage.final:
+                deps.update(labels_by_prefix.get(prefix, []))
+            if not deps:
+                deps.update(self.after[prefix])
+            graph[label] = (deps, reads)
+            for attr in stage.writes:
+                writers[(prefix, attr)] = label
+            labels_by_prefix.setdefault(prefix, []).append(label)
+        return graph
+
+    def critical_path(self, durations, graph):
+        """The chain of stages whose wall times add up to the longest path through the graph"""
+        finish = {}
+        previous = {}
+        for label, _, _, _ in self.nodes:
+            deps = [dep for dep in graph[label][0] if dep in finish]
+            before = max(deps, key=lambda dep: finish[dep], default=None)
+            finish[label] = durations.get(label, 0.0) + (finish[before] if before else 0.0)
+            previous[label] = before
+        if not finish:
+            return [], 0.0
+        label = max(finish, key=finish.get)
+        total = finish[label]
+        path = []
+        while label:
+            path.append(label)
+            label = previous[label]
+        return path[::-1], total
+
+    def run(self, workers=0):
+        """Run every stage; returns False when a required stage returned False"""
+        graph = self.dependencies()
+        nodes = {label: (prefix, owner, stage) for label, prefix, owner, stage in self.nodes}
+        declared = {}
+        final_versions = {}
+        for label, prefix, owner, stage in self.nodes:
+            declared.setdefault(prefix, set()).update(stage.inputs + stage.writes)
+            for attr in stage.writes:
+                final_versions[(prefix, attr)] = (prefix, attr, label)
+
+        # Versions: (prefix, attribute, writer) -> value; writer None is the owner's value before the run
+        values = {}
+        readers = {}
+        for label, (_, reads) in graph.items():
+            for version in reads:
+                prefix, attr, writer = version
+                if writer is None:
+                    values[version] = getattr(self.owners[prefix], attr)
+                readers[version] = readers.get(version, 0) + 1
+        shared = {}
+
+        # Content addresses: stage label -> key, version -> key; root versions are hashed before any stage changes them
+        keys = {}
+        version_keys = {}
+        forced = set()
+        if self.cache is not None:
+            for version in readers:
+                if version[2] is None:
+                    version_keys[version] = joblib.hash(values[version])
+
+        pending = dict(graph)
+        done = set()
+        durations = {}
+        running = {}
+        executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        start = time.perf_counter()
+
+        def shell_for(label):
+            prefix, owner, stage = nodes[label]
+            shell = copy.copy(owner)
+            # Every declared attribute starts empty so the stage only sees its inputs
+            for attr in declared[prefix]:
+                setattr(shell, attr, None)
+            return shell
+
+        def finish(label, outputs, result, seconds):
+            prefix, owner, stage = nodes[label]
+            for attr, value in outputs.items():
+                values[(prefix, attr, label)] = value
+            durations[label] = seconds
+            done.add(label)
+            for version in graph[label][1]:
+                readers[version] -= 1
+                if readers[version] > 0:
+                    continue
+                # The last reader is done: free the shared copy and any superseded version
+                if version in shared:
+                    block = SharedMemory(name=shared.pop(version)[0])
+                    block.close()
+                    block.unlink()
+                if version[2] is not None and final_versions.get(version[:2]) != version:
+                    values.pop(version, None)
+            return not (stage.required and result is False)
+
+        def serve(label):
+            """Key a ready stage and finish it from the cache when its entry is stored"""
+            prefix, owner, stage = nodes[label]
+            deps, reads = graph[label]
+            if self.cache.forced(label, stage) or deps & forced:
+                forced.add(label)
+            inputs = {}
+            for version, attr in reads.items():
+                if version not in version_keys:
+                    version_keys[version] = joblib.hash((keys[version[2]], attr))
+                inputs[attr] = version_keys[version]
+            keys[label] = self.cache.key(owner, stage, inputs)
+            load_start = time.perf_counter()
+            entry = self.cache.get(keys[label]) if stage.cache and label not in forced else None
+            if entry is None:
+                return False
+
+            del pending[label]
+            with self.profiler.stage(label) as record:
+                self.cache.restore(keys[label], entry)
+                # Charts are re-submitted so a changed drawing function still redraws them
+                for path, draw, data in entry['charts']:
+                    owner.renderer.submit(path, draw, data)
+                record['cache'] = 'hit'
+            # Including the time spent loading the entry
+            record['wall_time_s'] = time.perf_counter() - load_start
+            print(f"♻️ {label} unchanged, reusing its cached outputs")
+            finish(label, entry['outputs'], entry['result'], record['wall_time_s'])
+            return True
+
+        def store(label, outputs, result, charts, record):
+            prefix, owner, stage = nodes[label]
+            if self.cache is None or not stage.cache or (stage.required and result is False):
+                return
+            record['cache'] = 'miss'
+            self.cache.put(keys[label], label, outputs, result, self.cache.paths(owner, stage.files), charts)
+
+        try:
+            while pending or running:
+                ready = [label for label, (deps, _) in pending.items() if deps <= done]
+                if self.cache is not None:
+                    served = [label for label in ready if label not in keys and serve(label)]
+                    if served:
+                        continue
+                if executor is not None:
+                    for label in [label for label in ready if nodes[label][2].worker]:
+                        prefix, owner, stage = nodes[label]
+                        handles = {}
+                        for version, attr in graph[label][1].items():
+                            if version not in shared:
+                                shared[version] = share(values[version])
+                            handles[attr] = shared[version]
+                        future = executor.submit(_run_in_worker, shell_for(label), stage, label, handles)
+                        running[future] = label
+                        del pending[label]
+                    ready = [label for label in ready if label in pending]
+
+                if ready:
+                    # Main-process stages run one at a time while the workers keep going
+                    label = ready[0]
+                    del pending[label]
+                    prefix, owner, stage = nodes[label]
+                    shell = shell_for(label)
+                    for version, attr in graph[label][1].items():
+                        setattr(shell, attr, _stage_input(values[version]))
+                    stage_start = time.perf_counter()
+                    first_record = len(self.profiler.stages)
+                    result, charts = _call_stage(self.profiler, shell, stage, label)
+                    outputs = {attr: getattr(shell, attr) for attr in stage.outputs}
+                    if stage.result:
+                        outputs[stage.result] = result
+                    if not finish(label, outputs, result, time.perf_counter() - stage_start):
+                        return False
+                    store(label, outputs, result, charts, self.profiler.stages[first_record])
+                    continue
+
+                if not running:
+                    raise RuntimeError(f"Stages waiting on each other: {sorted(pending)}")
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    label = running.pop(future)
+                    handles, result, records, charts = future.result()
+                    outputs = {attr: load_shared(handle, unlink=True) for attr, handle in handles.items()}
+                    self.profiler.stages.extend(records)
+                    # The worker's own timing, without the time spent queued for a free worker
+                    if not finish(label, outputs, result, records[0]['wall_time_s']):
+                        return False
+                    store(label, outputs, result, charts, records[0])
+        finally:
+            if executor is not None:
+                for future in running:
+                    future.cancel()
+                executor.shutdown()
+            for handle in shared.values():
+                block = SharedMemory(name=handle[0])
+                block.close()
+                block.unlink()
+
+        # The owners end up holding the last version of every attribute, as after a linear run
+        for (prefix, attr), version in final_versions.items():
+            setattr(self.owners[prefix], attr, values[version])
+
+        path, path_time = self.critical_path(durations, graph)
+        if self.profiler.run is not None:
+            self.profiler.run['dag'] = {
+                'workers': workers,
+                'wall_time_s': time.perf_counter() - start,
+                'critical_path': path,
+                'critical_path_s': path_time
+            }
+        return True
+
+
+def default_workers():
+    """Worker processes for worker stages: one per extra core (0 runs every stage in this process)"""
+    return max((os.cpu_count() or 1) - 1, 0)
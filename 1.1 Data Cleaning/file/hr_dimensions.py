@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# Reference tables: name -> (integer key column, label column)
+DIMENSIONS = {
+    'EducationLevel': ('EducationLevelID', 'EducationLevel'),
+    'RatingLevel': ('RatingID', 'RatingLevel'),
+    'SatisfiedLevel': ('SatisfactionID', 'SatisfactionLevel')
+}
+
+# Review columns labelled from each reference table; the label goes in <Column>Level
+REVIEW_LABELS = {
+    'SatisfiedLevel': ['EnvironmentSatisfaction', 'JobSatisfaction', 'RelationshipSatisfaction', 'WorkLifeBalance'],
+    'RatingLevel': ['SelfRating', 'ManagerRating']
+}
+LABEL_SUFFIX = 'Level'
+
+
+class DimensionLookup:
+    """A small reference table held as a dense array indexed by its integer key.
+
+    rows[key] is the table row of each key (-1 for keys the table does not
+    have), so looking up a column of codes is one array index instead of a
+    hash join. Codes that are missing, negative, fractional or beyond the
+    largest key find no row, like the unmatched rows of a left merge.
+    """
+
+    def __init__(self, table, key, label):
+        self.table = table.reset_index(drop=True)
+        self.key = key
+        self.label = label
+
+        keys = self.table[key].to_numpy(dtype='float64')
+        if len(keys) and (keys.min() < 0 or not np.array_equal(keys, np.floor(keys))):
+            raise ValueError(f"{key} must hold non-negative integer keys")
+        if pd.Index(keys).has_duplicates:
+            raise ValueError(f"{key} has duplicate keys")
+
+        # One slot per key up to the largest, plus a last slot that is never a row
+        size = int(keys.max()) + 2 if len(keys) else 1
+        self.rows = np.full(size, -1, dtype='intp')
+        self.rows[keys.astype('intp')] = np.arange(len(keys))
+
+        labels = pd.Categorical(self.table[label])
+        self.label_dtype = labels.dtype
+        # Label code of each row, with -1 (missing) at the end for rows[...] == -1
+        self.label_codes = np.append(labels.codes, -1)
+
+    def positions(self, codes):
+        """Table row of each code (-1 when there is none)"""
+        values = np.asarray(codes, dtype='float64')
+        slots = np.full(len(values), len(self.rows) - 1, dtype='intp')
+        valid = (values >= 0) & (values < len(self.rows) - 1) & (values == np.floor(values))
+        slots[valid] = values[valid]
+        return self.rows[slots]
+
+    def labels(self, codes):
+        """The label of each code as a categorical (missing when the code has no row)"""
+        return pd.Categorical.from_codes(self.label_codes[self.positions(codes)], dtype=self.label_dtype)
+
+    def join(self, df, on):
+        """df with the table's columns appended, as df.merge(table, left_on=on, right_on=key, how='left')"""
+        rows = self.positions(df[on])
+        columns = self.table.take(rows) if (rows >= 0).all() else self.table.reindex(rows)
+        columns.index = pd.RangeIndex(len(df))
+        return pd.concat([df.reset_index(drop=True), columns], axis=1)
+
+
+def build_lookups(tables):
+    """A DimensionLookup for each loaded reference table (name -> DataFrame)"""
+    return {
+        name: DimensionLookup(table, *DIMENSIONS[name])
+        for name, table in tables.items() if table is not None
+    }
+
+
+def add_review_labels(df, lookups):
+    """Append the rating and satisfaction label of every review column in df"""
+    labels = {
+        col + LABEL_SUFFIX: lookups[name].labels(df[col])
+        for name, columns in REVIEW_LABELS.items() if name in lookups
+        for col in columns if col in df.columns
+    }
+    return df.assign(**labels)
+
+
+class EmployeeIndex:
+    """Hash index of the employee table's EmployeeIDs, built once and reused for every review join.
+
+    join() looks each distinct EmployeeID of the reviews up in the index and
+    groups the reviews by the employee position found (an integer sort), so
+    the employee table is never hashed or sorted again and rows are taken
+    from both sides by position. The result matches employees.merge(reviews,
+    on='EmployeeID', how=how): employees in table order, each one's reviews
+    in their original order. matched records which employees any join has
+    found reviews for.
+    """
+
+    def __init__(self, employees, key='EmployeeID'):
+        self.employees = employees.reset_index(drop=True)
+        self.key = key
+        self.index = pd.Index(self.employees[key])
+        self.matched = np.zeros(len(self.index), dtype=bool)
+
+    def __len__(self):
+        return len(self.index)
+
+    def positions(self, employee_ids):
+        """Position of each EmployeeID in the employee table (-1 for unknown employees)"""
+        # Reviews repeat their employee, so only the distinct IDs are looked up
+        codes, uniques = pd.factorize(employee_ids)
+        return self.index.get_indexer(uniques)[codes] if len(uniques) else np.full(len(codes), -1, dtype='intp')
+
+    def join(self, reviews, how='left'):
+        """Join reviews to the employees ('left' keeps one row for employees without reviews)"""
+        if how not in ('left', 'inner'):
+            raise ValueError(f"Unsupported join '{how}', expected 'left' or 'inner'")
+        overlap = set(reviews.columns) & set(self.employees.columns) - {self.key}
+        if not self.index.is_unique or overlap:
+            # Duplicate IDs multiply rows and shared columns get suffixes; leave those to merge
+            self.matched |= self.index.isin(reviews[self.key])
+            return self.employees.merge(reviews, on=self.key, how=how)
+
+        positions = self.positions(reviews[self.key])
+        found = np.flatnonzero(positions >= 0)
+        # Position * rows + row is unique, so the fast unstable sort keeps each employee's reviews in order
+        order = found[np.argsort(positions[found].astype('int64') * len(positions) + found)]
+        counts = np.bincount(positions[found], minlength=len(self.index))
+        self.matched |= counts > 0
+
+        employees = np.arange(len(self.index))
+        if how == 'inner':
+            left_rows = np.repeat(employees, counts)
+            right_rows = order
+        else:
+            slots = np.maximum(counts, 1)
+            left_rows = np.repeat(employees, slots)
+            right_rows = np.full(len(left_rows), -1, dtype='intp')
+            right_rows[np.repeat(counts > 0, slots)] = order
+
+        left = self.employees.take(left_rows)
+        right = reviews.drop(columns=self.key).reset_index(drop=True)
+        right = right.take(right_rows) if (right_rows >= 0).all() else right.reindex(right_rows)
+        left.index = right.index = pd.RangeIndex(len(left_rows))
+        return pd.concat([left, right], axis=1)
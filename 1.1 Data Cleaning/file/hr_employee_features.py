@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Review fields summarised per employee by their mean, latest value and trend
+TREND_FIELDS = ['EnvironmentSatisfaction', 'JobSatisfaction', 'RelationshipSatisfaction', 'WorkLifeBalance',
+                'SelfRating', 'ManagerRating', 'PerformanceScore', 'OverallSatisfaction']
+
+# Review fields summarised per employee by their mean only
+MEAN_FIELDS = ['TrainingOpportunitiesWithinYear', 'TrainingOpportunitiesTaken',
+               'TrainingUtilization', 'AttritionRisk']
+
+# Review times are measured in years from a fixed origin so partial sums stay mergeable
+TREND_EPOCH = pd.Timestamp('2000-01-01')
+
+
+class EmployeeReviewAccumulator:
+    """Mergeable per-employee review statistics for the employee-level feature table.
+
+    Keeps the review count, the sums needed for each field's mean and least-squares
+    trend (change per year) and the latest review of every employee. Blocks of
+    merged rows can be folded in chunk by chunk or shard by shard.
+    """
+
+    def __init__(self):
+        self.sums = None
+        self.latest = None
+
+    def update(self, df):
+        """Fold a block of merged rows (one per review) into the statistics"""
+        reviews = df[df['ReviewDate'].notna()]
+        if len(reviews) == 0:
+            return self
+
+        t = ((reviews['ReviewDate'] - TREND_EPOCH) / pd.Timedelta(days=365.25)).to_numpy()
+        values = reviews[TREND_FIELDS + MEAN_FIELDS].to_numpy(dtype='float64')
+
+        parts = {'ReviewCount': np.ones(len(reviews)), 't': t, 'tt': t * t}
+        for j, field in enumerate(TREND_FIELDS + MEAN_FIELDS):
+            parts[field] = values[:, j]
+        for j, field in enumerate(TREND_FIELDS):
+            parts['t*' + field] = t * values[:, j]
+        sums = pd.DataFrame(parts).groupby(reviews['EmployeeID'].to_numpy(), sort=False).sum()
+
+        latest = reviews[['EmployeeID', 'ReviewDate'] + TREND_FIELDS].sort_values('ReviewDate', kind='stable')
+        latest = latest.groupby('EmployeeID', sort=False).tail(1).set_index('EmployeeID')
+
+        self._combine(sums, latest)
+        return self
+
+    def merge(self, other):
+        """Fold another accumulator into this one"""
+        if other.sums is not None:
+            self._combine(other.sums, other.latest)
+        return self
+
+    def _combine(self, sums, latest):
+        if self.sums is None:
+            self.sums, self.latest = sums, latest
+            return
+
+        self.sums = self.sums.add(sums, fill_value=0)
+        # On equal review dates the later block wins, as in a single pass
+        latest = pd.concat([self.latest, latest]).sort_values('ReviewDate', kind='stable')
+        self.latest = latest.groupby(level=0, sort=False).tail(1)
+
+    def result(self, employees):
+        """Join the per-employee review features onto one row per employee"""
+        features = pd.DataFrame(index=pd.Index(employees['EmployeeID'], name='EmployeeID'))
+        if self.sums is None:
+            features['ReviewCount'] = 0
+            return employees.reset_index(drop=True).join(features.reset_index(drop=True))
+
+        sums = self.sums.reindex(features.index)
+        latest = self.latest.reindex(features.index)
+        n = sums['ReviewCount']
+
+        features['ReviewCount'] = n.fillna(0).astype('int64')
+        features['LastReviewDate'] = latest['ReviewDate']
+
+        # Least-squares slope per year; employees with one review date have no trend
+        variance = n * sums['tt'] - sums['t'] ** 2
+        has_trend = variance > 1e-9 * (n * sums['tt']).abs()
+        for field in TREND_FIELDS:
+            features[field] = sums[field] / n
+            features[field + 'Latest'] = latest[field]
+            slope = (n * sums['t*' + field] - sums['t'] * sums[field]) / variance.where(has_trend)
+            features[field + 'Trend'] = slope.where(has_trend, 0.0).where(n > 0)
+        for field in MEAN_FIELDS:
+            features[field] = sums[field] / n
+
+        return employees.reset_index(drop=True).join(features.reset_index(drop=True))
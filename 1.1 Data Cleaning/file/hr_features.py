@@ -0,0 +1,175 @@
+import json
+import numpy as np
+import pandas as pd
+
+SATISFACTION_COLUMNS = ['JobSatisfaction', 'EnvironmentSatisfaction', 'RelationshipSatisfaction']
+
+# Right-closed bins, as with pd.cut; SalaryRange edges are learned by FeatureTransformer.fit
+CATEGORY_BINS = {
+    'AgeGroup': ([0, 30, 40, 50, 100], ['Under 30', '30-40', '40-50', 'Over 50']),
+    'TenureCategory': ([0, 2, 5, 10, 100], ['New', 'Early Career', 'Mid Career', 'Long Term']),
+    'PerformanceCategory': ([0, 2, 3, 4, 5], ['Needs Improvement', 'Meets Expectations',
+                                              'Exceeds Expectations', 'Outstanding'])
+}
+SALARY_LABELS = ['Low', 'Below Average', 'Average', 'Above Average', 'High']
+
+# Raw columns the derivations read and the derived columns, in the order they are added
+INPUT_COLUMNS = ['Age', 'Salary', 'YearsAtCompany', 'SelfRating', 'ManagerRating', 'WorkLifeBalance',
+                 'TrainingOpportunitiesWithinYear', 'TrainingOpportunitiesTaken'] + SATISFACTION_COLUMNS
+FEATURE_COLUMNS = ['AgeGroup', 'SalaryRange', 'PerformanceScore', 'OverallSatisfaction',
+                   'TrainingUtilization', 'TenureCategory', 'PerformanceCategory', 'AttritionRisk']
+
+
+def category_labels(name):
+    """Labels of a binned feature"""
+    return SALARY_LABELS if name == 'SalaryRange' else CATEGORY_BINS[name][1]
+
+
+def _bin_codes(values, edges, open_ended=False):
+    """Category codes of values in right-closed bins (-1 outside the bins or missing).
+
+    With only a handful of edges, summing one comparison per inner edge is much
+    faster than a binary search per value.
+    """
+    codes = np.zeros(len(values), dtype='int8')
+    for edge in edges[1:-1]:
+        codes += values > edge
+    if open_ended:
+        codes[np.isnan(values)] = -1
+    else:
+        codes[~((values > edges[0]) & (values <= edges[-1]))] = -1
+    return codes
+
+
+class FeatureTransformer:
+    """Derive the HR feature columns with one NumPy pass over float arrays.
+
+    The SalaryRange bin edges are learned once by fit() and persisted with
+    save(), so every later batch, incremental, streaming or single-row call
+    bins salaries identically. Scores are computed into preallocated buffers
+    without intermediate DataFrames.
+    """
+
+    def __init__(self, salary_bins=None):
+        self.salary_bins = None if salary_bins is None else [float(edge) for edge in salary_bins]
+
+    @property
+    def fitted(self):
+        return self.salary_bins is not None
+
+    def fit(self, salaries):
+        """Learn the five equal-width SalaryRange bin edges from a salary column"""
+        _, bins = pd.cut(salaries, bins=5, retbins=True)
+        self.salary_bins = [float(edge) for edge in bins]
+        return self
+
+    def to_dict(self):
+        return {'salary_bins': self.salary_bins}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state.get('salary_bins'))
+
+    def save(self, path='feature_transformer.json'):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path='feature_transformer.json'):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def codes(self, name, values):
+        """Category codes of one binned feature"""
+        values = np.asarray(values, dtype='float64')
+        if name == 'SalaryRange':
+            if not self.fitted:
+                raise ValueError("FeatureTransformer is not fitted, call fit() with the salaries first")
+            # Open-ended outer bins so new salaries always get a range
+            return _bin_codes(values, self.salary_bins, open_ended=True)
+        return _bin_codes(values, CATEGORY_BINS[name][0])
+
+    def categorize(self, name, values):
+        """One binned feature as an ordered categorical (like pd.cut)"""
+        return pd.Categorical.from_codes(self.codes(name, values), categories=category_labels(name), ordered=True)
+
+    def compute(self, columns):
+        """Compute every derived feature from a mapping of input column -> values.
+
+        Returns a dict of NumPy arrays: float scores and int8 category codes
+        (SalaryRange only when fitted). Works the same for one row or millions.
+        """
+        col = {name: np.atleast_1d(np.asarray(columns[name], dtype='float64'))
+               for name in INPUT_COLUMNS if name in columns}
+        n = len(next(iter(col.values())))
+        out = {}
+
+        # Performance score (average of self and manager rating)
+        performance = np.add(col['SelfRating'], col['ManagerRating'], out=np.empty(n))
+        performance /= 2
+        out['PerformanceScore'] = performance
+
+        # Overall satisfaction score (mean of the available satisfaction ratings)
+        overall = np.add(col['JobSatisfaction'], col['EnvironmentSatisfaction'], out=np.empty(n))
+        overall += col['RelationshipSatisfaction']
+        overall /= 3
+        missing = np.flatnonzero(np.isnan(overall))
+        if len(missing):
+            ratings = np.column_stack([col[name].take(missing) for name in SATISFACTION_COLUMNS])
+            present = (~np.isnan(ratings)).sum(axis=1)
+            partial = present > 0
+            overall[missing[partial]] = np.nansum(ratings[partial], axis=1) / present[partial]
+        out['OverallSatisfaction'] = overall
+
+        # Training utilization rate (0 when there were no opportunities)
+        offered = col['TrainingOpportunitiesWithinYear']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            utilization = np.divide(col['TrainingOpportunitiesTaken'], offered, out=np.empty(n))
+        utilization[~(offered > 0)] = 0
+        out['TrainingUtilization'] = utilization
+
+        # Risk score for attrition, accumulated in one buffer
+        risk = np.subtract(5, col['JobSatisfaction'], out=np.empty(n))
+        risk *= 0.3
+        term = np.subtract(5, col['WorkLifeBalance'], out=np.empty(n))
+        term *= 0.2
+        risk += term
+        np.subtract(5, overall, out=term)
+        term *= 0.3
+        risk += term
+        np.multiply(col['YearsAtCompany'] < 2, 0.2, out=term)
+        risk += term
+        out['AttritionRisk'] = risk
+
+        out['AgeGroup'] = self.codes('AgeGroup', col['Age'])
+        if self.fitted:
+            out['SalaryRange'] = self.codes('SalaryRange', col['Salary'])
+        out['TenureCategory'] = self.codes('TenureCategory', col['YearsAtCompany'])
+        out['PerformanceCategory'] = self.codes('PerformanceCategory', performance)
+        return out
+
+    def transform(self, df):
+        """Add the derived feature columns to a DataFrame in place and return it"""
+        out = self.compute({name: df[name].to_numpy(dtype='float64') for name in INPUT_COLUMNS})
+        for name in FEATURE_COLUMNS:
+            if name not in out:
+                continue
+            if out[name].dtype == 'int8':
+                df[name] = pd.Categorical.from_codes(out[name], categories=category_labels(name), ordered=True)
+            else:
+                df[name] = out[name]
+        return df
+
+    def transform_row(self, row):
+        """Derive the features of a single row given as a dict (categories as labels)"""
+        out = self.compute(row)
+        features = {}
+        for name in FEATURE_COLUMNS:
+            if name not in out:
+                continue
+            value = out[name][0]
+            if out[name].dtype == 'int8':
+                features[name] = category_labels(name)[value] if value >= 0 else None
+            else:
+                features[name] = float(value)
+        return features
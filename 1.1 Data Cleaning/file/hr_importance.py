@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+
+def _frame(values, columns):
+    """The model input as it was fitted: a DataFrame when it was fitted with feature names"""
+    return pd.DataFrame(values, columns=columns) if columns is not None else values
+
+
+def _auc(model, values, columns, y):
+    from sklearn.metrics import roc_auc_score
+    return roc_auc_score(y, model.predict_proba(_frame(values, columns))[:, 1])
+
+
+def _permuted_score(model, values, columns, y, feature, repeat, seed):
+    """AUC with one feature column shuffled (runs in a worker process)"""
+    # Seeded by (feature, repeat) so every model sees the same shuffles
+    order = np.random.default_rng([seed, feature, repeat]).permutation(len(values))
+    permuted = values.copy()
+    permuted[:, feature] = values[order, feature]
+    return _auc(model, permuted, columns, y)
+
+
+def permutation_importance(models, y, features, repeats=5, n_jobs=-1, seed=42):
+    """Permutation importance of every feature for every model on held-out rows.
+
+    models maps a model name to (fitted model, held-out input), the input in
+    the form the model was fitted on (a DataFrame, or the scaled array of a
+    scaled model). A feature's importance is the mean drop in test AUC when
+    its column is shuffled, over repeats shuffles; unlike impurity-based
+    importances it is the same measure for every kind of model and is not
+    inflated for high-cardinality features. Every (model, feature, repeat)
+    evaluation is a separate task for a pool of n_jobs worker processes.
+    Returns model, feature, importance and importance_std, most important
+    first within each model.
+    """
+    y = np.asarray(y)
+    inputs = {}
+    tasks = []
+    for name, (model, X) in models.items():
+        columns = list(X.columns) if isinstance(X, pd.DataFrame) else None
+        values = np.asarray(X, dtype='float64')
+        inputs[name] = (model, values, columns)
+        tasks += [(name, feature, delayed(_permuted_score)(model, values, columns, y, feature, repeat, seed))
+                  for feature in range(len(features)) for repeat in range(repeats)]
+
+    scores = Parallel(n_jobs=n_jobs)(task for _, _, task in tasks)
+    permuted = pd.DataFrame({
+        'model': [name for name, _, _ in tasks],
+        'feature': [features[feature] for _, feature, _ in tasks],
+        'score': scores
+    })
+    baselines = pd.Series({name: _auc(model, values, columns, y) for name, (model, values, columns) in inputs.items()})
+
+    drops = permuted.assign(drop=baselines.reindex(permuted['model']).to_numpy() - permuted['score'])
+    importance = drops.groupby(['model', 'feature'], sort=False)['drop'].agg(importance='mean', importance_std='std')
+    importance = importance.reset_index().fillna({'importance_std': 0.0})
+    # Models in the order given, features by importance within each
+    order = {name: position for position, name in enumerate(models)}
+    importance = importance.sort_values(['model', 'importance'], ascending=[True, False],
+                                        key=lambda col: col.map(order) if col.name == 'model' else col)
+    return importance.reset_index(drop=True)
@@ -0,0 +1,193 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module
+    resource = None
+
+MB = 1024 * 1024
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
+
+
+class StageProfiler:
+    """Record wall time, CPU time, peak RSS and row counts for each pipeline stage.
+
+    Timing and RSS come from perf_counter / process_time / getrusage and cost a
+    few microseconds per stage, so the profiler is always on. cProfile and
+    tracemalloc capture are opt-in because they slow the stages down. Stages
+    can be nested (recorded as 'parent/child'); only top-level stages are
+    profiled. CPU time covers this process, not worker processes.
+    """
+
+    def __init__(self, profile=False, trace_memory=False, top_functions=15):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.top_functions = top_functions
+        self.run = None
+        self.stages = []
+        self.stack = []
+        self._started_tracing = False
+
+    @property
+    def active(self):
+        return self.run is not None and 'finished' not in self.run
+
+    def start(self, pipeline, mode):
+        """Begin recording a pipeline run"""
+        self.stages = []
+        self.stack = []
+        self.run = {
+            'pipeline': pipeline,
+            'mode': mode,
+            'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'profile': self.profile,
+            'trace_memory': self.trace_memory,
+            '_wall': time.perf_counter(),
+            '_cpu': time.process_time()
+        }
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def finish(self):
+        """Close the run and its totals"""
+        self.run['finished'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.run['wall_time_s'] = time.perf_counter() - self.run.pop('_wall')
+        self.run['cpu_time_s'] = time.process_time() - self.run.pop('_cpu')
+        self.run['peak_rss_mb'] = peak_rss_mb()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Time a block of work; the yielded record accepts extra fields such as rows_out"""
+        top_level = not self.stack
+        record = {'stage': '/'.join(self.stack + [name]), 'status': 'ok', 'rows_in': rows_in, 'rows_out': None}
+        self.stages.append(record)
+        self.stack.append(name)
+
+        profiler = None
+        if self.profile and top_level:
+            profiler = cProfile.Profile()
+        tracing = self.trace_memory and top_level and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+
+        rss_before = peak_rss_mb()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException as e:
+            record['status'] = 'failed'
+            record['error'] = repr(e)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['wall_time_s'] = time.perf_counter() - wall
+            record['cpu_time_s'] = time.process_time() - cpu
+            record['peak_rss_mb'] = peak_rss_mb()
+            if rss_before is not None:
+                # How far the stage pushed the process high-water mark
+                record['rss_growth_mb'] = record['peak_rss_mb'] - rss_before
+            if tracing:
+                record['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / MB
+            if profiler is not None:
+                record['top_functions'] = self._top_functions(profiler)
+            self.stack.pop()
+
+    def run_stage(self, owner, name, tables=(None, None), *args, label=None):
+        """Call owner.<name>(*args) as a stage (recorded as label), counting rows of the named owner tables in and out"""
+        def rows(table):
+            df = getattr(owner, table, None) if table else None
+            return len(df) if df is not None else None
+
+        table_in, table_out = tables
+        with self.stage(label or name, rows_in=rows(table_in)) as record:
+            result = getattr(owner, name)(*args)
+            record['rows_out'] = rows(table_out)
+        return result
+
+    def _top_functions(self, profiler):
+        stats = pstats.Stats(profiler).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_functions]
+        return [
+            {
+                'function': f"{os.path.basename(filename)}:{line}({function})",
+                'calls': calls,
+                'tottime_s': tottime,
+                'cumtime_s': cumtime
+            }
+            for (filename, line, function), (_, calls, tottime, cumtime, _) in ranked
+        ]
+
+    def report(self):
+        """The run as a JSON-serializable dict"""
+        return dict(self.run or {}, stages=self.stages)
+
+    def write(self, path):
+        """Write the machine-readable run report"""
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+
+    def print_summary(self):
+        print("\n⏱️ Stage timings:")
+        for record in self.stages:
+            rows = ''
+            if record['rows_in'] is not None or record['rows_out'] is not None:
+                rows_in, rows_out = (('-' if n is None else n) for n in (record['rows_in'], record['rows_out']))
+                rows = f", rows {rows_in} → {rows_out}"
+            rss = f", peak RSS {record['peak_rss_mb']:.0f} MB" if record.get('peak_rss_mb') is not None else ''
+            cached = ' (cached)' if record.get('cache') == 'hit' else ''
+            print(f"  {record['stage']}: {record['wall_time_s']:.3f}s wall, "
+                  f"{record['cpu_time_s']:.3f}s CPU{rss}{rows}{cached}")
+
+
+def profiled_run(pipeline, mode):
+    """Decorate a pipeline run method so its stages are recorded and the run report written.
+
+    The owner needs a profiler (StageProfiler) and a run_report_file attribute.
+    A run started from inside another run (e.g. a fallback) joins the outer one.
+    When the outer run ends, also on failure, the owner's chart renderer (if
+    any) is closed so no render processes outlive it.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.profiler.active:
+                return method(self, *args, **kwargs)
+
+            self.profiler.start(pipeline, mode)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                renderer = getattr(self, 'renderer', None)
+                if renderer is not None:
+                    renderer.close()
+                self.profiler.finish()
+                self.profiler.write(self.run_report_file)
+                self.profiler.print_summary()
+                print(f"📄 Run report saved to {self.run_report_file}")
+        return wrapper
+    return decorator
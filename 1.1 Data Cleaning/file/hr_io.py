@@ -0,0 +1,190 @@
+import os
+import shutil
+import pandas as pd
+
+# Supported output formats and their file extensions
+OUTPUT_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather'
+}
+
+# Columnar formats are preferred when reading back, CSV is the fallback
+READ_PREFERENCE = ['parquet', 'feather', 'csv']
+
+
+def columnar_available():
+    """Check whether pyarrow is installed for Parquet / Arrow IPC output"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def table_path(name, fmt):
+    """Return the file (or dataset directory) path of a table in a format"""
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}', expected one of {list(OUTPUT_FORMATS)}")
+    return name + OUTPUT_FORMATS[fmt]
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def remove_other_copies(name, written):
+    """Delete a table's copies in formats other than the paths just written.
+
+    Readers prefer columnar copies, so a Parquet or Feather copy left by an
+    earlier run with other --format options would shadow the fresh CSV.
+    """
+    for fmt in OUTPUT_FORMATS:
+        path = table_path(name, fmt)
+        if path not in written:
+            _remove(path)
+
+
+def write_tables(df, name, formats, index=False, partition_by=None):
+    """Write a table in every one of formats and drop its copies in any other format"""
+    written = [write_table(df, name, fmt=fmt, index=index, partition_by=partition_by) for fmt in formats]
+    remove_other_copies(name, written)
+    return written
+
+
+def write_table(df, name, fmt='csv', index=False, partition_by=None, compression='zstd'):
+    """Write a table in the given format and return the path written.
+
+    Parquet and Feather keep categorical and datetime dtypes. Parquet output can
+    be partitioned into one directory per value of the partition_by columns.
+    """
+    if fmt != 'csv' and not columnar_available():
+        print(f"⚠️ pyarrow is not installed, writing {name} as CSV instead of {fmt}")
+        fmt = 'csv'
+
+    path = table_path(name, fmt)
+
+    if fmt == 'csv':
+        df.to_csv(path, index=index)
+        return path
+
+    # Columnar readers return plain columns, so keep the index as one
+    if index:
+        df = df.reset_index()
+
+    if fmt == 'parquet':
+        if partition_by:
+            # Rewrite the whole dataset so removed partitions do not linger
+            _remove(path)
+            df.to_parquet(path, index=False, compression=compression, partition_cols=list(partition_by))
+        else:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            df.to_parquet(path, index=False, compression=compression)
+    else:
+        if partition_by:
+            print(f"⚠️ Feather output cannot be partitioned, writing {path} as a single file")
+        df.reset_index(drop=True).to_feather(path, compression=compression)
+
+    return path
+
+
+def find_table(name, formats=None):
+    """Return the format of the preferred existing copy of a table, or None"""
+    for fmt in formats or READ_PREFERENCE:
+        if os.path.exists(table_path(name, fmt)):
+            if fmt != 'csv' and not columnar_available():
+                continue
+            return fmt
+    return None
+
+
+def read_table(name, columns=None, fmt=None, parse_dates=None, dtype=None):
+    """Read a table written by write_table, optionally only some of its columns.
+
+    Without an explicit format the columnar copy is preferred over CSV. Tables
+    written with index=True come back with the index as their first column.
+    Columnar copies keep their stored dtypes; dtype only applies to CSV.
+    """
+    fmt = fmt or find_table(name)
+    if fmt is None:
+        raise FileNotFoundError(f"No output found for table '{name}'")
+
+    path = table_path(name, fmt)
+
+    if fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+        # Partition columns come back last, restore the requested order
+        return df[columns] if columns is not None else df
+
+    if fmt == 'feather':
+        return pd.read_feather(path, columns=columns)
+
+    if parse_dates is not None and columns is not None:
+        parse_dates = [col for col in parse_dates if col in columns]
+    df = pd.read_csv(path, usecols=columns, parse_dates=parse_dates, dtype=dtype, float_precision='round_trip')
+    return df[columns] if columns is not None else df
+
+
+class TableAppender:
+    """Write a table block by block so it never has to be held in memory whole.
+
+    CSV blocks are appended to one file, Parquet blocks become new files in the
+    (optionally partitioned) dataset directory and Feather blocks are record
+    batches of one Arrow IPC file. Every block must have the same columns.
+    """
+
+    def __init__(self, name, fmt='csv', partition_by=None, compression='zstd'):
+        if fmt != 'csv' and not columnar_available():
+            print(f"⚠️ pyarrow is not installed, writing {name} as CSV instead of {fmt}")
+            fmt = 'csv'
+
+        self.fmt = fmt
+        self.path = table_path(name, fmt)
+        self.partition_by = list(partition_by) if partition_by else None
+        self.compression = compression
+        self.schema = None
+        self.writer = None
+        self.rows = 0
+
+        # Start from an empty output
+        _remove(self.path)
+
+    def append(self, df):
+        """Append one block of rows"""
+        if self.fmt == 'csv':
+            df.to_csv(self.path, mode='a', header=self.rows == 0, index=False)
+            self.rows += len(df)
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.schema is None:
+            self.schema = pa.Schema.from_pandas(df, preserve_index=False)
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+
+        if self.fmt == 'parquet':
+            if self.partition_by:
+                pq.write_to_dataset(table, self.path, partition_cols=self.partition_by,
+                                    compression=self.compression)
+            else:
+                if self.writer is None:
+                    self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+                self.writer.write_table(table)
+        else:
+            if self.writer is None:
+                options = pa.ipc.IpcWriteOptions(compression=self.compression)
+                self.writer = pa.ipc.new_file(self.path, self.schema, options=options)
+            self.writer.write_table(table)
+
+        self.rows += len(df)
+
+    def close(self):
+        """Finish the output file"""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
@@ -0,0 +1,142 @@
+import bisect
+import hashlib
+import json
+import os
+from datetime import datetime
+import joblib
+import numpy as np
+import pandas as pd
+
+# Attrition probability bands used for the RiskCategory column
+RISK_BINS = [0, 0.2, 0.4, 0.6, 0.8, 1.0]
+RISK_LABELS = ['Very Low', 'Low', 'Medium', 'High', 'Very High']
+
+
+def risk_codes(probabilities):
+    """RiskCategory band index of each probability (-1 outside the bands or missing).
+
+    Right-closed bands as with pd.cut, found with one binary search per value.
+    """
+    codes = np.searchsorted(RISK_BINS, probabilities, side='left') - 1
+    codes[(codes < 0) | (codes >= len(RISK_LABELS))] = -1
+    return codes.astype('int8')
+
+
+def risk_categories(probabilities):
+    """Bucket attrition probabilities into the RiskCategory bands"""
+    return pd.Categorical.from_codes(risk_codes(probabilities), categories=RISK_LABELS, ordered=True)
+
+
+def risk_category(probability):
+    """RiskCategory of a single probability (None outside the bands, like risk_categories)"""
+    position = bisect.bisect_left(RISK_BINS, probability) - 1
+    return RISK_LABELS[position] if 0 <= position < len(RISK_LABELS) else None
+
+
+class ModelRegistry:
+    """Versioned on-disk store of fitted attrition models.
+
+    Every version lives in its own directory named by the hash of the training
+    data and the model configuration, so a version is reused exactly when
+    neither has changed. index.json lists the versions and the latest one.
+    """
+
+    def __init__(self, root='model_registry'):
+        self.root = root
+
+    @staticmethod
+    def fingerprint(X, y, config):
+        """Hash the training features, target and configuration into a version key"""
+        digest = hashlib.sha256()
+        digest.update(','.join(map(str, X.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+        digest.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+        return digest.hexdigest()[:16]
+
+    def bundle_path(self, key):
+        return os.path.join(self.root, key, 'bundle.joblib')
+
+    def artifact_path(self, key, name):
+        """A file derived from a version's models (e.g. their permutation importances), kept alongside them"""
+        return os.path.join(self.root, key, name)
+
+    def has(self, key):
+        return os.path.exists(self.bundle_path(key))
+
+    def read_index(self):
+        """Return the registry index ({'latest': key, 'versions': {key: summary}})"""
+        path = os.path.join(self.root, 'index.json')
+        if not os.path.exists(path):
+            return {'latest': None, 'versions': {}}
+        with open(path) as f:
+            return json.load(f)
+
+    def save(self, key, bundle):
+        """Store a fitted bundle under its key and make it the latest version"""
+        os.makedirs(os.path.join(self.root, key), exist_ok=True)
+        bundle = dict(bundle, key=key, created=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        joblib.dump(bundle, self.bundle_path(key))
+
+        index = self.read_index()
+        index['versions'][key] = {
+            'created': bundle['created'],
+            'best_model': bundle['best_model'],
+            'features': bundle['features'],
+            'metrics': {
+                name: {metric: float(result[metric]) for metric in ['accuracy', 'auc_score', 'cv_auc_mean', 'cv_auc_std']}
+                for name, result in bundle['models'].items()
+            }
+        }
+        index['latest'] = key
+        with open(os.path.join(self.root, 'index.json'), 'w') as f:
+            json.dump(index, f, indent=2)
+        return key
+
+    def load(self, key=None):
+        """Load a bundle by key (the latest version by default)"""
+        if key is None:
+            key = self.read_index()['latest']
+            if key is None:
+                raise FileNotFoundError(f"No models registered in {self.root}")
+        if not self.has(key):
+            raise FileNotFoundError(f"Model version {key} not found in {self.root}")
+
+        return joblib.load(self.bundle_path(key))
+
+
+class AttritionScorer:
+    """Score employee-level feature rows with the best model of a registry version"""
+
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.key = bundle['key']
+        self.features = bundle['features']
+        self.fill_values = bundle['fill_values'].reindex(self.features).to_numpy(dtype='float64')
+        self.model_name = bundle['best_model']
+        self.model = bundle['models'][self.model_name]['model']
+        self.scaler = bundle['scaler'] if self.model_name in bundle['scaled'] else None
+
+    @classmethod
+    def from_registry(cls, root='model_registry', key=None):
+        return cls(ModelRegistry(root).load(key))
+
+    def probabilities(self, df):
+        """Attrition probability of every row (missing features get the training medians)"""
+        X = df.reindex(columns=self.features).to_numpy(dtype='float64')
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self.fill_values, X)
+        X = pd.DataFrame(X, columns=self.features)
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        return self.model.predict_proba(X)[:, 1]
+
+    def score(self, df):
+        """Return EmployeeID, AttritionProbability and RiskCategory for each row"""
+        probabilities = self.probabilities(df)
+        return pd.DataFrame({
+            'EmployeeID': df['EmployeeID'].to_numpy(),
+            'AttritionProbability': probabilities,
+            'RiskCategory': risk_categories(probabilities)
+        })
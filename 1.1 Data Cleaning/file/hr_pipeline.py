@@ -0,0 +1,89 @@
+import argparse
+from hr_analytics_preprocessing import HRAnalyticsPreprocessor, PIPELINE_STAGES, OUTPUT_FORMATS
+from hr_advanced_analytics import HRAdvancedAnalytics, ANALYTICS_STAGES, CLUSTERING_METHODS
+from hr_dag import StageGraph, default_workers
+from hr_instrumentation import StageProfiler, profiled_run
+from hr_stage_cache import StageCache
+
+# The analytics stages start once the preprocessing stage writing their input file is done
+ANALYTICS_AFTER = ['preprocessing/export_employee_features']
+
+
+class HRPipelineJob:
+    """Preprocessing and advanced analytics as one stage graph.
+
+    Both scripts' stages are scheduled together, so the analytics start as
+    soon as employee_features is exported and model training overlaps the
+    preprocessing summary tables, SQL queries and charts. Every stage is
+    recorded in one run report, labelled 'preprocessing/<stage>' or
+    'advanced_analytics/<stage>'.
+    """
+
+    def __init__(self, preprocessor, analytics, stage_workers=None, profile=False, trace_memory=False,
+                 run_report_file='pipeline_job_report.json', stage_cache=None):
+        self.preprocessor = preprocessor
+        self.analytics = analytics
+        self.stage_workers = default_workers() if stage_workers is None else stage_workers
+        self.profiler = StageProfiler(profile=profile, trace_memory=trace_memory)
+        self.run_report_file = run_report_file
+        self.stage_cache = stage_cache
+
+    @profiled_run('end_to_end', 'dag')
+    def run(self):
+        """Run both pipelines; returns False when either could not load its data"""
+        print("🚀 Starting the end-to-end HR Analytics job")
+        print("=" * 50)
+
+        graph = StageGraph(self.profiler, self.stage_cache)
+        graph.add(self.preprocessor, PIPELINE_STAGES, prefix='preprocessing/')
+        graph.add(self.analytics, ANALYTICS_STAGES, prefix='advanced_analytics/', after=ANALYTICS_AFTER)
+        if not graph.run(workers=self.stage_workers):
+            return False
+
+        print("\n🎉 End-to-end job completed successfully!")
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run preprocessing and advanced analytics as one job")
+    parser.add_argument('--stage-workers', type=int, default=None,
+                        help="processes running independent stages (default: one per extra core, 0 runs them in order)")
+    parser.add_argument('--format', nargs='+', default=['csv'], choices=list(OUTPUT_FORMATS),
+                        help="preprocessing output formats (default: csv)")
+    parser.add_argument('--no-sql', action='store_true',
+                        help="skip the SQL queries of the preprocessing")
+    parser.add_argument('--retrain', action='store_true',
+                        help="retrain even if the registry has models for this data and config")
+    parser.add_argument('--n-jobs', type=int, default=-1,
+                        help="worker processes for model training (default: -1, every core)")
+    parser.add_argument('--clustering', choices=CLUSTERING_METHODS, default='kmeans',
+                        help="full KMeans (default) or MiniBatchKMeans warm-started from cluster_model.json")
+    parser.add_argument('--render-workers', type=int, default=None,
+                        help="chart rendering processes (default: one per core, 0 renders inline)")
+    parser.add_argument('--profile', action='store_true',
+                        help="capture a cProfile of every stage in pipeline_job_report.json")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="record the peak Python allocations of every stage with tracemalloc")
+    parser.add_argument('--cache-dir', default='stage_cache',
+                        help="stage cache directory (default: stage_cache)")
+    parser.add_argument('--cache-mb', type=int, default=1024,
+                        help="stage cache size limit; least recently used entries are evicted (default: 1024)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="run every stage instead of reusing cached outputs")
+    parser.add_argument('--invalidate', nargs='+', default=[], metavar='STAGE',
+                        help="re-run these stages and everything depending on them, e.g. employee_clustering "
+                             "or preprocessing/load_data ('all' re-runs every stage)")
+    args = parser.parse_args()
+
+    # The job keys both pipelines' stages in one cache
+    preprocessor = HRAnalyticsPreprocessor(output_formats=args.format, render_workers=args.render_workers,
+                                           sql_database=None if args.no_sql else 'hr_analytics.db', cache_dir=None)
+    analytics = HRAdvancedAnalytics(n_jobs=args.n_jobs, retrain=args.retrain, render_workers=args.render_workers,
+                                    clustering=args.clustering, cache_dir=None)
+    stage_cache = None if args.no_cache else StageCache(args.cache_dir, args.cache_mb, args.invalidate)
+    job = HRPipelineJob(preprocessor, analytics, stage_workers=args.stage_workers,
+                        profile=args.profile, trace_memory=args.trace_memory, stage_cache=stage_cache)
+    success = job.run()
+    if not success:
+        print("\n❌ End-to-end job failed. Please check the error messages above.")
+    raise SystemExit(0 if success else 1)
@@ -0,0 +1,170 @@
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+
+CHART_DPI = 300
+
+
+def _pyplot():
+    """matplotlib.pyplot, imported by the first chart drawn rather than by every pipeline run"""
+    import matplotlib
+    matplotlib.use('Agg')  # Headless: charts are only ever written to files
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def draw_hr_overview(data):
+    """Attrition, salary, age and education overview of the preprocessed data"""
+    plt = _pyplot()
+    try:
+        plt.style.use('seaborn-v0_8')
+    except:
+        plt.style.use('default')
+    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+
+    # 1. Attrition by Department
+    data['attrition_by_dept'].plot(kind='bar', ax=axes[0,0], title='Attrition by Department')
+    axes[0,0].set_ylabel('Number of Attritions')
+    axes[0,0].tick_params(axis='x', rotation=45)
+
+    # 2. Salary Distribution
+    data['salary'].hist(bins=30, ax=axes[0,1])
+    axes[0,1].set_title('Salary Distribution')
+    axes[0,1].set_xlabel('Salary')
+    axes[0,1].set_ylabel('Frequency')
+
+    # 3. Age Distribution
+    data['age'].hist(bins=20, ax=axes[1,0])
+    axes[1,0].set_title('Age Distribution')
+    axes[1,0].set_xlabel('Age')
+    axes[1,0].set_ylabel('Frequency')
+
+    # 4. Education Level Distribution
+    data['education_counts'].plot(kind='pie', ax=axes[1,1], title='Education Level Distribution')
+
+    fig.tight_layout()
+    return fig
+
+
+def draw_feature_importance(feature_importance):
+    """Bar chart of the most important attrition features"""
+    plt = _pyplot()
+    import seaborn as sns
+    fig = plt.figure(figsize=(12, 8))
+    sns.barplot(data=feature_importance, x='importance', y='feature')
+    plt.title('Top 10 Most Important Features for Attrition Prediction')
+    plt.xlabel('Permutation Importance (drop in test AUC)')
+    fig.tight_layout()
+    return fig
+
+
+def draw_employee_clusters(data):
+    """Employee clusters on the first two principal components"""
+    plt = _pyplot()
+    fig = plt.figure(figsize=(10, 8))
+    scatter = plt.scatter(data['components'][:, 0], data['components'][:, 1],
+                          c=data['clusters'], cmap='viridis', alpha=0.6)
+    plt.colorbar(scatter)
+    plt.title('Employee Clusters (PCA Visualization)')
+    plt.xlabel('Principal Component 1')
+    plt.ylabel('Principal Component 2')
+    fig.tight_layout()
+    return fig
+
+
+def _render(draw, data, path, dpi):
+    """Draw one chart and write it atomically (runs in a worker process)"""
+    fig = draw(data)
+    root, ext = os.path.splitext(path)
+    partial = f"{root}.partial{ext}"
+    fig.savefig(partial, dpi=dpi, bbox_inches='tight')
+    _pyplot().close(fig)
+    os.replace(partial, path)
+    return path
+
+
+class ChartRenderer:
+    """Render charts headlessly in background worker processes.
+
+    A chart is keyed by a hash of its input data and drawing code, and is only
+    redrawn when the key differs from the one recorded in cache_file for its
+    path (or the PNG is missing). submit() returns immediately; wait() blocks
+    until the submitted charts are written and close() also shuts the worker
+    processes down (a later submit() starts new ones). max_workers=0 renders inline, as
+    does a renderer copied into another process (a pipeline stage worker).
+    While log is a list every submitted chart is appended to it, so a cached
+    pipeline stage can re-submit its charts.
+    """
+
+    def __init__(self, cache_file='chart_cache.json', max_workers=None, dpi=CHART_DPI):
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.dpi = dpi
+        self.executor = None
+        self.pending = {}
+        self.log = None
+        self.cache = {}
+        if os.path.exists(cache_file):
+            with open(cache_file) as f:
+                self.cache = json.load(f)
+
+    def __getstate__(self):
+        return dict(self.__dict__, executor=None, pending={}, max_workers=0)
+
+    def chart_key(self, draw, data):
+        return joblib.hash((inspect.getsource(draw), data, self.dpi))
+
+    def submit(self, path, draw, data):
+        """Queue a chart for rendering; returns False when the existing PNG is up to date"""
+        if self.log is not None:
+            self.log.append((path, draw, data))
+        key = self.chart_key(draw, data)
+        if self.cache.get(path) == key and os.path.exists(path):
+            return False
+
+        if self.max_workers == 0:
+            _render(draw, data, path, self.dpi)
+            self.cache[path] = key
+            self._save_cache()
+            return True
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.pending[path] = (self.executor.submit(_render, draw, data, path, self.dpi), key)
+        return True
+
+    def wait(self):
+        """Wait for the submitted charts and return the paths rendered"""
+        rendered = []
+        for path, (future, key) in self.pending.items():
+            try:
+                future.result()
+                self.cache[path] = key
+                rendered.append(path)
+            except Exception as e:
+                print(f"❌ Error rendering {path}: {e}")
+        self.pending = {}
+        if rendered:
+            self._save_cache()
+        return rendered
+
+    def close(self):
+        """Wait for the submitted charts, shut the worker processes down and return the paths rendered"""
+        rendered = self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        return rendered
+
+    def _save_cache(self):
+        # Keep the entries other processes recorded since this renderer loaded the cache
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file) as f:
+                    self.cache = dict(json.load(f), **self.cache)
+            except (OSError, ValueError):
+                pass
+        with open(self.cache_file, 'w') as f:
+            json.dump(self.cache, f, indent=2)
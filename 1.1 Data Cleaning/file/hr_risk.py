@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from hr_model_registry import RISK_LABELS, risk_codes
+
+# Tiers of the high_risk_employees.csv watch list
+WATCH_TIERS = ['High', 'Very High']
+
+
+def riskiest_rows(employee_ids, probabilities):
+    """Row position of each employee's highest probability, in order of first appearance"""
+    codes, _ = pd.factorize(np.asarray(employee_ids))
+    probabilities = np.asarray(probabilities, dtype='float64')
+    # Group rows by employee (first appearance order), riskiest row first within each
+    order = np.lexsort((-probabilities, codes))
+    grouped = codes[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = grouped[1:] != grouped[:-1]
+    return order[first]
+
+
+def _tier_slots(codes):
+    """Tier codes as count slots, with the codes outside the bands (-1) in the last slot"""
+    return np.where(codes < 0, len(RISK_LABELS), codes)
+
+
+class RiskRanker:
+    """Attrition scores and risk tiers held in compact arrays indexed by EmployeeID.
+
+    Each employee has one score (their highest probability when several rows
+    are scored), one int8 tier code and a department code. Tier counts are
+    maintained as scores change, so update() only touches the employees whose
+    scores were replaced. top_k() selects the riskiest employees of each
+    department with a partial sort (np.argpartition) instead of sorting
+    everyone.
+    """
+
+    def __init__(self, employee_ids, probabilities, departments=None):
+        employee_ids = np.asarray(employee_ids)
+        probabilities = np.asarray(probabilities, dtype='float64')
+        rows = riskiest_rows(employee_ids, probabilities)
+
+        self.index = pd.Index(employee_ids[rows], name='EmployeeID')
+        self.scores = probabilities[rows]
+        self.tiers = risk_codes(self.scores)
+        if departments is None:
+            departments = np.full(len(employee_ids), 'All', dtype=object)
+        codes, names = pd.factorize(np.asarray(departments)[rows])
+        self.departments = codes.astype('int16')
+        self.department_names = [str(name) for name in names]
+        # One count per tier plus a last slot for scores outside the bands
+        self.tier_counts = np.bincount(_tier_slots(self.tiers), minlength=len(RISK_LABELS) + 1)
+
+    def __len__(self):
+        return len(self.index)
+
+    def tier_summary(self):
+        """Number of employees in each risk tier"""
+        return pd.Series(self.tier_counts[:len(RISK_LABELS)], index=RISK_LABELS, name='EmployeeCount')
+
+    def watch_list(self, tiers=WATCH_TIERS):
+        """EmployeeIDs in the given tiers"""
+        codes = [RISK_LABELS.index(tier) for tier in tiers]
+        return self.index[np.isin(self.tiers, codes)]
+
+    def top_k(self, k=10):
+        """The k riskiest employees of each department, riskiest first"""
+        by_department = np.argsort(self.departments, kind='stable')
+        bounds = np.flatnonzero(np.diff(self.departments[by_department])) + 1
+        selected = []
+        for positions in np.split(by_department, bounds):
+            if len(positions) > k:
+                # O(n) selection of the k highest scores, then only those k are sorted
+                positions = positions[np.argpartition(-self.scores[positions], k - 1)[:k]]
+            selected.append(positions[np.argsort(-self.scores[positions], kind='stable')])
+
+        top = np.concatenate(selected)
+        ranks = np.concatenate([np.arange(1, len(positions) + 1) for positions in selected])
+        return pd.DataFrame({
+            'Department': np.asarray(self.department_names, dtype=object)[self.departments[top]],
+            'Rank': ranks,
+            'EmployeeID': self.index[top],
+            'AttritionProbability': self.scores[top],
+            'RiskCategory': pd.Categorical.from_codes(self.tiers[top], categories=RISK_LABELS, ordered=True)
+        })
+
+    def update(self, employee_ids, probabilities, departments=None):
+        """Replace the scores of some employees (adding unknown ones) and return the tier changes.
+
+        Only the given employees are re-tiered. When departments are given
+        they also replace the stored departments, so transfers move employees
+        between the top_k() lists. The returned frame lists those
+        whose RiskCategory changed (PreviousRiskCategory is missing for new
+        employees).
+        """
+        employee_ids = np.asarray(employee_ids)
+        probabilities = np.asarray(probabilities, dtype='float64')
+        rows = riskiest_rows(employee_ids, probabilities)
+        employee_ids, probabilities = employee_ids[rows], probabilities[rows]
+
+        positions = self.index.get_indexer(employee_ids)
+        new = positions < 0
+        if departments is None:
+            # Known employees keep their department, new ones go to 'All'
+            names = np.full(new.sum(), 'All', dtype=object)
+        else:
+            names = np.asarray(departments)[rows]
+        names = [str(name) for name in names]
+        for name in dict.fromkeys(names):
+            if name not in self.department_names:
+                self.department_names.append(name)
+        lookup = {name: code for code, name in enumerate(self.department_names)}
+        codes = np.array([lookup[name] for name in names], dtype='int16')
+
+        if new.any():
+            positions[new] = np.arange(len(self.index), len(self.index) + new.sum())
+            self.index = self.index.append(pd.Index(employee_ids[new], name='EmployeeID'))
+            self.scores = np.concatenate([self.scores, np.full(new.sum(), np.nan)])
+            # New employees start outside the bands so the counts below stay consistent
+            self.tiers = np.concatenate([self.tiers, np.full(new.sum(), -1, dtype='int8')])
+            self.departments = np.concatenate([self.departments, np.zeros(new.sum(), dtype='int16')])
+        self.tier_counts[-1] += new.sum()
+        # Known employees move to their given department (a transfer), new ones get theirs
+        self.departments[positions if departments is not None else positions[new]] = codes
+
+        previous = self.tiers[positions].copy()
+        current = risk_codes(probabilities)
+        self.scores[positions] = probabilities
+        self.tiers[positions] = current
+        np.subtract.at(self.tier_counts, _tier_slots(previous), 1)
+        np.add.at(self.tier_counts, _tier_slots(current), 1)
+
+        changed = (previous != current) | new
+        return pd.DataFrame({
+            'EmployeeID': employee_ids[changed],
+            'PreviousRiskCategory': pd.Categorical.from_codes(np.where(new, -1, previous)[changed],
+                                                              categories=RISK_LABELS, ordered=True),
+            'RiskCategory': pd.Categorical.from_codes(current[changed], categories=RISK_LABELS, ordered=True)
+        })
+
+    def save(self, path='risk_ranking.npz'):
+        np.savez(path, ids=self.index.to_numpy(dtype=str), scores=self.scores,
+                 departments=self.departments, department_names=np.asarray(self.department_names, dtype=str))
+
+    @classmethod
+    def load(cls, path='risk_ranking.npz'):
+        with np.load(path) as saved:
+            names = saved['department_names']
+            return cls(saved['ids'], saved['scores'], names[saved['departments']])
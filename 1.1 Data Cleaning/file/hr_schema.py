@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Declared dtypes of the five source CSV files. Low-cardinality strings load as
+# categoricals, ratings and small counts as int8 and the remaining integers as
+# the narrowest type that holds them. Columns not listed (IDs, names) keep the
+# default string dtype. Integer widths are only applied to values that fit them
+# (see read_source).
+RATING = 'int8'
+
+SOURCE_SCHEMAS = {
+    'Employee': {
+        'dtypes': {
+            'Gender': 'category',
+            'Age': 'int8',
+            'BusinessTravel': 'category',
+            'Department': 'category',
+            'DistanceFromHome (KM)': 'int16',
+            'State': 'category',
+            'Ethnicity': 'category',
+            'Education': 'int8',
+            'EducationField': 'category',
+            'JobRole': 'category',
+            'MaritalStatus': 'category',
+            'Salary': 'int32',
+            'StockOptionLevel': 'int8',
+            'OverTime': 'category',
+            'Attrition': 'category',
+            'YearsAtCompany': 'int8',
+            'YearsInMostRecentRole': 'int8',
+            'YearsSinceLastPromotion': 'int8',
+            'YearsWithCurrManager': 'int8'
+        },
+        'dates': {'HireDate': '%Y-%m-%d'}
+    },
+    'PerformanceRating': {
+        'dtypes': {
+            'EnvironmentSatisfaction': RATING,
+            'JobSatisfaction': RATING,
+            'RelationshipSatisfaction': RATING,
+            'TrainingOpportunitiesWithinYear': RATING,
+            'TrainingOpportunitiesTaken': RATING,
+            'WorkLifeBalance': RATING,
+            'SelfRating': RATING,
+            'ManagerRating': RATING
+        },
+        'dates': {'ReviewDate': '%m/%d/%Y'}
+    },
+    'EducationLevel': {
+        'dtypes': {'EducationLevelID': 'int8', 'EducationLevel': 'category'},
+        'dates': {}
+    },
+    'RatingLevel': {
+        'dtypes': {'RatingID': 'int8', 'RatingLevel': 'category'},
+        'dates': {}
+    },
+    'SatisfiedLevel': {
+        'dtypes': {'SatisfactionID': 'int8', 'SatisfactionLevel': 'category'},
+        'dates': {}
+    }
+}
+
+
+def source_dtypes(name, columns=None, overrides=None):
+    """The declared dtypes of a source file, limited to columns and with overrides applied"""
+    dtypes = dict(SOURCE_SCHEMAS[name]['dtypes'], **(overrides or {}))
+    if columns is not None:
+        dtypes = {col: dtype for col, dtype in dtypes.items() if col in columns}
+    return dtypes
+
+
+def category_dtypes():
+    """The categorical columns of every source file, for reading pipeline outputs back from CSV"""
+    return {
+        col: dtype
+        for schema in SOURCE_SCHEMAS.values()
+        for col, dtype in schema['dtypes'].items()
+        if dtype == 'category'
+    }
+
+
+def _parse_integers(dtypes):
+    """Integer columns parsed as float64, which holds any value and missing values"""
+    return {col: 'float64' if dtype.startswith('int') else dtype for col, dtype in dtypes.items()}
+
+
+def _narrow_integers(df, dtypes):
+    """Cast the float64-parsed integer columns of df to their declared width where every value fits.
+
+    A column with missing or fractional values stays float64 (as without a
+    schema) and one with whole values outside the declared range is int64,
+    so a value is never wrapped around.
+    """
+    for col, dtype in dtypes.items():
+        if not dtype.startswith('int') or col not in df:
+            continue
+        values = df[col]
+        if values.isna().any() or not (values == np.floor(values)).all():
+            continue
+        limits = np.iinfo(dtype)
+        fits = values.empty or (values.min() >= limits.min and values.max() <= limits.max)
+        df[col] = values.astype(dtype if fits else 'int64')
+    return df
+
+
+def _narrow_chunks(reader, dtypes):
+    with reader:
+        for chunk in reader:
+            yield _narrow_integers(chunk, dtypes)
+
+
+def read_source(name, path=None, usecols=None, dtype=None, **kwargs):
+    """Read a source CSV with its declared schema in a single parse.
+
+    Dates are parsed with their explicit format; values that do not match are
+    left as strings for the cleaning step to coerce. Declared integer columns
+    are parsed as float64 and narrowed to their declared width only when every
+    value is a whole number within its range; otherwise they stay float64
+    (missing values) or become int64 (out-of-range values). With chunksize the
+    check is made per chunk. Extra keyword arguments (chunksize, nrows, ...)
+    go to pd.read_csv.
+    """
+    schema = SOURCE_SCHEMAS[name]
+    path = path or f"{name}.csv"
+    dtypes = source_dtypes(name, usecols, dtype)
+    dates = {col: fmt for col, fmt in schema['dates'].items() if usecols is None or col in usecols}
+    options = dict(usecols=usecols, parse_dates=list(dates) or None, date_format=dates or None, **kwargs)
+
+    data = pd.read_csv(path, dtype=_parse_integers(dtypes), **options)
+    if kwargs.get('chunksize'):
+        return _narrow_chunks(data, dtypes)
+    return _narrow_integers(data, dtypes)
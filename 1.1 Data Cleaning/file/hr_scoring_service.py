@@ -0,0 +1,406 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from hr_io import read_table
+from hr_model_registry import AttritionScorer, risk_category
+from hr_features import FeatureTransformer, INPUT_COLUMNS, SATISFACTION_COLUMNS
+from hr_employee_features import TREND_FIELDS
+
+# Derived scores recomputed when a request changes one of their inputs, in dependency order
+DERIVED_FEATURES = [
+    ('PerformanceScore', ['SelfRating', 'ManagerRating']),
+    ('OverallSatisfaction', SATISFACTION_COLUMNS),
+    ('TrainingUtilization', ['TrainingOpportunitiesWithinYear', 'TrainingOpportunitiesTaken']),
+    ('AttritionRisk', ['JobSatisfaction', 'WorkLifeBalance', 'OverallSatisfaction', 'YearsAtCompany'])
+]
+
+# Per-employee review summaries kept next to each TREND_FIELDS mean in employee_features
+HISTORY_SUFFIXES = ['Latest', 'Trend']
+
+# Derived features stored as means of per-review ratios, which the means of their inputs do not
+# determine: for a known employee a what-if moves the stored value by the change of the ratio
+RATIO_FEATURES = ['TrainingUtilization']
+
+
+class UnknownEmployee(KeyError):
+    """A request for an EmployeeID that is not in employee_features"""
+
+
+def feature_value(column, value):
+    """A feature value given in a request as a float (null is a missing value); ValueError if it is not a number"""
+    if value is None:
+        return np.nan
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Invalid value {value!r} for {column}")
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid value {value!r} for {column}") from None
+    if np.isinf(value):
+        raise ValueError(f"Invalid value {value!r} for {column}")
+    return value
+
+
+def parse_change(change):
+    """A what-if change as (kind, amount): 4 sets the value, '+10%' scales it and '+5000' / '-1' shift it"""
+    if isinstance(change, bool):
+        raise TypeError(f"Invalid change {change!r}")
+    if isinstance(change, str):
+        change = change.strip()
+        if change.endswith('%'):
+            return 'scale', 1 + float(change[:-1]) / 100
+        if change[:1] in ('+', '-'):
+            return 'shift', float(change)
+    return 'set', float(change)
+
+
+def apply_change(value, change):
+    """Apply one what-if change to a value"""
+    kind, amount = parse_change(change)
+    if kind == 'scale':
+        return value * amount
+    if kind == 'shift':
+        return value + amount
+    return amount
+
+
+def apply_trend_change(trend, change):
+    """The trend of a review field after a what-if change to every one of its reviews.
+
+    Setting the value flattens the history, a shift moves it without changing
+    its slope and a percentage scales the slope with it.
+    """
+    kind, amount = parse_change(change)
+    if kind == 'scale':
+        return trend * amount
+    if kind == 'shift':
+        return trend
+    return 0.0
+
+
+class MicroBatcher:
+    """Collect rows submitted by concurrent requests and score them in one vectorized call.
+
+    A batch is closed when it holds max_batch rows or max_wait_ms after its
+    first row arrived, whichever comes first. If scoring a batch fails its
+    rows are retried one at a time, so only the failing rows' futures fail.
+    """
+
+    def __init__(self, score_batch, max_batch=64, max_wait_ms=2.0):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, row, changed, base=None):
+        """Queue a feature row (the columns changed in it and the row they were changed from) and
+        return a Future of its probability"""
+        future = Future()
+        self.queue.put((row, changed, base, future))
+        return future
+
+    def _run(self):
+        while True:
+            items = [self.queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(items) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            rows, changed, bases, futures = zip(*items)
+            try:
+                probabilities = self.score_batch(rows, changed, bases)
+            except Exception:
+                # Score the rows one by one so a bad row fails only its own request
+                for row, columns, base, future in items:
+                    try:
+                        future.set_result(float(self.score_batch([row], [columns], [base])[0]))
+                    except Exception as e:
+                        future.set_exception(e)
+            else:
+                for future, probability in zip(futures, probabilities):
+                    future.set_result(float(probability))
+            self.batches += 1
+            self.rows += len(items)
+
+
+class ScoringService:
+    """Online attrition scoring with the best registered model, loaded once.
+
+    Known employees are looked up in the employee_features table; what-if
+    requests change some of their features and get the derived scores
+    recomputed by the same FeatureTransformer as the preprocessing pipeline.
+    A change to a review field applies to every review of the employee, so
+    its latest value and trend move with it. Everything is read from local
+    files.
+    """
+
+    def __init__(self, registry_dir='model_registry', max_batch=64, max_wait_ms=2.0,
+                 transformer_file='feature_transformer.json'):
+        self.scorer = AttritionScorer.from_registry(registry_dir)
+        if os.path.exists(transformer_file):
+            self.transformer = FeatureTransformer.load(transformer_file)
+        else:
+            self.transformer = FeatureTransformer()
+        columns = list(dict.fromkeys(['EmployeeID'] + self.scorer.features + INPUT_COLUMNS))
+        employees = read_table('employee_features', columns=columns)
+        self.employees = employees.set_index('EmployeeID').to_dict('index')
+        self.columns = set(columns) - {'EmployeeID'}
+        self.batcher = MicroBatcher(self.score_batch, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        self.latencies = deque(maxlen=100000)
+        self.lock = threading.Lock()
+
+    def score_batch(self, rows, changed, bases=None):
+        """Recompute derived features where their inputs changed and score every row at once"""
+        df = pd.DataFrame(list(rows))
+        changed = [set(columns) for columns in changed]
+        if not any(changed):
+            return self.scorer.probabilities(df)
+
+        derived = self.transformer.compute(df.reindex(columns=INPUT_COLUMNS))
+        if bases is not None and any(base is not None for base in bases):
+            # Ratio features of a changed known employee move by the change of the ratio of the means
+            before_df = pd.DataFrame([base if base is not None else {} for base in bases])
+            before = self.transformer.compute(before_df.reindex(columns=INPUT_COLUMNS))
+            for name in RATIO_FEATURES:
+                stored = before_df.reindex(columns=[name])[name].to_numpy(dtype='float64')
+                derived[name] = np.where(np.isnan(stored), derived[name], stored + derived[name] - before[name])
+        # The derived review scores are averages of their inputs, so their latest
+        # values and trends are the same averages of the inputs' ones
+        history = {suffix: self.transformer.compute(self.history_inputs(df, suffix)) for suffix in HISTORY_SUFFIXES}
+        for name, inputs in DERIVED_FEATURES:
+            recompute = np.array([not columns.isdisjoint(inputs) for columns in changed])
+            if recompute.any():
+                self.replace(df, name, recompute, derived[name])
+                if name in TREND_FIELDS:
+                    for suffix, values in history.items():
+                        self.replace(df, name + suffix, recompute, values[name])
+                for columns, flag in zip(changed, recompute):
+                    if flag:
+                        columns.add(name)
+        return self.scorer.probabilities(df)
+
+    @staticmethod
+    def history_inputs(df, suffix):
+        """The derived features' inputs with each review field replaced by its latest value or trend"""
+        inputs = df.reindex(columns=INPUT_COLUMNS)
+        for field in INPUT_COLUMNS:
+            if field in TREND_FIELDS:
+                inputs[field] = df[field + suffix] if field + suffix in df.columns else np.nan
+        return inputs
+
+    @staticmethod
+    def replace(df, name, rows, values):
+        previous = df[name] if name in df.columns else np.nan
+        df[name] = np.where(rows, values, previous)
+
+    def apply_changes(self, base, changes):
+        """The employee's feature row with the what-if changes applied (and the columns they changed)"""
+        if not isinstance(changes, dict):
+            raise ValueError("'changes' must be an object of feature -> change")
+        unknown = sorted(set(changes) - self.columns)
+        if unknown:
+            raise ValueError(f"Unknown features {', '.join(unknown)}")
+
+        whatif = dict(base)
+        changed = set(changes)
+        for column, change in changes.items():
+            whatif[column] = feature_value(column, apply_change(whatif.get(column, np.nan), change))
+            if column in TREND_FIELDS:
+                # The change applies to every review, so the latest value and trend follow it
+                whatif[column + 'Latest'] = apply_change(whatif.get(column + 'Latest', np.nan), change)
+                whatif[column + 'Trend'] = apply_trend_change(whatif.get(column + 'Trend', np.nan), change)
+                changed |= {column + suffix for suffix in HISTORY_SUFFIXES}
+        return whatif, changed
+
+    def score(self, request):
+        """Score one request: {'employee_id': ..., 'changes': {...}} or {'employee': {...features}}.
+
+        Raises ValueError for a malformed request, UnknownEmployee for an
+        EmployeeID that is not in employee_features and RuntimeError when a
+        valid request cannot be scored.
+        """
+        if not isinstance(request, dict):
+            raise ValueError("A score request must be an object")
+        if 'employee' in request:
+            # A new employee: every given feature counts as changed so derived scores are computed
+            if not isinstance(request['employee'], dict):
+                raise ValueError("'employee' must be an object of feature -> value")
+            features = dict(request['employee'])
+            employee_id = features.pop('EmployeeID', None)
+            unknown = sorted(set(features) - self.columns)
+            if unknown:
+                raise ValueError(f"Unknown features {', '.join(unknown)}")
+            base = {column: feature_value(column, value) for column, value in features.items()}
+            base_changed = set(base)
+        elif 'employee_id' in request:
+            employee_id = request['employee_id']
+            if not isinstance(employee_id, str) or employee_id not in self.employees:
+                raise UnknownEmployee(employee_id)
+            base = self.employees[employee_id]
+            base_changed = set()
+        else:
+            raise ValueError("A score request needs 'employee_id' or 'employee'")
+
+        changes = request.get('changes') or {}
+        if changes:
+            whatif, changed = self.apply_changes(base, changes)
+
+        futures = [self.batcher.submit(base, base_changed)]
+        if changes:
+            # A new employee's scores are all computed from its inputs, so it has no stored base
+            futures.append(self.batcher.submit(whatif, base_changed | changed, None if base_changed else base))
+
+        try:
+            probabilities = [future.result() for future in futures]
+        except (ValueError, TypeError):
+            # Values the model cannot take are invalid input
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Scoring failed: {e}") from e
+        result = {
+            'employee_id': employee_id,
+            'AttritionProbability': probabilities[-1],
+            'RiskCategory': risk_category(probabilities[-1])
+        }
+        if changes:
+            result['Baseline'] = {
+                'AttritionProbability': probabilities[0],
+                'RiskCategory': risk_category(probabilities[0])
+            }
+            result['Change'] = probabilities[-1] - probabilities[0]
+        return result
+
+    def record(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def stats(self):
+        """Request latency percentiles and micro-batching statistics"""
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+        stats = {
+            'model': self.scorer.model_name,
+            'version': self.scorer.key,
+            'requests': len(latencies),
+            'batches': self.batcher.batches,
+            'mean_batch_size': self.batcher.rows / self.batcher.batches if self.batcher.batches else 0.0
+        }
+        if len(latencies):
+            stats.update({
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p99_ms': float(np.percentile(latencies, 99)),
+                'mean_ms': float(latencies.mean())
+            })
+        return stats
+
+
+class ScoringServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog sized for bursts of concurrent clients"""
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_handler(service):
+    """Build the HTTP request handler class serving a ScoringService"""
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            elif self.path == '/stats':
+                self.send_json(200, service.stats())
+            else:
+                self.send_json(404, {'error': f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self.send_json(404, {'error': f"Unknown path {self.path}"})
+                return
+
+            start = time.perf_counter()
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if isinstance(body, dict) and 'requests' in body:
+                    if not isinstance(body['requests'], list):
+                        raise ValueError("'requests' must be a list of score requests")
+                    payload = {'results': [service.score(request) for request in body['requests']]}
+                else:
+                    payload = service.score(body)
+            except UnknownEmployee as e:
+                self.send_json(404, {'error': f"Unknown employee {e.args[0]}"})
+                return
+            except (ValueError, TypeError) as e:
+                # Malformed JSON, a malformed request or an invalid change
+                self.send_json(400, {'error': str(e)})
+                return
+            except Exception as e:
+                self.send_json(500, {'error': f"{type(e).__name__}: {e}"})
+                return
+            service.record(time.perf_counter() - start)
+            self.send_json(200, payload)
+
+        def send_json(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            # Per-request access logs would dominate the latency
+            pass
+
+    return ScoringHandler
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON attrition scoring service")
+    parser.add_argument('--host', default='127.0.0.1', help="address to bind (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument('--registry', default='model_registry',
+                        help="model registry directory (default: model_registry)")
+    parser.add_argument('--max-batch', type=int, default=64, help="largest micro-batch (default: 64)")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help="longest wait to fill a micro-batch in milliseconds (default: 2)")
+    args = parser.parse_args()
+
+    print("🚀 Starting HR Attrition Scoring Service")
+    print("=" * 50)
+    try:
+        service = ScoringService(args.registry, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        print("Run hr_analytics_preprocessing.py and hr_advanced_analytics.py first.")
+        raise SystemExit(1)
+
+    server = ScoringServer((args.host, args.port), make_handler(service))
+    print(f"✅ Loaded {service.scorer.model_name} (version {service.scorer.key}) "
+          f"and {len(service.employees)} employees")
+    print(f"🌐 Listening on http://{args.host}:{args.port} (POST /score, GET /stats, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n📊 Final latency statistics:")
+        for key, value in service.stats().items():
+            print(f"  {key}: {value}")
+    finally:
+        server.server_close()
@@ -0,0 +1,106 @@
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+
+PLAN_FILE = 'plan.joblib'
+INPUT_FILE = 'input.joblib'
+RESULT_FILE = 'result.joblib'
+
+
+def assign_shards(sizes, shards):
+    """Group key values into at most shards groups of similar total size.
+
+    sizes maps each key value to its row count. Values are placed largest
+    first, each on the shard with the fewest rows so far.
+    """
+    shards = max(1, min(shards, len(sizes)))
+    groups = [[] for _ in range(shards)]
+    loads = np.zeros(shards)
+    for value, size in sorted(sizes.items(), key=lambda item: -item[1]):
+        target = int(np.argmin(loads))
+        groups[target].append(value)
+        loads[target] += size
+    return groups
+
+
+def default_shard_workers():
+    """Shard worker processes: one per core (0 processes the shards in this process on a single core)"""
+    cores = os.cpu_count() or 1
+    return cores if cores > 1 else 0
+
+
+def run_shards(function, root, indices, workers):
+    """Call function(root, index) for every shard index, in up to workers processes"""
+    if not workers or len(indices) < 2:
+        return [function(root, index) for index in indices]
+    with ProcessPoolExecutor(max_workers=min(workers, len(indices))) as executor:
+        return list(executor.map(function, [root] * len(indices), indices))
+
+
+class ShardDirectory:
+    """A run split into shards, kept in a directory every shard worker can read and write.
+
+    plan.joblib holds what all shards share (the shard key, the key values of
+    each shard, the state learned from the whole company and the reference
+    tables), shard_<n>/input.joblib the rows of shard n and
+    shard_<n>/result.joblib what processing them produced. The shards can be
+    processed by local worker processes or on other machines mounting the same
+    directory. A result file only appears once its shard is complete, so the
+    merge knows which shards are still pending.
+    """
+
+    def __init__(self, root='shards'):
+        self.root = root
+        self._plan = None
+
+    def path(self, index, name):
+        return os.path.join(self.root, f"shard_{index}", name)
+
+    def write(self, plan, inputs):
+        """Store a new plan and the input rows of every shard, replacing any previous partition"""
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if name.startswith('shard_') and os.path.isdir(path):
+                    shutil.rmtree(path)
+                elif name == PLAN_FILE:
+                    os.remove(path)
+        for index, tables in enumerate(inputs):
+            os.makedirs(os.path.join(self.root, f"shard_{index}"))
+            joblib.dump(tables, self.path(index, INPUT_FILE))
+        # The plan is written last: a directory with a plan has all of its inputs
+        self._dump(plan, os.path.join(self.root, PLAN_FILE))
+        self._plan = plan
+
+    def plan(self):
+        if self._plan is None:
+            path = os.path.join(self.root, PLAN_FILE)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No shard plan in {self.root}, partition the inputs first")
+            self._plan = joblib.load(path)
+        return self._plan
+
+    @property
+    def shards(self):
+        return len(self.plan()['values'])
+
+    def load_input(self, index):
+        return joblib.load(self.path(index, INPUT_FILE))
+
+    def save_result(self, index, result):
+        self._dump(result, self.path(index, RESULT_FILE))
+
+    def load_result(self, index):
+        return joblib.load(self.path(index, RESULT_FILE))
+
+    def pending(self):
+        """Indices of the shards without a result yet"""
+        return [index for index in range(self.shards) if not os.path.exists(self.path(index, RESULT_FILE))]
+
+    @staticmethod
+    def _dump(value, path):
+        partial = path + '.partial'
+        joblib.dump(value, partial)
+        os.replace(partial, path)
@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """KLL sketch of the quantiles of a stream of numbers, in bounded memory.
+
+    Items are kept in compactors, level h holding items that stand for 2**h
+    inputs. A compactor over its capacity sorts its items and promotes every
+    other one (from a random first item) to the next level. Lower levels get
+    geometrically smaller capacities, so the sketch holds O(k) items however
+    many arrive. Any rank is then off by about 1.7 / k of the item count with
+    high probability (k=1024: under 0.2%). Sketches of separate chunks or
+    shards merge into a sketch of their union. Until the first compaction
+    (k items) quantiles are exact, interpolated like Series.quantile.
+    """
+
+    def __init__(self, k=1024, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        # Compactions draw from a seeded generator so the same input gives the same sketch
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.count
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        """Add the non-missing values of an array or Series"""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        self.levels += [np.empty(0)] * (len(other.levels) - len(self.levels))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # With an odd number of items the smallest one stays behind
+                odd = len(items) % 2
+                promoted = items[odd + self.rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:odd]
+            level += 1
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    def quantile(self, q):
+        """The q quantile (or an array of them); NaN for an empty sketch"""
+        q = np.asarray(q, dtype='float64')
+        if self.count == 0:
+            return np.full(q.shape, np.nan)[()]
+        if self.exact:
+            return np.quantile(self.levels[0], q)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        # First item whose cumulative weight reaches q of the total, clamped to the observed range
+        positions = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        result = values[order][np.minimum(positions, len(values) - 1)]
+        return np.clip(np.where(q <= 0, self.min, np.where(q >= 1, self.max, result)), self.min, self.max)[()]
+
+    def median(self):
+        return float(self.quantile(0.5))
+
+    def rank(self, value):
+        """Approximate fraction of the items less than or equal to value"""
+        if self.count == 0:
+            return np.nan
+        weight = sum(2.0 ** level * np.count_nonzero(items <= value) for level, items in enumerate(self.levels))
+        total = sum(2.0 ** level * len(items) for level, items in enumerate(self.levels))
+        return weight / total
+
+
+def _hashes(values):
+    """64-bit hashes of the non-missing values of a Series, the same in every process"""
+    values = values[values.notna()]
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def _bit_length(values):
+    """Bit length of each uint64 (0 for 0), split in 32-bit halves that floats hold exactly"""
+    high = (values >> np.uint64(32)).astype('float64')
+    low = (values & np.uint64(0xFFFFFFFF)).astype('float64')
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+class DistinctCounter:
+    """HyperLogLog count of distinct values, in 2**precision one-byte registers.
+
+    Each value's hash picks a register by its first precision bits; the
+    register keeps the most leading zeros seen in the remaining bits. The
+    relative error is about 1.04 / sqrt(2**precision) (precision=12: 1.6%),
+    with linear counting for small counts. Counters of separate chunks or
+    shards merge by taking the larger register, and a value seen in several
+    of them is only counted once.
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype='uint8')
+
+    def update(self, values):
+        """Add the non-missing values of a Series"""
+        return self.update_hashes(_hashes(pd.Series(values)))
+
+    def update_hashes(self, hashes):
+        if len(hashes):
+            shift = np.uint64(64 - self.precision)
+            slots = (hashes >> shift).astype('intp')
+            rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+            ranks = (64 - self.precision) - _bit_length(rest) + 1
+            np.maximum.at(self.registers, slots, ranks.astype('uint8'))
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype('int64')))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class GroupSketches:
+    """Quantile sketches and distinct counters of some columns per value of a key column.
+
+    Like RunningAggregate, blocks of rows can be folded in chunk by chunk or
+    shard by shard and partial results merged in any order.
+    """
+
+    def __init__(self, key, quantiles=(), distinct=(), k=1024, precision=12):
+        self.key = key
+        self.quantile_columns = list(quantiles)
+        self.distinct_columns = list(distinct)
+        self.k = k
+        self.precision = precision
+        # Group value -> {column: QuantileSketch / DistinctCounter}
+        self.groups = {}
+
+    def _group(self, value):
+        if value not in self.groups:
+            self.groups[value] = {
+                **{col: QuantileSketch(self.k) for col in self.quantile_columns},
+                **{col: DistinctCounter(self.precision) for col in self.distinct_columns}
+            }
+        return self.groups[value]
+
+    def update(self, df):
+        """Fold a block of rows into the sketches of their groups (rows without a key are skipped)"""
+        codes, uniques = pd.factorize(df[self.key])
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        values = {col: df[col].to_numpy(dtype='float64') for col in self.quantile_columns}
+        hashes = {}
+        for col in self.distinct_columns:
+            present = df[col].notna().to_numpy()
+            hashes[col] = (pd.util.hash_pandas_object(df[col], index=False).to_numpy(), present)
+
+        for code, value in enumerate(uniques):
+            rows = order[bounds[code]:bounds[code + 1]]
+            sketches = self._group(value)
+            for col in self.quantile_columns:
+                sketches[col].update(values[col][rows])
+            for col, (column_hashes, present) in hashes.items():
+                sketches[col].update_hashes(column_hashes[rows[present[rows]]])
+        return self
+
+    def merge(self, other):
+        for value, sketches in other.groups.items():
+            mine = self._group(value)
+            for col, sketch in sketches.items():
+                mine[col].merge(sketch)
+        return self
+
+    def quantiles(self, column, qs):
+        """Quantiles of a column per group (one column per q), ordered by group"""
+        index = sorted(self.groups)
+        return pd.DataFrame([self.groups[value][column].quantile(qs) for value in index],
+                            index=pd.Index(index, name=self.key), columns=list(qs))
+
+    def distinct(self, column):
+        """Approximate distinct count of a column per group"""
+        index = sorted(self.groups)
+        return pd.Series([self.groups[value][column].count() for value in index],
+                         index=pd.Index(index, name=self.key), dtype='int64')
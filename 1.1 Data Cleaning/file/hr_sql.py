@@ -0,0 +1,491 @@
+import argparse
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import time
+import pandas as pd
+from hr_io import read_table
+from hr_schema import read_source
+
+# The analysis queries of the data extraction step, run as-is against the pipeline tables
+SQL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+                        '1.2 Data Extraction and Transformation', 'file', 'hranalytics.sql')
+
+# Indexes created after each table is (re)loaded. The per-department and per-employee
+# ones cover the columns of the correlated subqueries, which then never touch the tables.
+TABLE_INDEXES = {
+    'Employee': [['EmployeeID'], ['Department', 'EmployeeID', 'Salary']],
+    'PerformanceRating': [['EmployeeID', 'JobSatisfaction'], ['ReviewDate']],
+    'EducationLevel': [['EducationLevelID']]
+}
+
+# Rows of the departments being refreshed
+REFRESHED = "Department IN (SELECT Department FROM temp.refresh_departments)"
+
+# Materialized views partitioned by department, in refresh order. Each is rebuilt
+# only for the departments whose employees or reviews changed. mv_department_stats
+# keeps the running sums, counts and extrema every department report is built from
+# (review-level columns aggregate the Employee x PerformanceRating join; rating sums
+# use TOTAL so they are floats even when the ratings were loaded as integers).
+DEPARTMENT_VIEWS = {
+    'mv_department_stats': f"""
+        SELECT
+            emp.Department,
+            emp.Employees,
+            emp.SalarySum,
+            emp.SalaryMin,
+            emp.SalaryMax,
+            rev.ReviewedEmployees,
+            rev.Reviews,
+            rev.ReviewSalarySum,
+            rev.SelfRatingSum,
+            rev.ManagerRatingSum,
+            rev.PerformanceSum,
+            rev.JobSatisfactionSum,
+            rev.JobSatisfactionMax,
+            rev.EnvironmentSatisfactionSum,
+            rev.RelationshipSatisfactionSum,
+            rev.TrainingOfferedSum,
+            rev.TrainingTakenSum,
+            rev.AttritionReviews
+        FROM (
+            SELECT Department, COUNT(*) AS Employees, SUM(Salary) AS SalarySum,
+                   MIN(Salary) AS SalaryMin, MAX(Salary) AS SalaryMax
+            FROM Employee
+            WHERE {REFRESHED}
+            GROUP BY Department
+        ) emp
+        LEFT JOIN (
+            SELECT
+                e.Department,
+                COUNT(DISTINCT e.EmployeeID) AS ReviewedEmployees,
+                COUNT(*) AS Reviews,
+                SUM(e.Salary) AS ReviewSalarySum,
+                TOTAL(pr.SelfRating) AS SelfRatingSum,
+                TOTAL(pr.ManagerRating) AS ManagerRatingSum,
+                TOTAL((pr.SelfRating + pr.ManagerRating) / 2.0) AS PerformanceSum,
+                TOTAL(pr.JobSatisfaction) AS JobSatisfactionSum,
+                MAX(pr.JobSatisfaction) AS JobSatisfactionMax,
+                TOTAL(pr.EnvironmentSatisfaction) AS EnvironmentSatisfactionSum,
+                TOTAL(pr.RelationshipSatisfaction) AS RelationshipSatisfactionSum,
+                TOTAL(pr.TrainingOpportunitiesWithinYear) AS TrainingOfferedSum,
+                TOTAL(pr.TrainingOpportunitiesTaken) AS TrainingTakenSum,
+                SUM(CASE WHEN CAST(e.Attrition AS VARCHAR(10)) = 'Yes' THEN 1 ELSE 0 END) AS AttritionReviews
+            FROM Employee e
+            JOIN PerformanceRating pr ON e.EmployeeID = pr.EmployeeID
+            WHERE e.{REFRESHED}
+            GROUP BY e.Department
+        ) rev ON rev.Department = emp.Department
+    """,
+    'mv_employee_salary_ranks': f"""
+        SELECT
+            EmployeeID,
+            FirstName,
+            LastName,
+            Department,
+            Salary,
+            RANK() OVER (PARTITION BY Department ORDER BY Salary DESC) AS SalaryRankInDept,
+            NTILE(4) OVER (PARTITION BY Department ORDER BY Salary) AS SalaryQuartile
+        FROM Employee
+        WHERE {REFRESHED}
+    """,
+    'mv_department_top_satisfaction': f"""
+        SELECT
+            e.EmployeeID,
+            e.FirstName,
+            e.LastName,
+            e.Department,
+            pr.JobSatisfaction
+        FROM Employee e
+        JOIN PerformanceRating pr ON e.EmployeeID = pr.EmployeeID
+        JOIN mv_department_stats s ON s.Department = e.Department
+        WHERE e.{REFRESHED} AND pr.JobSatisfaction = s.JobSatisfactionMax
+    """
+}
+
+# hranalytics.sql reports served as views over the materialized views instead of
+# re-scanning Employee x PerformanceRating (same columns and order as the file)
+REPORT_VIEWS = {
+    'count_employees_by_department': """
+        SELECT Department, Employees AS EmployeeCount
+        FROM mv_department_stats
+        ORDER BY EmployeeCount DESC
+    """,
+    'average_salary_by_department': """
+        SELECT Department, SalarySum * 1.0 / Employees AS AverageSalary, SalaryMin AS MinSalary, SalaryMax AS MaxSalary
+        FROM mv_department_stats
+        ORDER BY AverageSalary DESC
+    """,
+    'average_ratings_by_department': """
+        SELECT
+            Department,
+            ReviewedEmployees AS EmployeeCount,
+            SelfRatingSum / Reviews AS AvgSelfRating,
+            ManagerRatingSum / Reviews AS AvgManagerRating,
+            PerformanceSum / Reviews AS AvgCombinedRating
+        FROM mv_department_stats
+        WHERE Reviews > 0
+        ORDER BY AvgCombinedRating DESC
+    """,
+    'job_satisfaction_by_department': """
+        SELECT
+            Department,
+            Reviews AS EmployeeCount,
+            JobSatisfactionSum / Reviews AS AvgJobSatisfaction,
+            EnvironmentSatisfactionSum / Reviews AS AvgEnvironmentSatisfaction,
+            RelationshipSatisfactionSum / Reviews AS AvgRelationshipSatisfaction
+        FROM mv_department_stats
+        WHERE Reviews > 0
+        ORDER BY AvgJobSatisfaction DESC
+    """,
+    'top_3_highest_paid_employees_per_department': """
+        SELECT EmployeeID, FirstName, LastName, Department, Salary, SalaryRankInDept AS SalaryRank
+        FROM mv_employee_salary_ranks
+        WHERE SalaryRankInDept <= 3
+        ORDER BY Department, SalaryRank
+    """,
+    'salary_percentile_within_departments': """
+        SELECT EmployeeID, FirstName, LastName, Department, Salary, SalaryQuartile
+        FROM mv_employee_salary_ranks
+    """,
+    'department_performance_comparison': """
+        WITH DeptStats AS (
+            SELECT
+                Department,
+                ReviewedEmployees AS EmployeeCount,
+                ReviewSalarySum * 1.0 / Reviews AS AvgSalary,
+                SelfRatingSum / Reviews AS AvgSelfRating,
+                ManagerRatingSum / Reviews AS AvgManagerRating,
+                JobSatisfactionSum / Reviews AS AvgJobSatisfaction
+            FROM mv_department_stats
+            WHERE Reviews > 0
+        )
+        SELECT
+            *,
+            RANK() OVER (ORDER BY AvgSalary DESC) AS SalaryRank,
+            RANK() OVER (ORDER BY AvgSelfRating DESC) AS SelfRatingRank,
+            RANK() OVER (ORDER BY AvgManagerRating DESC) AS ManagerRatingRank,
+            RANK() OVER (ORDER BY AvgJobSatisfaction DESC) AS SatisfactionRank
+        FROM DeptStats
+    """,
+    'employees_earning_above_average_salary_in_their_department': """
+        SELECT r.EmployeeID, r.FirstName, r.LastName, r.Department, r.Salary,
+               s.SalarySum * 1.0 / s.Employees AS DeptAvgSalary
+        FROM mv_employee_salary_ranks r
+        JOIN mv_department_stats s ON s.Department = r.Department
+        WHERE r.Salary > s.SalarySum * 1.0 / s.Employees
+        ORDER BY r.Department, r.Salary DESC
+    """,
+    'employees_with_highest_satisfaction_in_their_department': """
+        SELECT EmployeeID, FirstName, LastName, Department, JobSatisfaction
+        FROM mv_department_top_satisfaction
+        ORDER BY Department, JobSatisfaction DESC
+    """,
+    'training_opportunities_analysis': """
+        SELECT
+            Department,
+            Reviews AS TotalEmployees,
+            TrainingOfferedSum / Reviews AS AvgTrainingOffered,
+            TrainingTakenSum / Reviews AS AvgTrainingTaken,
+            ROUND(100.0 * (TrainingTakenSum / Reviews) / NULLIF(TrainingOfferedSum / Reviews, 0), 2) AS TrainingUtilizationRate
+        FROM mv_department_stats
+        WHERE Reviews > 0
+        ORDER BY TrainingUtilizationRate DESC
+    """,
+    'department_health_score': """
+        SELECT
+            Department,
+            EmployeeCount,
+            AvgSalary,
+            AvgJobSatisfaction,
+            AvgPerformance,
+            AttritionRate,
+            ROUND((AvgJobSatisfaction * 0.3 + AvgPerformance * 0.4 + (100 - AttritionRate) * 0.3), 2) AS HealthScore
+        FROM (
+            SELECT
+                Department,
+                ReviewedEmployees AS EmployeeCount,
+                ReviewSalarySum * 1.0 / Reviews AS AvgSalary,
+                JobSatisfactionSum / Reviews AS AvgJobSatisfaction,
+                PerformanceSum / Reviews AS AvgPerformance,
+                AttritionReviews * 100.0 / Reviews AS AttritionRate
+            FROM mv_department_stats
+            WHERE Reviews > 0
+        )
+        ORDER BY HealthScore DESC
+    """
+}
+
+# Tables whose changed rows mark departments for refresh
+DEPARTMENT_TABLES = ['Employee', 'PerformanceRating']
+
+
+def parse_queries(path=SQL_FILE):
+    """Split a SQL file into named statements.
+
+    Each statement is named after the comment above it, e.g. '-- b. Count
+    employees by department' becomes count_employees_by_department.
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        text = f.read()
+
+    queries = {}
+    for block in text.split(';'):
+        comments = [line.strip()[2:].strip() for line in block.splitlines() if line.strip().startswith('--')]
+        statement = '\n'.join(line for line in block.splitlines() if not line.strip().startswith('--')).strip()
+        if not statement:
+            continue
+        title = re.sub(r'^[a-z]\.\s*', '', comments[-1]) if comments else f"query {len(queries) + 1}"
+        name = re.sub(r'[^a-z0-9]+', '_', title.lower()).strip('_')
+        unique, n = name, 2
+        while unique in queries:
+            unique, n = f"{name}_{n}", n + 1
+        queries[unique] = statement
+    return queries
+
+
+def table_fingerprint(df):
+    """Hash of a table's columns and rows"""
+    digest = hashlib.sha256(','.join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class SQLEngine:
+    """Embedded SQLite database of the cleaned pipeline tables.
+
+    Tables are only reloaded when their contents changed, and every named query
+    of the SQL file is materialized as a q_<name> table that is re-run only
+    when its SQL or one of the tables it reads changed. The fingerprints live
+    in the database itself, so the cache survives between runs.
+
+    The department reports are served from materialized views instead: when a
+    table is reloaded, the departments whose rows differ are queued in
+    _view_refresh and only their partitions of the views are rebuilt.
+    """
+
+    def __init__(self, database='hr_analytics.db', sql_file=SQL_FILE):
+        self.database = database
+        self.sql_file = sql_file
+        self.conn = sqlite3.connect(database)
+        # SQLite builds without the math extension have no SQRT
+        self.conn.create_function('SQRT', 1, lambda x: None if x is None or x < 0 else math.sqrt(x),
+                                  deterministic=True)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS _table_cache (name TEXT PRIMARY KEY, fingerprint TEXT, rows INTEGER);
+            CREATE TABLE IF NOT EXISTS _query_cache (name TEXT PRIMARY KEY, fingerprint TEXT, rows INTEGER, seconds REAL);
+            CREATE TABLE IF NOT EXISTS _view_refresh (Department TEXT PRIMARY KEY);
+        """)
+
+    def objects(self, kind='table'):
+        return {name for (name,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+    def fingerprints(self, cache):
+        """Recorded fingerprints of the tables or queries that still exist in the database"""
+        existing = self.objects()
+        prefix = 'q_' if cache == '_query_cache' else ''
+        return {
+            name: fingerprint
+            for name, fingerprint in self.conn.execute(f"SELECT name, fingerprint FROM {cache}")
+            if prefix + name in existing
+        }
+
+    def load_tables(self, tables):
+        """Load DataFrames as tables (skipping unchanged ones) and return the names reloaded"""
+        cached = self.fingerprints('_table_cache')
+        staged = {}
+        for name, df in tables.items():
+            fingerprint = table_fingerprint(df)
+            if cached.get(name) == fingerprint:
+                continue
+
+            df = df.copy()
+            # Dates as ISO text so they sort and compare correctly in SQL
+            for col in df.select_dtypes(include=['datetime']).columns:
+                df[col] = df[col].dt.strftime('%Y-%m-%d')
+            df.to_sql(f"_staged_{name}", self.conn, if_exists='replace', index=False)
+            staged[name] = (fingerprint, len(df))
+        if not staged:
+            return []
+
+        # Queue the departments to refresh before the old rows are replaced
+        departments = self.changed_departments(staged)
+        self.conn.executemany("INSERT OR IGNORE INTO _view_refresh VALUES (?)",
+                              [(department,) for department in (['*'] if departments is None else departments)])
+
+        for name, (fingerprint, rows) in staged.items():
+            self.conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            self.conn.execute(f'ALTER TABLE "_staged_{name}" RENAME TO "{name}"')
+            for columns in TABLE_INDEXES.get(name, []):
+                index = f"idx_{name}_{'_'.join(columns)}"
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{index}" ON "{name}" ({", ".join(columns)})')
+            self.conn.execute("INSERT OR REPLACE INTO _table_cache VALUES (?, ?, ?)", (name, fingerprint, rows))
+
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+        return list(staged)
+
+    def changed_departments(self, staged):
+        """Departments with rows that differ between the loaded and staged tables (None when unknown)"""
+        existing = self.objects()
+
+        def columns(table):
+            return [row[1] for row in self.conn.execute(f'PRAGMA table_info("{table}")')]
+
+        def changed_rows(name):
+            old, new = f'"{name}"', f'"_staged_{name}"'
+            return (f"SELECT * FROM (SELECT * FROM {old} EXCEPT SELECT * FROM {new}) "
+                    f"UNION ALL SELECT * FROM (SELECT * FROM {new} EXCEPT SELECT * FROM {old})")
+
+        departments = set()
+        for name in DEPARTMENT_TABLES:
+            if name not in staged:
+                continue
+            if name not in existing or columns(name) != columns(f"_staged_{name}"):
+                return None
+            if name == 'Employee':
+                query = f"SELECT DISTINCT Department FROM ({changed_rows(name)})"
+            else:
+                # Reviews belong to the department of their employee, before or after the change
+                employees = "SELECT EmployeeID, Department FROM Employee"
+                if 'Employee' in staged:
+                    employees += " UNION SELECT EmployeeID, Department FROM _staged_Employee"
+                query = (f"SELECT DISTINCT e.Department FROM ({changed_rows(name)}) changed "
+                         f"JOIN ({employees}) e ON e.EmployeeID = changed.EmployeeID")
+            departments.update(department for (department,) in self.conn.execute(query))
+        return departments
+
+    def refresh_views(self):
+        """Rebuild the queued department partitions of the materialized views; returns how many were refreshed"""
+        existing = self.objects()
+        queued = {department for (department,) in self.conn.execute("SELECT Department FROM _view_refresh")}
+        if not all(view in existing for view in DEPARTMENT_VIEWS):
+            queued.add('*')
+        if not queued:
+            return 0
+
+        if '*' in queued:
+            queued = {department for (department,) in self.conn.execute("SELECT DISTINCT Department FROM Employee")}
+            for view in DEPARTMENT_VIEWS:
+                self.conn.execute(f'DROP TABLE IF EXISTS "{view}"')
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_departments (Department TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM temp.refresh_departments")
+        self.conn.executemany("INSERT INTO temp.refresh_departments VALUES (?)", [(d,) for d in queued])
+        for view, select in DEPARTMENT_VIEWS.items():
+            if view in self.objects():
+                self.conn.execute(f'DELETE FROM "{view}" WHERE {REFRESHED}')
+                self.conn.execute(f'INSERT INTO "{view}" {select}')
+            else:
+                self.conn.execute(f'CREATE TABLE "{view}" AS {select}')
+                self.conn.execute(f'CREATE INDEX "idx_{view}_Department" ON "{view}" (Department)')
+
+        self.conn.execute("DELETE FROM _view_refresh")
+        self.conn.commit()
+        return len(queued)
+
+    def query_fingerprint(self, sql, tables):
+        """Hash of a query and the fingerprints of the tables it reads"""
+        digest = hashlib.sha256(sql.encode())
+        for name in sorted(tables):
+            if re.search(rf'\b{re.escape(name)}\b', sql):
+                digest.update(f"{name}={tables[name]}".encode())
+        return digest.hexdigest()[:16]
+
+    def run_queries(self, refresh=False):
+        """Materialize every named query as q_<name>; returns {name: {'rows', 'source', 'seconds'}}.
+
+        Department reports become views over the refreshed materialized views
+        ('view'); the other queries are re-run ('query') or kept ('cached').
+        """
+        if refresh:
+            self.conn.execute("INSERT OR IGNORE INTO _view_refresh VALUES ('*')")
+        self.refreshed_departments = self.refresh_views()
+
+        tables = self.fingerprints('_table_cache')
+        cached = self.fingerprints('_query_cache')
+        views = self.objects('view')
+        results = {}
+        for name, sql in parse_queries(self.sql_file).items():
+            start = time.perf_counter()
+            if name in REPORT_VIEWS:
+                if f"q_{name}" not in views:
+                    self.conn.execute(f'DROP TABLE IF EXISTS "q_{name}"')
+                    self.conn.execute(f'CREATE VIEW "q_{name}" AS {REPORT_VIEWS[name]}')
+                source = 'view'
+            else:
+                fingerprint = self.query_fingerprint(sql, tables)
+                if not refresh and cached.get(name) == fingerprint:
+                    rows = self.conn.execute("SELECT rows FROM _query_cache WHERE name = ?", (name,)).fetchone()[0]
+                    results[name] = {'rows': rows, 'source': 'cached', 'seconds': 0.0}
+                    continue
+
+                self.conn.execute(f'DROP TABLE IF EXISTS "q_{name}"')
+                self.conn.execute(f'CREATE TABLE "q_{name}" AS {sql}')
+                source = 'query'
+            rows = self.conn.execute(f'SELECT COUNT(*) FROM "q_{name}"').fetchone()[0]
+            seconds = time.perf_counter() - start
+            if source == 'query':
+                self.conn.execute("INSERT OR REPLACE INTO _query_cache VALUES (?, ?, ?, ?)",
+                                  (name, fingerprint, rows, seconds))
+            results[name] = {'rows': rows, 'source': source, 'seconds': seconds}
+
+        self.conn.commit()
+        return results
+
+    def result(self, name):
+        """A materialized query result as a DataFrame"""
+        return pd.read_sql_query(f'SELECT * FROM "q_{name}"', self.conn)
+
+    def sql(self, statement):
+        """Run an ad-hoc SELECT against the loaded tables"""
+        return pd.read_sql_query(statement, self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the hranalytics.sql queries against the pipeline outputs")
+    parser.add_argument('--database', default='hr_analytics.db', help="SQLite database file (default: hr_analytics.db)")
+    parser.add_argument('--sql-file', default=SQL_FILE, help="SQL file with the named queries")
+    parser.add_argument('--refresh', action='store_true',
+                        help="re-run every query and rebuild every materialized view even if the inputs are unchanged")
+    parser.add_argument('--query', default=None, help="print one materialized query result by name")
+    parser.add_argument('--output', default=None, help="with --query, save the result to this CSV")
+    args = parser.parse_args()
+
+    engine = SQLEngine(args.database, args.sql_file)
+    if args.query is None:
+        # Load the cleaned tables written by hr_analytics_preprocessing.py
+        print("🗄️ Loading pipeline outputs into the SQL engine...")
+        try:
+            reloaded = engine.load_tables({
+                'Employee': read_table('employee_cleaned', parse_dates=['HireDate']),
+                'PerformanceRating': read_table('performance_cleaned', parse_dates=['ReviewDate']),
+                'EducationLevel': read_source('EducationLevel'),
+                'RatingLevel': read_source('RatingLevel'),
+                'SatisfiedLevel': read_source('SatisfiedLevel')
+            })
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            print("Run hr_analytics_preprocessing.py first.")
+            raise SystemExit(1)
+        print(f"✅ Tables reloaded: {', '.join(reloaded) if reloaded else 'none (unchanged)'}")
+
+        results = engine.run_queries(refresh=args.refresh)
+        print(f"🔄 Materialized views refreshed for {engine.refreshed_departments} departments")
+        for name, result in results.items():
+            status = result['source'] if result['source'] == 'cached' else f"{result['source']}, {result['seconds'] * 1000:.1f} ms"
+            print(f"  q_{name}: {result['rows']} rows ({status})")
+    else:
+        result = engine.result(args.query)
+        if args.output:
+            result.to_csv(args.output, index=False)
+            print(f"📁 {len(result)} rows saved to {args.output}")
+        else:
+            print(result.to_string(index=False))
+    engine.close()
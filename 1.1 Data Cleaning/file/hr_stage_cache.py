@@ -0,0 +1,191 @@
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import re
+import shutil
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+# Bumped when the entry layout changes so older entries are never read
+CACHE_FORMAT = 1
+
+
+def method_sources(cls, name, seen=None):
+    """Source of a method and of every method of its class it calls through self"""
+    seen = set() if seen is None else seen
+    method = getattr(cls, name, None)
+    if name in seen or not callable(method):
+        return []
+    seen.add(name)
+    source = inspect.getsource(method)
+    sources = [source]
+    for called in re.findall(r'self\.(\w+)\(', source):
+        sources += method_sources(cls, called, seen)
+    return sources
+
+
+def _walk(path):
+    """The file itself, or every file under a directory (partitioned datasets)"""
+    if os.path.isdir(path):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    return [path] if os.path.exists(path) else []
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class StageCache:
+    """Content-addressed store of pipeline stage outputs, bounded in size by LRU eviction.
+
+    A stage's key hashes its code (the method, the methods it calls through
+    self and any modules it declares), its parameters, the contents of the
+    files it reads and the keys of its inputs, which are in turn derived from
+    the keys of the stages that wrote them. An unchanged key means unchanged
+    outputs, so a hit restores the stage's attributes, return value and the
+    files it wrote, and re-submits its charts (redrawn only when their drawing
+    code changed). Stages named in invalidate, and every stage depending on
+    them, run again and replace their entries.
+    """
+
+    def __init__(self, root='stage_cache', max_mb=1024, invalidate=()):
+        self.root = root
+        self.max_bytes = max_mb * 1024 * 1024
+        self.invalidate = set(invalidate)
+        self.index = {'format': CACHE_FORMAT, 'entries': {}, 'digests': {}}
+        path = os.path.join(root, 'index.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                index = json.load(f)
+            if index.get('format') == CACHE_FORMAT:
+                self.index = index
+
+    def forced(self, label, stage):
+        return 'all' in self.invalidate or label in self.invalidate or stage.name in self.invalidate
+
+    def file_digest(self, path):
+        """Content hash of a file, recomputed only when its size or modification time changed"""
+        stat = os.stat(path)
+        known = self.index['digests'].get(os.path.abspath(path))
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        self.index['digests'][os.path.abspath(path)] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    @staticmethod
+    def paths(owner, declared):
+        """Declared paths formatted with the owner's attributes, or the paths an owner method returns"""
+        if isinstance(declared, str):
+            return list(getattr(owner, declared)())
+        return [path.format_map(vars(owner)) for path in declared]
+
+    def source_files(self, owner, stage):
+        """The files a stage reads (missing ones are skipped)"""
+        return [path for source in self.paths(owner, stage.sources) for path in _walk(source)]
+
+    def key(self, owner, stage, inputs):
+        """Content address of a stage run given the keys of its input versions"""
+        code = method_sources(type(owner), stage.name) + [inspect.getsource(importlib.import_module(name)) for name in stage.code]
+        return joblib.hash({
+            'stage': stage.name,
+            'code': code,
+            'params': {attr: getattr(owner, attr) for attr in stage.params},
+            'sources': {path: self.file_digest(path) for path in self.source_files(owner, stage)},
+            'inputs': inputs,
+            'libraries': [pd.__version__, np.__version__]
+        })
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key):
+        """The stored entry of a key ({'outputs', 'result', 'files', 'charts'}), or None"""
+        path = os.path.join(self.entry_dir(key), 'entry.joblib')
+        if key not in self.index['entries'] or not os.path.exists(path):
+            return None
+        try:
+            entry = joblib.load(path)
+        except Exception as e:
+            print(f"⚠️ Unreadable stage cache entry {key}: {e}")
+            return None
+        self.index['entries'][key]['used'] = time.time()
+        self._save_index()
+        return entry
+
+    def restore(self, key, entry):
+        """Write back the files (or dataset directories) a stage wrote when its entry was stored.
+
+        Copies keep their modification times, so files still as the stage left
+        them (same size and modification time) are not copied again.
+        """
+        for root, files in entry['files'].items():
+            if _walk(root) == sorted(files) and all(_signature(path) == files[path][1:] for path in files):
+                continue
+            _remove(root)
+            for path, (stored, _, _) in files.items():
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                shutil.copy2(os.path.join(self.entry_dir(key), 'files', stored), path)
+
+    def put(self, key, label, outputs, result, files, charts):
+        """Store a stage's outputs and written files, then evict the least recently used entries"""
+        path = self.entry_dir(key)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(os.path.join(path, 'files'))
+        stored = {}
+        number = 0
+        for root in files:
+            stored[root] = {}
+            for name in _walk(root):
+                stored[root][name] = [str(number)] + _signature(name)
+                shutil.copy2(name, os.path.join(path, 'files', str(number)))
+                number += 1
+        try:
+            joblib.dump({'outputs': outputs, 'result': result, 'files': stored, 'charts': charts},
+                        os.path.join(path, 'entry.joblib'))
+        except Exception as e:
+            # Outputs that cannot be pickled are simply not cached
+            print(f"⚠️ Not caching {label}: {e}")
+            shutil.rmtree(path)
+            return False
+
+        size = sum(os.path.getsize(file) for file in _walk(path))
+        self.index['entries'][key] = {'stage': label, 'bytes': size, 'used': time.time()}
+        self.evict()
+        return key in self.index['entries']
+
+    def evict(self):
+        entries = self.index['entries']
+        total = sum(entry['bytes'] for entry in entries.values())
+        for key in sorted(entries, key=lambda key: entries[key]['used']):
+            if total <= self.max_bytes:
+                break
+            total -= entries.pop(key)['bytes']
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+        self._save_index()
+
+    def _save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        partial = os.path.join(self.root, 'index.json.partial')
+        with open(partial, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(partial, os.path.join(self.root, 'index.json'))
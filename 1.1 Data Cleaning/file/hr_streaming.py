@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+
+def _combine_codes(code_arrays, level_sizes, dropna):
+    """Combine per-key integer codes (-1 for missing) into one group id per row.
+
+    Missing key values get their own code after the level's values; with
+    dropna they are flagged in the returned keep mask instead.
+    """
+    group_ids = np.zeros(len(code_arrays[0]) if code_arrays else 0, dtype='int64')
+    keep = np.ones(len(group_ids), dtype=bool)
+    for codes, size in zip(code_arrays, level_sizes):
+        codes = codes.astype('int64')
+        if dropna:
+            keep &= codes >= 0
+        group_ids = group_ids * (size + 1) + np.where(codes < 0, size, codes)
+    return group_ids, keep
+
+
+def _decode_index(group_ids, levels, keys):
+    """Turn combined group ids back into an index of key values"""
+    arrays = []
+    for level in reversed(levels):
+        codes = group_ids % (len(level) + 1)
+        group_ids = group_ids // (len(level) + 1)
+        # The extra code after the level's values is the missing value
+        arrays.append(level.insert(len(level), np.nan).take(codes))
+    arrays.reverse()
+    if len(arrays) == 1:
+        return pd.Index(arrays[0], name=keys[0])
+    return pd.MultiIndex.from_arrays(arrays, names=list(keys))
+
+
+class RunningAggregate:
+    """Mergeable per-group row count, sum, non-null count, min and max statistics.
+
+    Partial aggregates built from separate chunks (or shards) can be combined
+    with update() / merge() in any order and give the same result as a single
+    groupby over all of the rows. An aggregate over fine-grained keys can be
+    rolled up to any subset of them, which serves several grouping sets (as in
+    SQL GROUPING SETS) from one vectorized pass over the rows.
+    """
+
+    def __init__(self, keys, columns, dropna=True, extrema=None):
+        self.keys = list(keys)
+        self.columns = list(columns)
+        # Columns that also track min / max (all of them by default)
+        self.extrema = list(columns) if extrema is None else list(extrema)
+        self.dropna = dropna
+        self.rows = None
+        self.sums = None
+        self.counts = None
+        self.mins = None
+        self.maxs = None
+
+    def update(self, df):
+        """Fold a block of rows into the running statistics.
+
+        Each key is factorized once and all statistics are computed with NumPy
+        bincount / ufunc.at over the combined group ids, in one pass over the rows.
+        """
+        code_arrays, levels = [], []
+        for key in self.keys:
+            codes, uniques = pd.factorize(df[key], sort=True)
+            code_arrays.append(codes)
+            levels.append(pd.Index(uniques))
+        group_ids, keep = _combine_codes(code_arrays, [len(level) for level in levels], self.dropna)
+
+        group_ids = group_ids[keep]
+
+        # Small key spaces are counted in dense bins, large ones are hashed first
+        dense_size = int(np.prod([len(level) + 1 for level in levels]))
+        dense = dense_size <= 4 * len(group_ids)
+        if dense:
+            inverse = group_ids
+            rows = np.bincount(inverse, minlength=dense_size)
+            ids = np.flatnonzero(rows)
+            rows = rows[ids]
+        else:
+            inverse, ids = pd.factorize(group_ids)
+            dense_size = len(ids)
+            rows = np.bincount(inverse, minlength=dense_size)
+
+        def per_group(values):
+            return values[ids] if dense else values
+
+        sums = np.empty((len(ids), len(self.columns)))
+        counts = np.empty((len(ids), len(self.columns)))
+        mins = np.empty((len(ids), len(self.extrema)))
+        maxs = np.empty((len(ids), len(self.extrema)))
+        for j, col in enumerate(self.columns):
+            values = df[col].to_numpy(dtype='float64')[keep]
+            valid = ~np.isnan(values)
+            if valid.all():
+                sums[:, j] = per_group(np.bincount(inverse, weights=values, minlength=dense_size))
+                counts[:, j] = rows
+            else:
+                sums[:, j] = per_group(np.bincount(inverse, weights=np.where(valid, values, 0), minlength=dense_size))
+                counts[:, j] = per_group(np.bincount(inverse, weights=valid, minlength=dense_size))
+            if col in self.extrema:
+                k = self.extrema.index(col)
+                low = np.full(dense_size, np.inf)
+                high = np.full(dense_size, -np.inf)
+                np.fmin.at(low, inverse, values)
+                np.fmax.at(high, inverse, values)
+                mins[:, k] = np.where(counts[:, j] > 0, per_group(low), np.nan)
+                maxs[:, k] = np.where(counts[:, j] > 0, per_group(high), np.nan)
+
+        index = _decode_index(ids, levels, self.keys)
+        self._combine(
+            pd.Series(rows, index=index),
+            pd.DataFrame(sums, index=index, columns=self.columns),
+            pd.DataFrame(counts, index=index, columns=self.columns),
+            pd.DataFrame(mins, index=index, columns=self.extrema),
+            pd.DataFrame(maxs, index=index, columns=self.extrema)
+        )
+        return self
+
+    def merge(self, other):
+        """Fold another RunningAggregate over the same keys and columns into this one"""
+        if other.rows is not None:
+            self._combine(other.rows, other.sums, other.counts, other.mins, other.maxs)
+        return self
+
+    def _combine(self, rows, sums, counts, mins, maxs):
+        if self.rows is None:
+            self.rows = rows.astype('int64')
+            self.sums, self.counts, self.mins, self.maxs = sums, counts, mins, maxs
+            return
+
+        index = self.rows.index.union(rows.index)
+        self.rows = self.rows.reindex(index, fill_value=0) + rows.reindex(index, fill_value=0)
+        self.sums = self.sums.reindex(index).add(sums.reindex(index), fill_value=0)
+        self.counts = self.counts.reindex(index).add(counts.reindex(index), fill_value=0)
+        self.mins = np.fmin(self.mins.reindex(index), mins.reindex(index))
+        self.maxs = np.fmax(self.maxs.reindex(index), maxs.reindex(index))
+
+    def rollup(self, keys, dropna=True):
+        """Aggregate the statistics up to a subset of the keys.
+
+        Works on the integer level codes of the group index with NumPy
+        reductions, so rolling up costs far less than another groupby.
+        """
+        rolled = RunningAggregate(keys, self.columns, dropna=dropna, extrema=self.extrema)
+        if self.rows is None:
+            return rolled
+
+        index = self.rows.index
+        if not isinstance(index, pd.MultiIndex):
+            index = pd.MultiIndex.from_arrays([index])
+        positions = [index.names.index(key) for key in keys]
+        levels = [index.levels[position] for position in positions]
+        group_ids, keep = _combine_codes(
+            [index.codes[position] for position in positions], [len(level) for level in levels], dropna
+        )
+
+        # Sort once and reduce every statistic over the runs of equal ids
+        order = np.flatnonzero(keep)[np.argsort(group_ids[keep], kind='stable')]
+        sorted_ids = group_ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        group_index = _decode_index(sorted_ids[starts], levels, keys)
+
+        def reduce(ufunc, frame):
+            values = ufunc.reduceat(frame.to_numpy(dtype='float64')[order], starts, axis=0)
+            return pd.DataFrame(values, index=group_index, columns=frame.columns)
+
+        rolled.rows = pd.Series(np.add.reduceat(self.rows.to_numpy()[order], starts), index=group_index)
+        rolled.sums = reduce(np.add, self.sums)
+        rolled.counts = reduce(np.add, self.counts)
+        rolled.mins = reduce(np.fmin, self.mins)
+        rolled.maxs = reduce(np.fmax, self.maxs)
+        return rolled
+
+    def grouping_sets(self, sets):
+        """Roll up to several grouping sets given as {name: keys}"""
+        return {name: self.rollup(keys) for name, keys in sets.items()}
+
+    def totals(self):
+        """Grand totals over all groups (the empty grouping set)"""
+        return {
+            'rows': int(self.rows.sum()),
+            'sum': self.sums.sum(),
+            'count': self.counts.sum(),
+            'min': self.mins.min(),
+            'max': self.maxs.max()
+        }
+
+    def sum(self, column):
+        return self.sums[column]
+
+    def count(self, column):
+        return self.counts[column]
+
+    def mean(self, column):
+        """Mean of the non-null values of a column (NaN for groups with none)"""
+        return self.sums[column] / self.counts[column].replace(0, np.nan)
+
+    def min(self, column):
+        return self.mins[column]
+
+    def max(self, column):
+        return self.maxs[column]
@@ -0,0 +1,137 @@
+import argparse
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# Lookup tables copied unchanged next to the generated files
+LOOKUP_FILES = ['EducationLevel.csv', 'RatingLevel.csv', 'SatisfiedLevel.csv']
+
+RATING_COLUMNS = ['EnvironmentSatisfaction', 'JobSatisfaction', 'RelationshipSatisfaction',
+                  'TrainingOpportunitiesWithinYear', 'TrainingOpportunitiesTaken',
+                  'WorkLifeBalance', 'SelfRating', 'ManagerRating']
+
+
+def employee_ids(n, rng):
+    """n unique random IDs in the sample's XXXX-XXXX upper-case hex format"""
+    ids = np.unique(rng.integers(0, 16 ** 8, int(n * 1.01) + 16))
+    while len(ids) < n:
+        ids = np.unique(np.concatenate([ids, rng.integers(0, 16 ** 8, n)]))
+    ids = rng.permutation(ids)[:n]
+    hex_ids = pd.Series(ids).map('{:08X}'.format)
+    return (hex_ids.str[:4] + '-' + hex_ids.str[4:]).to_numpy()
+
+
+def scaled_count(sample_size, scale):
+    """Number of employees generated at a scale of a sample of sample_size; ValueError if it is not at least one"""
+    n = int(round(sample_size * scale)) if scale == scale else 0
+    if n < 1:
+        raise ValueError(f"A scale of {scale:g} gives {n} employees from the {sample_size}-employee sample; "
+                         f"the scale must be at least {1 / max(sample_size, 1):.2g}")
+    return n
+
+
+def sample_size(path='.'):
+    """Number of employees in the sample Employee.csv of a directory"""
+    return len(pd.read_csv(os.path.join(path, 'Employee.csv'), usecols=['EmployeeID']))
+
+
+def _ragged_positions(starts, counts):
+    """Concatenated ranges starts[i]..starts[i]+counts[i] without a Python loop"""
+    ends = np.cumsum(counts)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts) + np.repeat(starts, counts)
+
+
+class SyntheticHRGenerator:
+    """Generate Employee.csv and PerformanceRating.csv at any multiple of a sample.
+
+    Every synthetic employee is drawn from a sample employee (bootstrap), which
+    keeps the joint distribution of department, role, tenure, attrition and so
+    on, and inherits that employee's review history: the same number of yearly
+    reviews at the same offsets from the hire date. IDs are new, first and
+    last names are drawn independently, salaries get +/-5% noise and hire and
+    review dates a shared shift of up to 30 days. Each rating is redrawn from
+    the sample's distribution with probability rating_noise, so reviews are
+    not exact copies while the rating distributions stay the same.
+    """
+
+    def __init__(self, employees, reviews, seed=42, rating_noise=0.15):
+        self.employees = employees.reset_index(drop=True)
+        self.reviews = reviews
+        self.seed = seed
+        self.rating_noise = rating_noise
+
+    @classmethod
+    def from_directory(cls, path='.', **kwargs):
+        """Use the sample CSVs of a directory"""
+        return cls(pd.read_csv(os.path.join(path, 'Employee.csv')),
+                   pd.read_csv(os.path.join(path, 'PerformanceRating.csv')), **kwargs)
+
+    def generate(self, scale):
+        """Return (employees, reviews) DataFrames with scale times the sample's employees (at least one)"""
+        n = scaled_count(len(self.employees), scale)
+        rng = np.random.default_rng(self.seed)
+        template = rng.integers(0, len(self.employees), n)
+
+        employees = self.employees.iloc[template].reset_index(drop=True)
+        ids = employee_ids(n, rng)
+        employees['EmployeeID'] = ids
+        for col in ['FirstName', 'LastName']:
+            employees[col] = self.employees[col].to_numpy()[rng.integers(0, len(self.employees), n)]
+        employees['Salary'] = np.rint(employees['Salary'] * rng.normal(1, 0.05, n)).astype('int64')
+        shift = pd.to_timedelta(rng.integers(-30, 31, n), unit='D')
+        employees['HireDate'] = (pd.to_datetime(employees['HireDate']) + shift).dt.strftime('%Y-%m-%d')
+
+        # Review histories of the template employees, grouped by employee
+        reviews = self.reviews.copy()
+        reviews['_employee'] = pd.Index(self.employees['EmployeeID']).get_indexer(reviews['EmployeeID'])
+        reviews = reviews[reviews['_employee'] >= 0].sort_values('_employee', kind='stable')
+        counts = np.bincount(reviews['_employee'], minlength=len(self.employees))
+        starts = np.cumsum(counts) - counts
+
+        per_employee = counts[template]
+        reviews = reviews.iloc[_ragged_positions(starts[template], per_employee)].drop(columns='_employee')
+        reviews = reviews.reset_index(drop=True)
+        reviews['EmployeeID'] = np.repeat(ids, per_employee)
+        reviews['ReviewDate'] = pd.to_datetime(reviews['ReviewDate'], format='%m/%d/%Y') + np.repeat(shift, per_employee)
+
+        for col in RATING_COLUMNS:
+            redraw = rng.random(len(reviews)) < self.rating_noise
+            reviews.loc[redraw, col] = rng.choice(self.reviews[col].to_numpy(), redraw.sum())
+
+        # Reviews are numbered in date order, PR01, PR02, ... as in the sample
+        reviews = reviews.sort_values('ReviewDate', kind='stable').reset_index(drop=True)
+        reviews['PerformanceID'] = 'PR' + pd.Series(np.arange(1, len(reviews) + 1)).astype(str).str.zfill(2)
+        dates = reviews['ReviewDate']
+        reviews['ReviewDate'] = (dates.dt.month.astype(str) + '/' + dates.dt.day.astype(str) + '/'
+                                 + dates.dt.year.astype(str))
+        return employees, reviews[self.reviews.columns]
+
+    def write(self, scale, output_dir, source_dir='.'):
+        """Write a complete synthetic source directory (the lookups are copied from source_dir)"""
+        os.makedirs(output_dir, exist_ok=True)
+        employees, reviews = self.generate(scale)
+        employees.to_csv(os.path.join(output_dir, 'Employee.csv'), index=False)
+        reviews.to_csv(os.path.join(output_dir, 'PerformanceRating.csv'), index=False)
+        for name in LOOKUP_FILES:
+            shutil.copy(os.path.join(source_dir, name), os.path.join(output_dir, name))
+        return len(employees), len(reviews)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic HR source CSVs at a multiple of the sample")
+    parser.add_argument('--scale', type=float, default=10, help="multiple of the sample's employees (default: 10)")
+    parser.add_argument('--output-dir', default=None, help="directory to write (default: synthetic_<scale>x)")
+    parser.add_argument('--source-dir', default='.', help="directory with the sample CSVs (default: .)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed (default: 42)")
+    args = parser.parse_args()
+
+    generator = SyntheticHRGenerator.from_directory(args.source_dir, seed=args.seed)
+    try:
+        scaled_count(len(generator.employees), args.scale)
+    except ValueError as e:
+        parser.error(str(e))
+
+    output_dir = args.output_dir or f"synthetic_{args.scale:g}x"
+    employee_count, review_count = generator.write(args.scale, output_dir, args.source_dir)
+    print(f"✅ Wrote {employee_count} employees and {review_count} reviews to {output_dir}")
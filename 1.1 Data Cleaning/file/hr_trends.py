@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+# Review measures whose trends are tracked per department
+TREND_MEASURES = ['PerformanceScore', 'JobSatisfaction']
+
+# Bucket period -> pandas period frequency
+TREND_PERIODS = {'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+
+# Months per period; ordinals count periods since 1970 like pandas Period ordinals
+PERIOD_MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+
+
+def period_ordinals(dates, period):
+    """Period ordinal of each date and whether the date is present"""
+    values = np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[M]')
+    present = ~np.isnat(values)
+    months = np.where(present, values.astype('int64'), 0)
+    return np.floor_divide(months, PERIOD_MONTHS[period]), present
+
+
+class TrendEngine:
+    """Per-department review statistics bucketed by month, quarter or year.
+
+    For each department and period the engine keeps the review count and the
+    sum, count and sum of squares of every measure in dense arrays, along with
+    their running totals over the periods. Rolling statistics of the last
+    window periods and cumulative statistics to date are differences of
+    running totals, so the trend table needs no groupby. update() only adds to
+    the buckets its reviews fall in and to the running totals from the first
+    of those periods onwards, so new reviews cost the same however many years
+    of history are kept.
+    """
+
+    def __init__(self, period='month', window=3, measures=TREND_MEASURES):
+        if period not in TREND_PERIODS:
+            raise ValueError(f"Unsupported trend period '{period}', expected one of {list(TREND_PERIODS)}")
+        if window < 1:
+            raise ValueError("The rolling window must cover at least one period")
+        self.period = period
+        self.window = window
+        self.measures = list(measures)
+        self.departments = []
+        self.start = 0
+        # [department, period, stat]: ReviewCount, then sum, count and sum of squares of each measure
+        self.buckets = np.zeros((0, 0, 1 + 3 * len(self.measures)))
+        self.totals = self.buckets.copy()
+
+    @property
+    def end(self):
+        """Ordinal after the last period held"""
+        return self.start + self.buckets.shape[1]
+
+    def _resize(self, departments, first, last):
+        """Grow the arrays to hold these departments and the periods first..last"""
+        new = [name for name in departments if name not in self.departments]
+        if new:
+            self.departments += new
+            padding = np.zeros((len(new),) + self.buckets.shape[1:])
+            self.buckets = np.concatenate([self.buckets, padding])
+            self.totals = np.concatenate([self.totals, padding])
+
+        if not self.buckets.shape[1]:
+            self.start = first
+        before = max(self.start - first, 0)
+        after = max(last + 1 - self.end, 0)
+        if before or after:
+            shape = self.buckets.shape
+            self.buckets = np.pad(self.buckets, ((0, 0), (before, after), (0, 0)))
+            # Running totals are zero before the first period and carry forward after the last
+            totals = np.pad(self.totals, ((0, 0), (before, 0), (0, 0)))
+            carried = totals[:, -1:] if shape[1] else np.zeros((shape[0], 1, shape[2]))
+            self.totals = np.concatenate([totals, np.repeat(carried, after, axis=1)], axis=1)
+            self.start -= before
+
+    def update(self, df, sign=1):
+        """Add the reviews of df (sign=-1 removes them); returns the first period ordinal changed or None"""
+        ordinals, present = period_ordinals(df['ReviewDate'], self.period)
+        codes, names = pd.factorize(df['Department'])
+        present &= codes >= 0
+        if not present.any():
+            return None
+        ordinals = ordinals[present]
+        codes = codes[present]
+        first = int(ordinals.min())
+        self._resize([str(name) for name in names], first, int(ordinals.max()))
+
+        stats = [np.ones(len(ordinals))]
+        for measure in self.measures:
+            values = df[measure].to_numpy(dtype='float64')[present]
+            counted = ~np.isnan(values)
+            values = np.where(counted, values, 0.0)
+            stats += [values, counted.astype('float64'), values * values]
+
+        # Bucket deltas over the trailing periods only: from the first one changed to the end
+        rows = np.array([self.departments.index(str(name)) for name in names])[codes]
+        span = self.end - first
+        slots = rows * span + (ordinals - first)
+        delta = np.stack([
+            np.bincount(slots, weights=stat, minlength=len(self.departments) * span) for stat in stats
+        ], axis=-1).reshape(len(self.departments), span, -1) * sign
+        offset = first - self.start
+        self.buckets[:, offset:] += delta
+        self.totals[:, offset:] += np.cumsum(delta, axis=1)
+        return first
+
+    def merge(self, other):
+        """Fold another engine with the same period and measures into this one (e.g. from another shard)"""
+        if not other.buckets.shape[1]:
+            return self
+        self._resize(other.departments, other.start, other.end - 1)
+        rows = [self.departments.index(name) for name in other.departments]
+        offset = other.start - self.start
+        self.buckets[rows, offset:offset + other.buckets.shape[1]] += other.buckets
+        self.totals = np.cumsum(self.buckets, axis=1)
+        return self
+
+    def start_time(self, ordinal):
+        """First day of a period"""
+        return pd.PeriodIndex.from_ordinals([ordinal], freq=TREND_PERIODS[self.period]).start_time[0]
+
+    def table(self, since=None):
+        """Trend rows of every department from period ordinal since (default: all), ordered by department and period.
+
+        Each row holds the review count and the mean of every measure in the
+        period, the mean and standard deviation over the rolling window ending
+        with it and the cumulative mean to date. Periods before a department's
+        first review are left out.
+        """
+        offset = 0 if since is None else min(max(since - self.start, 0), self.buckets.shape[1])
+        periods = np.arange(offset, self.buckets.shape[1])
+        totals = self.totals[:, offset:]
+        lagged = self.totals[:, np.maximum(periods - self.window, 0)]
+        rolling = totals - np.where((periods >= self.window)[None, :, None], lagged, 0.0)
+        bucket = self.buckets[:, offset:]
+
+        order = sorted(range(len(self.departments)), key=lambda row: self.departments[row])
+        keep = totals[order, :, 0] > 0
+        ordinals = periods + self.start
+        labels = pd.PeriodIndex.from_ordinals(ordinals, freq=TREND_PERIODS[self.period])
+
+        def flat(values):
+            return values[order][keep].round(4)
+
+        table = {
+            'Department': np.repeat([self.departments[row] for row in order], keep.sum(axis=1)),
+            'Period': np.broadcast_to(labels.astype(str).to_numpy(), keep.shape)[keep],
+            'PeriodStart': np.broadcast_to(labels.start_time.to_numpy(), keep.shape)[keep],
+            'ReviewCount': flat(bucket[..., 0]).astype('int64')
+        }
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for i, measure in enumerate(self.measures):
+                total, count, squares = 1 + 3 * i, 2 + 3 * i, 3 + 3 * i
+                variance = (rolling[..., squares] - rolling[..., total] ** 2 / rolling[..., count]) / (rolling[..., count] - 1)
+                table[measure] = flat(bucket[..., total] / bucket[..., count])
+                table[f"Rolling{measure}"] = flat(rolling[..., total] / rolling[..., count])
+                table[f"Rolling{measure}Std"] = flat(np.sqrt(np.maximum(variance, 0)))
+                table[f"Cumulative{measure}"] = flat(totals[..., total] / totals[..., count])
+        return pd.DataFrame(table)
+
+    def save(self, path):
+        np.savez(path, period=self.period, window=self.window, measures=self.measures,
+                 departments=np.array(self.departments, dtype=str), start=self.start,
+                 buckets=self.buckets, totals=self.totals)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as state:
+            engine = cls(str(state['period']), int(state['window']), [str(m) for m in state['measures']])
+            engine.departments = [str(name) for name in state['departments']]
+            engine.start = int(state['start'])
+            engine.buckets = state['buckets']
+            engine.totals = state['totals']
+        return engine